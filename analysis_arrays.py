@@ -0,0 +1,32 @@
+# ===== START OF FILE analysis_arrays.py =====
+import numpy as np
+
+class AnalysisArrays:
+    """
+    Analysis of one game stored column-wise: one preallocated array per field instead of a dict per ply.
+    Index 0 is the starting position; index i holds ply i (its move, and the position before it), so
+    move-list row r is index r + 1. Float fields are NaN where a ply has no value (e.g. ungraded moves).
+    """
+    def __init__(self, size: int):
+        self.size = size
+        self.ply = np.arange(size, dtype=np.int32)
+        self.is_tracked = np.zeros(size, dtype=np.bool_)
+        self.is_forced = np.zeros(size, dtype=np.bool_)
+        self.pwin_after_9m = np.full(size, np.nan) # P(win) for the mover after the played move
+        self.pwin_after_136m = np.full(size, np.nan)
+        self.pwin_drop_136m = np.full(size, np.nan) # Only set for graded (tracked, non-forced) moves
+        self.cp_loss = np.full(size, np.nan)
+        self.move_rank = np.full(size, -1, dtype=np.int32) # Played move's index in top_moves_136m, -1 if absent
+        self.quality_code = np.zeros(size, dtype=np.int8)
+        self.move_uci = np.empty(size, dtype=object)
+        self.move_san = np.empty(size, dtype=object)
+        self.board_before = np.empty(size, dtype=object) # Stack-less chess.Board snapshots; treat as read-only
+        self.top_moves_9m = np.empty(size, dtype=object) # Lists of {'san', 'uci', 'p_win'} dicts
+        self.top_moves_136m = np.empty(size, dtype=object)
+
+    def __len__(self):
+        return self.size
+
+    def graded_mask(self) -> np.ndarray:
+        return self.is_tracked & ~np.isnan(self.pwin_drop_136m)
+# ===== END OF FILE analysis_arrays.py =====
@@ -12,8 +12,15 @@ class BlunderDataManager:
         self.blunder_file = blunder_file
         self.threshold = threshold
         self.all_blunders_from_file = []
-        self.training_blunders = []
-        self.current_index = -1
+        # Blunders passing the static filters; the solved/unsolved views are index lists into it,
+        # so toggling the filter swaps which list the cursor walks instead of refiltering.
+        self.eligible_blunders = []
+        self._all_indices: list[int] = []
+        self._unsolved_indices: list[int] = []
+        self._unsolved_index_set: set[int] = set()
+        self._pending_solved_indices: set[int] = set() # Solved this session, dropped on the next switch to the unsolved view
+        self._active_indices: list[int] = self._all_indices
+        self.current_index = -1 # Position within _active_indices
         self.learned_tracker = LearnedBlunderTracker()
         self.show_only_unsolved = True # This flag will now cover both "solved by PWin" and "solved by finding engine's #1"
 
@@ -39,6 +46,7 @@ class BlunderDataManager:
 
     def _filter_and_sort_training_blunders(self):
         candidate_blunders = []
+        unsolved_indices = []
         skipped_count = {
             "malformed": 0,
             "fake_blunder_uci_is_engine_top_and_negligible_drop": 0,
@@ -85,34 +93,54 @@ class BlunderDataManager:
                 skipped_count["below_threshold"] += 1
                 continue
 
-            # 3. Apply learning status filter if show_only_unsolved is True
-            if self.show_only_unsolved:
-                # 3a. Check if overall solved by PWin improvement criteria
-                if self.learned_tracker.is_blunder_solved(fen):
-                    #logging.debug(f"Skipping blunder (marked overall solved by PWin improvement): FEN {fen[:20]}...")
-                    skipped_count["solved_by_pwin_improvement"] += 1
-                    continue
-
-                # 3b. NEW CHECK: Check if user previously found the engine's #1 move for this FEN
-                blunder_status_from_tracker = self.learned_tracker.get_blunder_status(fen)
-                if blunder_status_from_tracker and engine_top_move_uci_original:
-                    user_found_engine_top_move = False
-                    for attempt in blunder_status_from_tracker.get("attempts", []):
-                        if attempt.get("uci") == engine_top_move_uci_original:
-                            user_found_engine_top_move = True
-                            break
-                    if user_found_engine_top_move:
-                        #logging.debug(f"Skipping blunder (user previously found engine's #1 move '{engine_top_move_uci_original}'): FEN {fen[:20]}...")
-                        skipped_count["solved_by_finding_engine_top_move"] += 1
-                        continue
-            
+            # 3. Learning status only decides membership in the unsolved view
+            eligible_idx = len(candidate_blunders)
             candidate_blunders.append(b_data)
+            solved_reason = self._get_solved_reason(b_data)
+            if solved_reason is None:
+                unsolved_indices.append(eligible_idx)
+            elif self.show_only_unsolved:
+                skipped_count[solved_reason] += 1
+
+        self.eligible_blunders = candidate_blunders
+        self._all_indices = list(range(len(candidate_blunders)))
+        self._unsolved_indices = unsolved_indices
+        self._unsolved_index_set = set(unsolved_indices)
+        self._pending_solved_indices = set()
+        self._select_active_indices()
+        logging.info(f"Filtering complete. Candidates for training: {len(self._active_indices)}. Skipped counts: {skipped_count}")
+
+        if not self._active_indices and self.all_blunders_from_file:
+            logging.warning("No blunders meet the current training criteria after all filters.")
 
-        self.training_blunders = candidate_blunders
-        logging.info(f"Filtering complete. Candidates for training: {len(self.training_blunders)}. Skipped counts: {skipped_count}")
+    def _get_solved_reason(self, b_data) -> str | None:
+        fen = b_data['fen_before_blunder']
+        # Check if overall solved by PWin improvement criteria
+        if self.learned_tracker.is_blunder_solved(fen):
+            return "solved_by_pwin_improvement"
+
+        # Check if user previously found the engine's #1 move for this FEN
+        top_moves_9m_for_original_pos = b_data.get('top_moves_9M_before_blunder', [])
+        engine_top_move_uci_original = None
+        if top_moves_9m_for_original_pos and isinstance(top_moves_9m_for_original_pos, list) and \
+           isinstance(top_moves_9m_for_original_pos[0], dict):
+            engine_top_move_uci_original = top_moves_9m_for_original_pos[0].get('uci')
+        blunder_status_from_tracker = self.learned_tracker.get_blunder_status(fen)
+        if blunder_status_from_tracker and engine_top_move_uci_original:
+            for attempt in blunder_status_from_tracker.get("attempts", []):
+                if attempt.get("uci") == engine_top_move_uci_original:
+                    return "solved_by_finding_engine_top_move"
+        return None
 
-        if not self.training_blunders and self.all_blunders_from_file:
-            logging.warning("No blunders meet the current training criteria after all filters.")
+    def _select_active_indices(self):
+        if self.show_only_unsolved:
+            if self._pending_solved_indices:
+                self._unsolved_indices = [i for i in self._unsolved_indices if i not in self._pending_solved_indices]
+                self._unsolved_index_set -= self._pending_solved_indices
+                self._pending_solved_indices = set()
+            self._active_indices = self._unsolved_indices
+        else:
+            self._active_indices = self._all_indices
 
     def record_attempt_for_current_blunder(self, attempted_uci: str, pwin_after_attempt: float, is_solved_this_attempt: bool):
         current_blunder = self.get_current_blunder()
@@ -122,41 +150,69 @@ class BlunderDataManager:
             original_drop = current_blunder['p_win_drop_9M']
             self.learned_tracker.record_attempt(fen, original_uci, original_drop,
                                                 attempted_uci, pwin_after_attempt, is_solved_this_attempt)
-            # No dynamic removal from self.training_blunders here. Filter is applied at load time.
+            self.learned_tracker.save_progress() # Debounced: a burst of attempts becomes one write off the Tk thread
+            # No dynamic removal from the active view here, so the running session list stays stable.
+            # The blunder leaves the unsolved view the next time that view is selected.
+            eligible_idx = self._active_indices[self.current_index]
+            if eligible_idx in self._unsolved_index_set and self._get_solved_reason(current_blunder) is not None:
+                self._pending_solved_indices.add(eligible_idx)
+
+    def save_learning_progress(self, debounce: float = 2.0):
+        self.learned_tracker.save_progress(debounce=debounce)
+
+    def discard_pending_learning_save(self):
+        self.learned_tracker.discard_pending_save()
 
-    def save_learning_progress(self):
-        self.learned_tracker.save_progress()
+    def has_unsaved_learning_progress(self) -> bool:
+        return self.learned_tracker.has_unsaved_changes
 
     def set_show_only_unsolved(self, show_unsolved: bool):
         if self.show_only_unsolved != show_unsolved:
             self.show_only_unsolved = show_unsolved
             self.current_index = -1 # Reset index
-            self._filter_and_sort_training_blunders() # Re-apply all filters
+            self._select_active_indices() # Swap views; no refiltering
             logging.info(f"Filter 'show_only_unsolved' changed to {self.show_only_unsolved}. "
-                         f"Refiltered. {len(self.training_blunders)} blunders now available for training.")
+                         f"{len(self._active_indices)} blunders now available for training.")
+
+    @property
+    def training_blunders(self) -> list:
+        # Blunders in the active view, materialized on demand
+        return [self.eligible_blunders[i] for i in self._active_indices]
 
     def get_current_blunder(self):
-        if 0 <= self.current_index < len(self.training_blunders):
-            return self.training_blunders[self.current_index]
+        if 0 <= self.current_index < len(self._active_indices):
+            return self.eligible_blunders[self._active_indices[self.current_index]]
         return None
 
     def next_blunder(self):
-        if self.training_blunders: # Check if the list is not empty
-            self.current_index = (self.current_index + 1) % len(self.training_blunders)
+        if self._active_indices: # Check if the view is not empty
+            self.current_index = (self.current_index + 1) % len(self._active_indices)
         else:
             self.current_index = -1 # No blunders to cycle through
 
     def prev_blunder(self):
-        if self.training_blunders: # Check if the list is not empty
-            self.current_index = (self.current_index - 1 + len(self.training_blunders)) % len(self.training_blunders)
+        if self._active_indices: # Check if the view is not empty
+            self.current_index = (self.current_index - 1 + len(self._active_indices)) % len(self._active_indices)
         else:
             self.current_index = -1
 
+    def get_neighbor_blunder_fens(self, offsets=(1, 2, -1)) -> list:
+        # FENs of blunders around the cursor (wrapping like next/prev), used for eval prefetch.
+        count = len(self._active_indices)
+        if count == 0 or self.current_index < 0:
+            return []
+        fens = []
+        for offset in offsets:
+            fen = self.eligible_blunders[self._active_indices[(self.current_index + offset) % count]]['fen_before_blunder']
+            if fen not in fens:
+                fens.append(fen)
+        return fens
+
     def has_blunders(self):
-        return len(self.training_blunders) > 0
+        return len(self._active_indices) > 0
 
     def get_blunder_count(self):
-        return len(self.training_blunders)
+        return len(self._active_indices)
 
     def get_current_index_display(self):
         return self.current_index + 1 if self.has_blunders() else 0
@@ -1,5 +1,7 @@
 # ===== START OF FILE blunder_trainer_controller.py =====
 import chess
+import collections
+import concurrent.futures
 import logging
 import chess_draw_utils # Ensure this is present
 from utils import pwin_to_cp, format_score_for_display # Ensure utils.py is present
@@ -24,6 +26,8 @@ _num_136m_hint_colors = len(ENGINE_136M_HINT_COLORS)
 ENGINE_136M_ARROW_WIDTHS = [max(1, ARROW_WIDTH_BASE - j) for j in range(_num_136m_hint_colors)]
 if not ENGINE_136M_ARROW_WIDTHS: ENGINE_136M_ARROW_WIDTHS = [ARROW_WIDTH_BASE]
 
+EVAL_CACHE_MAXSIZE = 256 # Live 9M top-move evaluations kept per FEN (LRU)
+
 
 class BlunderTrainerController:
     def __init__(self, board_widget, feedback_panel, data_manager, engine_manager,
@@ -41,6 +45,11 @@ class BlunderTrainerController:
         self.show_hints_in_play_mode_var_tk = None
         self.display_scores_as_cp = True
 
+        # Live 9M top-move lookups run on a single worker so neighbouring blunders can be prefetched
+        # while the user thinks. The cache maps FEN -> Future and is only touched from the Tk thread.
+        self._eval_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="blunder-eval")
+        self._eval_cache: collections.OrderedDict[str, concurrent.futures.Future] = collections.OrderedDict()
+
         self.board_widget.on_move_attempted_callback = self._handle_user_move_attempt
 
     def set_show_hints_in_play_mode_var(self, tk_bool_var):
@@ -122,6 +131,36 @@ class BlunderTrainerController:
             self.board_widget.redraw_pieces_only()
             self.board_widget.draw_arrow(self.current_blunder_data_active['blunder_move_uci'], ACTUAL_BLUNDER_MOVE_COLOR, BLUNDER_ARROW_WIDTH)
 
+    def _compute_live_top_moves(self, fen: str) -> list:
+        return self.engine_manager.get_top_engine_moves_list(self.engine_manager.engine_9M, chess.Board(fen), num_moves=1)
+
+    def _live_top_moves_future(self, fen: str) -> concurrent.futures.Future:
+        future = self._eval_cache.get(fen)
+        if future is not None:
+            self._eval_cache.move_to_end(fen)
+            return future
+        future = self._eval_pool.submit(self._compute_live_top_moves, fen)
+        self._eval_cache[fen] = future
+        if len(self._eval_cache) > EVAL_CACHE_MAXSIZE:
+            self._eval_cache.popitem(last=False)
+        return future
+
+    def _get_live_top_moves(self, fen: str) -> list:
+        try:
+            return self._live_top_moves_future(fen).result()
+        except Exception as e:
+            logging.error(f"Controller: Live 9M evaluation failed for FEN {fen[:20]}...: {e}")
+            self._eval_cache.pop(fen, None)
+            return []
+
+    def prefetch_evals(self, fens):
+        if not self.engine_manager.engine_9M: return
+        for fen in fens:
+            self._live_top_moves_future(fen)
+
+    def shutdown(self):
+        self._eval_pool.shutdown(wait=False, cancel_futures=True)
+
     def _find_move_in_precalculated_list(self, uci_to_find: str, move_list: list):
         """Helper to find a move in a list of precalculated move dicts (checks top 3)."""
         if not move_list: return None
@@ -187,8 +226,8 @@ class BlunderTrainerController:
                     pwin_val_for_player_after_user_attempt = live_pwin_after_user_attempt
                 
                 # B) Get P(Win) of optimal move (according to live 9M engine) from original position
-                live_top_moves_optimal_list = self.engine_manager.get_top_engine_moves_list( # Renamed for clarity
-                    self.engine_manager.engine_9M, original_board_state.copy(), num_moves=1
+                live_top_moves_optimal_list = self._get_live_top_moves( # Usually already prefetched
+                    self.current_blunder_data_active['fen_before_blunder']
                 )
                 live_pwin_optimal_from_engine = None
                 if live_top_moves_optimal_list and 'p_win' in live_top_moves_optimal_list[0]:
@@ -414,7 +453,7 @@ class BlunderTrainerController:
            not self.engine_manager.engine_9M:
             if self.board_for_play_mode: self._transition_to_mode("playing_from_blunder_player_turn")
             return
-        top_moves = self.engine_manager.get_top_engine_moves_list(self.engine_manager.engine_9M, self.board_for_play_mode.copy(), num_moves=1)
+        top_moves = self.engine_manager.get_top_engine_moves_list(self.engine_manager.engine_9M, self.board_for_play_mode, num_moves=1)
         if top_moves:
             engine_move_obj = self.board_for_play_mode.parse_uci(top_moves[0]['uci'])
             self.board_for_play_mode.push(engine_move_obj)
@@ -537,7 +576,7 @@ class BlunderTrainerController:
         current_player_in_play_mode = self.board_for_play_mode.turn
         score_unit_label = "Eval (pawns, White's persp.)" if self.display_scores_as_cp else f"P(Win for {chess.COLOR_NAMES[current_player_in_play_mode]})"
 
-        top_moves = self.engine_manager.get_top_engine_moves_list(self.engine_manager.engine_9M, self.board_for_play_mode.copy(), num_moves=3)
+        top_moves = self.engine_manager.get_top_engine_moves_list(self.engine_manager.engine_9M, self.board_for_play_mode, num_moves=3)
         if top_moves:
             for i, move_info in enumerate(top_moves):
                 p_win_for_mover = move_info['p_win']
@@ -29,9 +29,12 @@ class ChessBoardWidget:
 
         self.on_move_attempted_callback = None
 
-        self.piece_images = {}
+        self.piece_images = {} # PhotoImages, used for the dragged piece
+        self.piece_pil_images = {} # PIL images composited into the board image
+        self._board_photo_image = None # Keeps the composite PhotoImage alive
+        self._piece_image_pyramid = None # Optional {(piece_key, size): PhotoImage} from cdu.preload_piece_images
+        self._pyramid_sizes = ()
         self._create_canvas() 
-        cdu.draw_board_squares(self.canvas, self.white_at_bottom, self.square_size_px)
         self._load_piece_images()
         self._setup_event_bindings()
         self.redraw_board_and_pieces()
@@ -49,10 +52,25 @@ class ChessBoardWidget:
     def _load_piece_images(self):
         if self.square_size_px <=0:
             self.piece_images = {}
+            self.piece_pil_images = {}
             return
+        if self._piece_image_pyramid:
+            # Snap to a pre-scaled size instead of resampling for every new square size
+            piece_size_px = cdu.snap_to_pyramid_size(self._pyramid_sizes, self.square_size_px)
+            self.piece_images = {piece_key: photo_img for (piece_key, size), photo_img in self._piece_image_pyramid.items() if size == piece_size_px}
+            self.piece_pil_images = cdu.load_and_resize_piece_pil_images(self.image_path, piece_size_px)
+            return
+        self.piece_pil_images = cdu.load_and_resize_piece_pil_images(
+            self.image_path, self.square_size_px)
         self.piece_images = cdu.load_and_resize_piece_images(
             self.image_path, self.square_size_px)
 
+    def set_piece_image_pyramid(self, piece_image_pyramid: dict):
+        self._piece_image_pyramid = piece_image_pyramid
+        self._pyramid_sizes = tuple(sorted({size for _, size in piece_image_pyramid}))
+        self._load_piece_images()
+        self.redraw_board_and_pieces()
+
     def _setup_event_bindings(self):
         self.canvas.bind("<ButtonPress-1>", self._on_mouse_down)
         self.canvas.bind("<B1-Motion>", self._on_mouse_drag)
@@ -63,13 +81,14 @@ class ChessBoardWidget:
         self.board = board_object
         self.redraw_board_and_pieces()
 
-    def set_position(self, fen: str):
-        self.board = chess.Board(fen, chess960=self.board.chess960) 
+    def set_position(self, position: str | chess.Board):
+        # A Board is shown as-is (the widget never mutates it), so callers holding parsed boards skip the FEN parse
+        if isinstance(position, chess.Board): self.board = position
+        else: self.board = chess.Board(position, chess960=self.board.chess960) 
         self.redraw_board_and_pieces()
 
     def flip_board_orientation(self, redraw_now=True): 
         self.white_at_bottom = not self.white_at_bottom
-        cdu.draw_board_squares(self.canvas, self.white_at_bottom, self.square_size_px)
         if redraw_now:
             self.redraw_board_and_pieces()
 
@@ -87,9 +106,11 @@ class ChessBoardWidget:
         
         square_to_skip_drawing = self.drag_info["from_sq"] if self.drag_info["is_dragging"] else None
         
-        cdu.draw_pieces(self.canvas, self.board.fen(), self.piece_images,
-                       self.white_at_bottom, self.square_size_px,
-                       square_to_skip_drawing=square_to_skip_drawing)
+        # Squares and pieces are one Pillow-composited image; arrows/highlights/text stay canvas items above it
+        self._board_photo_image = cdu.draw_composite_board(
+            self.canvas, self.board.fen(), self.piece_pil_images,
+            self.white_at_bottom, self.square_size_px,
+            square_to_skip_drawing=square_to_skip_drawing)
 
     def redraw_pieces_only(self): 
         self.redraw_board_and_pieces()
@@ -257,7 +278,6 @@ class ChessBoardWidget:
             self.canvas.config(width=self.board_size_px, height=self.board_size_px)
 
             self._load_piece_images()
-            cdu.draw_board_squares(self.canvas, self.white_at_bottom, self.square_size_px)
             self.redraw_board_and_pieces() 
 
             if self.on_resize_callback:
@@ -2,23 +2,33 @@
 import tkinter as tk
 import chess
 import logging
-from PIL import Image, ImageTk
+from PIL import Image, ImageDraw, ImageTk
 import os
 import math
+import functools
 
 from constants import (
     MIN_BOARD_SIZE_PX,
     HINT_SCORE_FONT_FAMILY, HINT_SCORE_FONT_WEIGHT, HINT_SCORE_TEXT_COLOR,
     PIECE_IMAGE_FILENAMES,
-    LIGHT_SQUARE_COLOR, DARK_SQUARE_COLOR
+    LIGHT_SQUARE_COLOR, DARK_SQUARE_COLOR,
+    PIECE_IMAGE_SIZE_PYRAMID
 )
 
 # --- Coordinate Conversion Utilities ---
+@functools.lru_cache(maxsize=8)
+def square_rects_oriented(board_orientation_white_pov: bool, current_square_size_px: int) -> tuple:
+    # (x0, y0, x1, y1) for all 64 squares, built once per (orientation, square size) instead of per call
+    rects = []
+    for sq in chess.SQUARES:
+        file = chess.square_file(sq); rank = chess.square_rank(sq)
+        if not board_orientation_white_pov: file = 7 - file; rank = 7 - rank
+        x0 = file * current_square_size_px; y0 = (7 - rank) * current_square_size_px
+        rects.append((x0, y0, x0 + current_square_size_px, y0 + current_square_size_px))
+    return tuple(rects)
+
 def sq_to_canvas_coords_oriented(sq: chess.Square, board_orientation_white_pov: bool, current_square_size_px: int):
-    file = chess.square_file(sq); rank = chess.square_rank(sq)
-    if not board_orientation_white_pov: file = 7 - file; rank = 7 - rank
-    x0 = file * current_square_size_px; y0 = (7 - rank) * current_square_size_px
-    return x0, y0, x0 + current_square_size_px, y0 + current_square_size_px
+    return square_rects_oriented(board_orientation_white_pov, current_square_size_px)[sq]
 
 def canvas_coords_to_sq_oriented(canvas_x: int, canvas_y: int, board_orientation_white_pov: bool, current_board_size_px: int, current_square_size_px: int) -> chess.Square | None:
     if not (0 <= canvas_x < current_board_size_px and 0 <= canvas_y < current_board_size_px): return None
@@ -52,6 +62,50 @@ def draw_pieces(canvas: tk.Canvas, board_fen: str, resized_photo_images: dict,
                 x0_sq_c, y0_sq_c, _, _ = sq_to_canvas_coords_oriented(sq, board_orientation_white_pov, current_square_size_px)
                 canvas.create_image(x0_sq_c + current_square_size_px / 2, y0_sq_c + current_square_size_px / 2, image=photo_img, tags="piece")
 
+# --- Pillow Composite Rendering (squares + pieces as one canvas image) ---
+@functools.lru_cache(maxsize=8)
+def render_board_squares_image(board_orientation_white_pov: bool, current_square_size_px: int) -> Image.Image:
+    board_size = current_square_size_px * 8
+    img = Image.new("RGBA", (board_size, board_size), LIGHT_SQUARE_COLOR)
+    draw = ImageDraw.Draw(img)
+    for r_gui in range(8):
+        for f_gui in range(8):
+            chess_r_for_color, chess_f_for_color = (7-r_gui,f_gui) if board_orientation_white_pov else (r_gui,7-f_gui)
+            if (chess_r_for_color + chess_f_for_color) % 2 == 0:
+                x0_c, y0_c = f_gui*current_square_size_px, r_gui*current_square_size_px
+                draw.rectangle((x0_c, y0_c, x0_c+current_square_size_px-1, y0_c+current_square_size_px-1), fill=DARK_SQUARE_COLOR)
+    return img
+
+def compose_board_image(board_fen: str, resized_pil_images: dict,
+                        board_orientation_white_pov: bool, current_square_size_px: int,
+                        square_to_skip_drawing: chess.Square | None = None) -> Image.Image:
+    img = render_board_squares_image(board_orientation_white_pov, current_square_size_px).copy()
+    current_board = chess.Board(board_fen)
+    square_rects = square_rects_oriented(board_orientation_white_pov, current_square_size_px)
+    for sq, piece in current_board.piece_map().items():
+        if sq == square_to_skip_drawing: continue
+        piece_img = resized_pil_images.get((piece.piece_type, piece.color))
+        if piece_img:
+            x0_sq_c, y0_sq_c, _, _ = square_rects[sq]
+            inset = (current_square_size_px - piece_img.width) // 2 # Pyramid-snapped pieces can be smaller than the square
+            img.alpha_composite(piece_img, (x0_sq_c + inset, y0_sq_c + inset))
+    return img
+
+def draw_composite_board(canvas: tk.Canvas, board_fen: str, resized_pil_images: dict,
+                         board_orientation_white_pov: bool, current_square_size_px: int,
+                         square_to_skip_drawing: chess.Square | None = None):
+    """Blit squares and pieces as a single canvas image kept below all overlays. Returns the PhotoImage (caller must hold it)."""
+    img = compose_board_image(board_fen, resized_pil_images, board_orientation_white_pov,
+                              current_square_size_px, square_to_skip_drawing)
+    photo_img = ImageTk.PhotoImage(img)
+    board_items = canvas.find_withtag("board_image")
+    if board_items:
+        canvas.itemconfig(board_items[0], image=photo_img)
+    else:
+        canvas.create_image(0, 0, image=photo_img, anchor="nw", tags="board_image")
+    canvas.tag_lower("board_image")
+    return photo_img
+
 def draw_arrow(canvas: tk.Canvas, uci_move: str, color: str, width: int, board_orientation_white_pov: bool, current_square_size_px: int):
     if len(uci_move) < 4: logging.warning(f"cdu: Invalid UCI (too short) for arrow: {uci_move}"); return # Added length check
     try:
@@ -142,19 +196,54 @@ def clear_all_dynamic_elements(canvas: tk.Canvas):
     tags_to_clear=["piece","arrow","highlight","possible_move_dot","hint_score_text","dragged_piece"]
     for tag in tags_to_clear: canvas.delete(tag)
 
-def load_and_resize_piece_images(base_image_path: str, target_square_size: int) -> dict:
+@functools.lru_cache(maxsize=None)
+def _open_piece_image(file_path: str) -> Image.Image:
+    return Image.open(file_path).convert("RGBA")
+
+@functools.lru_cache(maxsize=128) # Room for 12 pieces x every PIECE_IMAGE_SIZE_PYRAMID size
+def _scaled_piece(file_path: str, size: int) -> Image.Image:
+    # Keyed by (file, square size) so resizing back to a previously seen size skips the resample
+    return _open_piece_image(file_path).resize((size,size),Image.LANCZOS)
+
+@functools.lru_cache(maxsize=128)
+def _scaled_piece_photo(file_path: str, size: int) -> ImageTk.PhotoImage:
+    return ImageTk.PhotoImage(_scaled_piece(file_path, size))
+
+def clear_piece_image_cache():
+    _scaled_piece_photo.cache_clear(); _scaled_piece.cache_clear(); _open_piece_image.cache_clear()
+
+def _load_piece_images_with(loader, base_image_path: str, target_square_size: int) -> dict:
     resized_images={};
     if target_square_size<=0: return resized_images
-    logging.info(f"cdu: Loading images from base: {os.path.abspath(base_image_path)} sz: {target_square_size}")
+    logging.debug(f"cdu: Loading images from base: {os.path.abspath(base_image_path)} sz: {target_square_size}")
     for (piece_type,color),filename in PIECE_IMAGE_FILENAMES.items():
         file_path=os.path.join(base_image_path,filename)
         try:
             if not os.path.exists(file_path): logging.warning(f"cdu: Not found: {file_path}"); continue
-            img=Image.open(file_path).convert("RGBA"); img_resized=img.resize((target_square_size,target_square_size),Image.LANCZOS)
-            resized_images[(piece_type,color)]=ImageTk.PhotoImage(img_resized)
+            resized_images[(piece_type,color)]=loader(file_path, target_square_size)
         except Exception as e: logging.error(f"cdu: Err load/resize {file_path}: {e}")
     if not resized_images: logging.warning(f"cdu: No images loaded from {os.path.abspath(base_image_path)}.")
-    else: logging.info(f"cdu: Loaded/resized {len(resized_images)} images.")
+    else: logging.debug(f"cdu: Loaded/resized {len(resized_images)} images.")
     return resized_images
 
+def load_and_resize_piece_pil_images(base_image_path: str, target_square_size: int) -> dict:
+    return _load_piece_images_with(_scaled_piece, base_image_path, target_square_size)
+
+def load_and_resize_piece_images(base_image_path: str, target_square_size: int) -> dict:
+    return _load_piece_images_with(_scaled_piece_photo, base_image_path, target_square_size)
+
+def preload_piece_images(base_image_path: str, sizes=PIECE_IMAGE_SIZE_PYRAMID) -> dict:
+    """Scales every piece to every size up front. Returns {((piece_type, color), size): PhotoImage}."""
+    pyramid = {}
+    for size in sizes:
+        for piece_key, photo_img in load_and_resize_piece_images(base_image_path, size).items():
+            pyramid[(piece_key, size)] = photo_img
+    logging.debug(f"cdu: Preloaded {len(pyramid)} piece images for sizes {tuple(sizes)}.")
+    return pyramid
+
+def snap_to_pyramid_size(sizes, target_square_size: int) -> int:
+    """Largest pre-scaled size that fits in the square (smallest size if none fits)."""
+    fitting = [s for s in sizes if s <= target_square_size]
+    return max(fitting) if fitting else min(sizes)
+
 # ===== END OF FILE chess_draw_utils.py =====
@@ -18,6 +18,8 @@ PIECE_IMAGE_FILENAMES = {
     (chess.QUEEN, chess.WHITE): 'wQ.png', (chess.QUEEN, chess.BLACK): 'bQ.png',
     (chess.KING, chess.WHITE): 'wK.png', (chess.KING, chess.BLACK): 'bK.png',
 }
+# Piece sizes pre-scaled at startup; on resize the board snaps to the largest one that fits a square
+PIECE_IMAGE_SIZE_PYRAMID = (32, 40, 48, 56, 64, 72, 80, 96, 112, 128)
 
 # --- Board Colors ---
 LIGHT_SQUARE_COLOR = "#F0D9B5"
@@ -49,6 +51,12 @@ GRAPH_FIG_SIZE = (4, 2.5) # (width, height) in inches for the graph figure
 LOG_FORMAT = '%(asctime)s :: %(funcName)s :: line: %(lineno)d :: %(levelname)s :: %(message)s'
 LOG_FILENAME = 'chess_analyzer_gui.log'
 
+# --- Analysis Cache ---
+EVAL_CACHE_FILENAME = 'pgn_eval_cache.sqlite3'
+# The analyzer runs an int8 136M and re-checks near-threshold blunders with a float32 136M loaded alongside it
+# (a second copy of the 136M weights). Set to False to grade from the int8 136M alone.
+RECHECK_BLUNDERS_AT_FULL_PRECISION = True
+
 # --- Game Defaults ---
 DEFAULT_PLAYER_NAME_TO_TRACK = "simsim314" # Your default player name
 DEFAULT_PLAYER_SIDE = chess.WHITE
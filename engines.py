@@ -3,39 +3,80 @@
 import chess
 import numpy as np
 import logging
+import collections
+import threading
+import concurrent.futures
 
 try:
     from searchless_chess.src.engines import constants as engine_constants_module
     from searchless_chess.src.engines import neural_engines
     from searchless_chess.src.engines import engine as searchless_engine_module
+    from searchless_chess.src import utils as searchless_utils
     SEARCHLESS_ENGINES_AVAILABLE = True
 except ImportError as e:
     SEARCHLESS_ENGINES_AVAILABLE = False
     logging.critical(f"Failed to import searchless_chess components in engine_manager: {e}")
 
+ENGINE_PRECISION_FULL = 'float32'
+ENGINE_PRECISION_BF16 = 'bfloat16' # Both engines with bfloat16 parameters
+ENGINE_PRECISION_INT8 = 'int8' # 136M with int8 weight matrices, 9M with bfloat16 parameters
+ENGINE_PRECISIONS = (ENGINE_PRECISION_FULL, ENGINE_PRECISION_BF16, ENGINE_PRECISION_INT8)
+
+ANALYSIS_LRU_MAXSIZE = 4096 # Raw analyse() outputs kept in memory per (engine, FEN), ~15 KB each at most
+TOKENIZE_CACHE_MAXSIZE = 1024 # Tokenized (position, action) sequences per FEN, shared by both engines
+
+def _index_top_moves(top_moves):
+    return {move['uci']: (rank, move) for rank, move in enumerate(top_moves)}
+
+def _expected_action_pwins(log_probs, return_buckets_values):
+    """Expected P(win) per action from (num_actions, num_buckets) log-probs: one matrix-vector product, then renormalize."""
+    return_buckets_probs = np.exp(log_probs)
+    safe_sum = np.sum(return_buckets_probs, axis=1); safe_sum[safe_sum == 0] = 1e-9
+    return (return_buckets_probs @ return_buckets_values) / safe_sum
+
 
 class SearchlessEngineManager:
-    def __init__(self):
+    def __init__(self, precision: str = ENGINE_PRECISION_FULL):
+        if precision not in ENGINE_PRECISIONS: raise ValueError(f"Unknown engine precision '{precision}', expected one of {ENGINE_PRECISIONS}")
+        self.precision = precision
         self.engine_9M = None
         self.engine_136M = None
+        self.engine_136M_reference = None # Full-precision 136M, only loaded when load_engines is asked for it
+        self._model_id_9m = self._model_id_136m = None # EvalCache ids, including the precision each engine runs at
+        self._int8_head_136m = False # QUANTIZE_HEAD makes even a float32 136M approximate
+        self.eval_cache = None # Optional EvalCache consulted by evaluate_batch
+        self._batch_executor = None # Lazily created; one worker per engine so both forward passes overlap
+        self._analysis_lru: collections.OrderedDict[tuple, dict] = collections.OrderedDict() # (id(engine), fen) -> analyse() output
+        self._analysis_lru_lock = threading.Lock()
+        self._tokenize_cache: collections.OrderedDict[str, np.ndarray] = collections.OrderedDict() # fen -> (num_legal_moves, seq_len) neural_engines.SEQUENCE_DTYPE (int16)
+        self._tokenize_cache_lock = threading.Lock()
         if not SEARCHLESS_ENGINES_AVAILABLE:
             logging.warning("Searchless_chess library not available. Engines cannot be loaded.")
 
-    def load_engines(self, load_136m_flag: bool = True): # Parameter with default True
+    def load_engines(self, load_136m_flag: bool = True, quantize_136m_int8: bool | None = None, bf16_9m: bool | None = None,
+                     load_reference_136m: bool = False): # Parameter with default True
         """
         Loads the searchless_chess engines.
         By default, attempts to load both 9M and 136M engines.
         Set load_136m_flag to False to only attempt loading the 9M engine.
+        quantize_136m_int8 / bf16_9m override what the manager's precision would pick for that engine.
+        load_reference_136m also loads a full-precision 136M for get_reference_engine_136m when the 136M runs
+        at reduced precision. That is a second copy of the 136M weights, so callers opt in.
         """
+        bf16_136m = quantize_136m_int8 is None and self.precision == ENGINE_PRECISION_BF16
+        if quantize_136m_int8 is None: quantize_136m_int8 = self.precision == ENGINE_PRECISION_INT8
+        if bf16_9m is None: bf16_9m = self.precision in (ENGINE_PRECISION_BF16, ENGINE_PRECISION_INT8)
         if not SEARCHLESS_ENGINES_AVAILABLE:
             logging.error("Cannot load engines: searchless_chess components are not available.")
             return False # Indicate failure to load any engine
+        self.clear_analysis_cache() # Cached outputs belong to the engines being replaced
 
         loaded_9M_successfully = False
         if self.engine_9M is None: # Only load if not already loaded
             try:
-                logging.info("Attempting to load 9M engine...")
-                self.engine_9M = engine_constants_module.ENGINE_BUILDERS['9M']()
+                logging.info(f"Attempting to load 9M engine{' (bfloat16 weights)' if bf16_9m else ''}...")
+                self.engine_9M = engine_constants_module.ENGINE_BUILDERS['9M'](bf16_weights=bf16_9m)
+                self._model_id_9m = self._precision_model_id('9M', False, bf16_9m)
                 #self.engine_9M = engine_constants_module.ENGINE_BUILDERS['270M']()
                 logging.info("9M engine loaded successfully.")
                 loaded_9M_successfully = True
@@ -52,8 +93,10 @@ class SearchlessEngineManager:
             if self.engine_136M is None: # Only load if not already loaded
                 if '136M' in engine_constants_module.ENGINE_BUILDERS:
                     try:
-                        logging.info("Attempting to load 136M engine...")
-                        self.engine_136M = engine_constants_module.ENGINE_BUILDERS['136M']()
+                        logging.info(f"Attempting to load 136M engine{' (int8 weights)' if quantize_136m_int8 else (' (bfloat16 weights)' if bf16_136m else '')}...")
+                        self.engine_136M = engine_constants_module.ENGINE_BUILDERS['136M'](int8_weights=quantize_136m_int8, bf16_weights=bf16_136m)
+                        self._model_id_136m = self._precision_model_id('136M', quantize_136m_int8, bf16_136m)
+                        self._int8_head_136m = engine_constants_module.resolve_precision('136M', bf16_136m)[1]
                         logging.info("136M engine loaded successfully.")
                         loaded_136M_successfully = True
                     except KeyError: # Should be caught by 'in' check ideally
@@ -66,9 +109,11 @@ class SearchlessEngineManager:
                 logging.info("136M engine already loaded.")
                 loaded_136M_successfully = True # Considered successful if already there
         else:
-            self.engine_136M = None # Explicitly ensure 136M is None if flag is false
+            self.engine_136M = self.engine_136M_reference = None; self._model_id_136m = None; self._int8_head_136m = False # Explicitly ensure 136M is None if flag is false
             logging.info("136M engine loading intentionally skipped due to load_136m_flag=False.")
 
+        if load_reference_136m and loaded_136M_successfully: self._load_reference_engine_136m()
+
         # Determine overall success based on what was attempted and what succeeded
         if not loaded_9M_successfully:
             if load_136m_flag and not loaded_136M_successfully:
@@ -80,16 +125,201 @@ class SearchlessEngineManager:
         
         return True # At least 9M loaded, or 136M loaded if 9M failed but 136M was attempted
 
+    @property
+    def is_reduced_precision(self) -> bool:
+        return self.precision != ENGINE_PRECISION_FULL or self._int8_head_136m
+
+    @staticmethod
+    def _precision_model_id(model_name: str, int8_weights: bool, bf16_weights: bool) -> str:
+        """Model id for the EvalCache: the model plus the weight precision and int8 head, which all change its outputs."""
+        bf16_weights, int8_head = engine_constants_module.resolve_precision(model_name, bf16_weights)
+        weights = 'int8' if int8_weights else ('bfloat16' if bf16_weights else 'float32')
+        return f"{model_name}/{weights}" + ('/int8_head' if int8_head and not int8_weights else '')
+
+    def _load_reference_engine_136m(self):
+        if not self.is_reduced_precision:
+            logging.info("136M already runs at full precision; it doubles as the reference engine.")
+            return
+        if self.engine_136M_reference is not None: return
+        try:
+            logging.info("Loading full-precision 136M reference engine (a second copy of the 136M weights)...")
+            self.engine_136M_reference = engine_constants_module.ENGINE_BUILDERS['136M'](int8_weights=False, bf16_weights=False, int8_head=False)
+            logging.info("Full-precision 136M reference engine loaded successfully.")
+        except Exception as e:
+            logging.error(f"Failed to load full-precision 136M reference engine: {e}", exc_info=True)
+
+    def get_reference_engine_136m(self):
+        """
+        Full-precision 136M (float32, no int8 head) for re-checking close calls: engine_136M itself when it runs at full
+        precision, else the reference engine load_engines(load_reference_136m=True) loaded. Returns None if unavailable.
+        """
+        if not self.is_reduced_precision: return self.engine_136M
+        return self.engine_136M_reference
+
     def get_engine_analysis(self, engine_instance, board_state: chess.Board):
-            return engine_instance.analyse(board_state)
-        
+        """engine_instance.analyse(board_state), memoized per (engine, FEN) so transpositions and revisits are free."""
+        key = (id(engine_instance), board_state.fen())
+        with self._analysis_lru_lock:
+            analysis_output = self._analysis_lru.get(key)
+            if analysis_output is not None:
+                self._analysis_lru.move_to_end(key)
+                return analysis_output
+        analysis_output = engine_instance.analyse(board_state)
+        self._remember_analysis(engine_instance, [key[1]], [analysis_output])
+        return analysis_output
+
+    def _remember_analysis(self, engine_instance, fens, analysis_outputs):
+        with self._analysis_lru_lock:
+            for fen, analysis_output in zip(fens, analysis_outputs):
+                if analysis_output is None or fen is None: continue
+                key = (id(engine_instance), fen)
+                self._analysis_lru[key] = analysis_output
+                self._analysis_lru.move_to_end(key)
+            while len(self._analysis_lru) > ANALYSIS_LRU_MAXSIZE:
+                self._analysis_lru.popitem(last=False)
+
+    def clear_analysis_cache(self):
+        with self._analysis_lru_lock:
+            self._analysis_lru.clear()
+
+    def warm_up_engines(self):
+        """
+        Compiles every batch shape predict_fn pads to (PREDICT_BUCKET_SIZES, plus its unpadded batch of one) for each loaded engine, so device
+        setup and XLA compilation happen here (e.g. on a loading thread) instead of inside the user's first request.
+        """
+        start_board = chess.Board()
+        sequences = self._get_action_sequences(start_board, start_board.fen())
+        bucket_sizes = (1, *getattr(engine_constants_module, 'PREDICT_BUCKET_SIZES', (sequences.shape[0],)))
+        for engine_instance in (self.engine_9M, self.engine_136M, self.engine_136M_reference):
+            if not engine_instance: continue
+            try:
+                if not isinstance(engine_instance, neural_engines.ActionValueEngine):
+                    engine_instance.analyse(start_board); continue
+                for size in bucket_sizes: # The start position's rows, repeated to fill each bucket exactly
+                    engine_instance.predict_fn(np.resize(sequences, (size, sequences.shape[1])))
+            except Exception as e:
+                logging.warning(f"Engine warm-up failed (the first request will pay the compile cost): {e}")
+
+    def evaluate_batch(self, engine_instance, boards):
+        """
+        Analyses many positions with one predict_fn call instead of one call per position.
+        Returns a list aligned with `boards`; entries for positions without legal moves are None.
+        The outputs have the same shape as engine_instance.analyse(board), so they can be passed
+        as `analysis_output` to calculate_p_win_for_player / get_top_engine_moves_list.
+        """
+        if not engine_instance or not boards: return [None] * len(boards)
+        model_id = self._get_model_id(engine_instance) if self.eval_cache is not None else None
+        if model_id:
+            outputs = self.eval_cache.get_or_compute(model_id, boards, lambda missing: self._evaluate_batch_uncached(engine_instance, missing))
+        else:
+            outputs = self._evaluate_batch_uncached(engine_instance, boards)
+        # Prime the per-FEN cache, so later single-position queries on these boards (navigation, play mode) are free
+        self._remember_analysis(engine_instance, [output.get('fen') if output else None for output in outputs], outputs)
+        return outputs
+
+    def evaluate_batch_for_engines(self, engine_instances, boards, on_engine_done=None):
+        """
+        Runs evaluate_batch for several engines at once (XLA releases the GIL during the forward pass).
+        Returns one output list per engine, in the order given. on_engine_done(num_done) fires as each finishes.
+        """
+        futures = [self._get_batch_executor().submit(self.evaluate_batch, engine_instance, boards) for engine_instance in engine_instances]
+        for num_done, _ in enumerate(concurrent.futures.as_completed(futures), start=1):
+            if on_engine_done: on_engine_done(num_done)
+        return [future.result() for future in futures]
+
+    def top_moves_for_engines(self, engine_instances, board_state: chess.Board, num_moves=3):
+        """get_top_engine_moves_list for several engines on one position, with the engines running concurrently."""
+        futures = [self._get_batch_executor().submit(self.get_top_engine_moves_list, engine_instance, board_state, num_moves)
+                   for engine_instance in engine_instances]
+        return [future.result() for future in futures]
+
+    def _get_batch_executor(self):
+        if self._batch_executor is None:
+            self._batch_executor = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="engine_batch")
+        return self._batch_executor
+
+    def batch_top_moves(self, engine_instance, boards, num_moves=3, analysis_outputs=None, with_index=False):
+        """
+        get_top_engine_moves_list for many positions, backed by one evaluate_batch call.
+        Pass analysis_outputs (aligned with boards, e.g. from evaluate_batch_for_engines) to skip the network;
+        the boards are then taken to be games in progress, so the per-board game-over check is skipped too.
+        """
+        if analysis_outputs is None:
+            analysis_outputs = self.evaluate_batch(engine_instance, boards)
+            return [self.get_top_engine_moves_list(engine_instance, board, num_moves, analysis_output=output, with_index=with_index)
+                    for board, output in zip(boards, analysis_outputs)]
+        results = [self._get_top_moves_from_analysis_output(engine_instance, output, board, num_moves)
+                   for board, output in zip(boards, analysis_outputs)]
+        return [(top_moves, _index_top_moves(top_moves)) for top_moves in results] if with_index else results
+
+    def batch_pwin(self, engine_instance, boards, analysis_outputs=None):
+        """P(win) for the side to move in each of `boards`, backed by one evaluate_batch call (see batch_top_moves)."""
+        if analysis_outputs is None:
+            analysis_outputs = self.evaluate_batch(engine_instance, boards)
+            return [self.calculate_p_win_for_player(engine_instance, board, board.turn, analysis_output=output)
+                    for board, output in zip(boards, analysis_outputs)]
+        return [self._get_p_win_from_analysis_output(engine_instance, output, board, board.turn)
+                for board, output in zip(boards, analysis_outputs)]
+
+    def _get_model_id(self, engine_instance):
+        if engine_instance is self.engine_9M: return self._model_id_9m
+        if engine_instance is self.engine_136M: return self._model_id_136m
+        return None
+
+    def _evaluate_batch_uncached(self, engine_instance, boards):
+        if not isinstance(engine_instance, neural_engines.ActionValueEngine):
+            # Only the action-value engine has a flat (position, action) input we can stack.
+            return [self.get_engine_analysis(engine_instance, b) if any(b.legal_moves) else None for b in boards]
+
+        all_sequences = []
+        spans = [] # (start, stop) rows of the stacked tensor belonging to each board
+        num_rows = 0
+        fens = []
+        for board in boards:
+            fen = board.fen()
+            sequences = self._get_action_sequences(board, fen)
+            if sequences is None:
+                spans.append(None); fens.append(None); continue
+            fens.append(fen)
+            all_sequences.append(sequences)
+            spans.append((num_rows, num_rows + sequences.shape[0]))
+            num_rows += sequences.shape[0]
+        if not all_sequences: return [None] * len(boards)
+
+        log_probs = engine_instance.predict_fn(np.concatenate(all_sequences, axis=0))[:, -1]
+        return [{'log_probs': log_probs[span[0]:span[1]], 'fen': fen} if span else None
+                for fen, span in zip(fens, spans)]
+
+
+    def _get_action_sequences(self, board: chess.Board, fen: str):
+        """
+        One (tokenized FEN, action, dummy bucket) row per legal move, or None without legal moves.
+        Both models share the tokenizer, so a position analysed by one engine is not re-tokenized for the other.
+        """
+        with self._tokenize_cache_lock:
+            sequences = self._tokenize_cache.get(fen)
+            if sequences is not None:
+                self._tokenize_cache.move_to_end(fen)
+                return sequences
+        legal_moves = searchless_engine_module.get_ordered_legal_moves(board)
+        if not legal_moves: return None
+        tokenized_fen = neural_engines.tokenize_fixed_fen(fen)
+        legal_actions = searchless_utils.moves_to_actions(legal_moves)
+        sequences = np.empty((len(legal_moves), tokenized_fen.shape[0] + 2), dtype=neural_engines.SEQUENCE_DTYPE)
+        sequences[:, :-2] = tokenized_fen
+        sequences[:, -2] = legal_actions
+        sequences[:, -1] = 0 # Dummy return bucket
+        with self._tokenize_cache_lock:
+            self._tokenize_cache[fen] = sequences
+            while len(self._tokenize_cache) > TOKENIZE_CACHE_MAXSIZE:
+                self._tokenize_cache.popitem(last=False)
+        return sequences
 
     def _get_p_win_from_analysis_output(self, engine_instance, analysis_output, board_state: chess.Board, player_to_evaluate: chess.Color):
         if not analysis_output or not engine_instance: return 0.5
         if analysis_output.get('is_terminal'):
-            current_board_copy = board_state.copy() 
-            if current_board_copy.is_checkmate():
-                return 0.0 if current_board_copy.turn == player_to_evaluate else 1.0
+            if board_state.is_checkmate():
+                return 0.0 if board_state.turn == player_to_evaluate else 1.0
             return 0.5 
         log_probs_per_action_bucket = analysis_output.get('log_probs')
         if log_probs_per_action_bucket is None or \
@@ -104,11 +334,7 @@ class SearchlessEngineManager:
                 elif result == "0-1": return 0.0 if player_to_evaluate == chess.WHITE else 1.0
                 else: return 0.5
             return 0.5 
-        return_buckets_probs = np.exp(log_probs_per_action_bucket)
-        safe_sum = np.sum(return_buckets_probs, axis=1, keepdims=True)
-        safe_sum[safe_sum == 0] = 1e-9 
-        normalized_bucket_probs_per_action = return_buckets_probs / safe_sum
-        action_win_probabilities = np.sum(normalized_bucket_probs_per_action * engine_instance._return_buckets_values, axis=1)
+        action_win_probabilities = _expected_action_pwins(log_probs_per_action_bucket, engine_instance._return_buckets_values)
         p_win_for_player_to_move_on_board = np.max(action_win_probabilities) if len(action_win_probabilities) > 0 else 0.5
         if board_state.turn == player_to_evaluate:
             return float(p_win_for_player_to_move_on_board)
@@ -122,20 +348,18 @@ class SearchlessEngineManager:
         if log_probs is not None and log_probs.shape[0] > 0 and \
            hasattr(engine_instance, '_return_buckets_values') and \
            engine_instance._return_buckets_values is not None:
-            return_buckets_probs = np.exp(log_probs)
-            safe_sum = np.sum(return_buckets_probs, axis=1, keepdims=True); safe_sum[safe_sum == 0] = 1e-9
-            normalized_bucket_probs_per_action = return_buckets_probs / safe_sum
-            action_p_wins = np.sum(normalized_bucket_probs_per_action * engine_instance._return_buckets_values, axis=1)
-            legal_moves = searchless_engine_module.get_ordered_legal_moves(board_state.copy())
+            action_p_wins = _expected_action_pwins(log_probs, engine_instance._return_buckets_values)
+            legal_moves = searchless_engine_module.get_ordered_legal_moves(board_state) # Move generation is read-only
             if len(legal_moves) == len(action_p_wins):
-                moves_with_scores = []
-                temp_board_for_san = board_state.copy()
-                for i, move in enumerate(legal_moves):
+                # Rank on the score array, then build entries (and SAN, the costly part) for the top moves only.
+                # A stable sort keeps ties in legal-move order, as sorting the full list of dicts did.
+                top_indices = np.argsort(-action_p_wins, kind='stable')[:num_moves]
+                temp_board_for_san = board_state.copy(stack=False) # san() push/pops for the check suffix; no history needed
+                for i in top_indices:
+                    move = legal_moves[i]
                     try: san = temp_board_for_san.san(move)
                     except ValueError: san = move.uci() + " (SAN Error)"
-                    moves_with_scores.append({'san': san, 'uci': move.uci(), 'p_win': float(action_p_wins[i])})
-                moves_with_scores.sort(key=lambda x: x['p_win'], reverse=True)
-                top_moves_info = moves_with_scores[:num_moves]
+                    top_moves_info.append({'san': san, 'uci': move.uci(), 'p_win': float(action_p_wins[i])})
             else: logging.warning(f"Mismatched moves ({len(legal_moves)}) and p_wins ({len(action_p_wins)}) for FEN: {board_state.fen()}.")
         else: logging.warning(f"Could not get top moves: Missing data for FEN: {board_state.fen()}. AO: {analysis_output}")
         return top_moves_info
@@ -152,10 +376,16 @@ class SearchlessEngineManager:
             analysis_output = self.get_engine_analysis(engine_instance, current_board_copy)
         return self._get_p_win_from_analysis_output(engine_instance, analysis_output, current_board_copy, player_to_evaluate)
 
-    def get_top_engine_moves_list(self, engine_instance, board_state: chess.Board, num_moves=3, analysis_output=None):
-        if not engine_instance: return []
-        current_board_copy = board_state.copy()
-        if current_board_copy.is_game_over(claim_draw=True): return []
-        if analysis_output is None: 
-            analysis_output = self.get_engine_analysis(engine_instance, current_board_copy)
-        return self._get_top_moves_from_analysis_output(engine_instance, analysis_output, current_board_copy, num_moves)
+    def get_top_engine_moves_list(self, engine_instance, board_state: chess.Board, num_moves=3, analysis_output=None, with_index=False):
+        """
+        Read-only on board_state: all analysis runs on a private copy, so callers need not copy.
+        With with_index=True returns (top_moves, {uci: (rank, entry)}) so callers can look moves up by UCI.
+        """
+        top_moves = []
+        if engine_instance:
+            current_board_copy = board_state.copy()
+            if not current_board_copy.is_game_over(claim_draw=True):
+                if analysis_output is None:
+                    analysis_output = self.get_engine_analysis(engine_instance, current_board_copy)
+                top_moves = self._get_top_moves_from_analysis_output(engine_instance, analysis_output, current_board_copy, num_moves)
+        return (top_moves, _index_top_moves(top_moves)) if with_index else top_moves
@@ -0,0 +1,109 @@
+# ===== START OF FILE eval_cache.py =====
+import sqlite3
+import contextlib
+import struct
+import threading
+import logging
+
+import chess
+import numpy as np
+
+_CREATE_TABLE_SQL = "CREATE TABLE IF NOT EXISTS position_evals (model TEXT, key BLOB, rows INTEGER, log_probs BLOB, PRIMARY KEY (model, key))"
+_SCHEMA_VERSION = 2 # Stored as PRAGMA user_version; rows written under another key layout are dropped
+# Board._transposition_key(): 8 piece/colour bitboards, turn, castling bitboard, en passant square (or None),
+# then the halfmove clock and fullmove number, which the tokenizer also feeds to the model
+_KEY_STRUCT = struct.Struct("<9QBBII")
+_NO_EP_SQUARE = 255
+
+
+class EvalCache:
+    """
+    Persistent cache of raw engine analysis outputs (per-action bucket log-probs).
+    Entries are keyed by (model id, board._transposition_key() + move clocks), so repeated
+    positions and positions seen in earlier sessions skip the network entirely. The clocks are
+    part of the key because the model sees them too. The key tuple is read straight off the
+    board; it is only packed into bytes for sqlite.
+    All rows are read into memory by load(); new rows are only written to disk by flush().
+    """
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._entries = {} # (model_id, make_key(board)) -> float32 array of shape (num_legal_moves, num_buckets)
+        self._dirty_keys = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(board: chess.Board) -> tuple:
+        return (*board._transposition_key(), board.halfmove_clock, board.fullmove_number)
+
+    @staticmethod
+    def _pack_key(key: tuple) -> bytes:
+        *bitboards, turn, castling, ep_square, halfmove_clock, fullmove_number = key
+        return _KEY_STRUCT.pack(*bitboards, castling, turn, _NO_EP_SQUARE if ep_square is None else ep_square,
+                                halfmove_clock, fullmove_number)
+
+    @staticmethod
+    def _unpack_key(packed: bytes) -> tuple:
+        *bitboards, castling, turn, ep_square, halfmove_clock, fullmove_number = _KEY_STRUCT.unpack(packed)
+        return (*bitboards, bool(turn), castling, None if ep_square == _NO_EP_SQUARE else ep_square,
+                halfmove_clock, fullmove_number)
+
+    @staticmethod
+    def _ensure_schema(conn):
+        (version,) = conn.execute("PRAGMA user_version").fetchone()
+        if version != _SCHEMA_VERSION:
+            conn.execute("DROP TABLE IF EXISTS position_evals") # Older key layouts cannot be told apart from new ones
+            conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+        conn.execute(_CREATE_TABLE_SQL)
+
+    def load(self):
+        try:
+            with contextlib.closing(sqlite3.connect(self.filename)) as conn, conn:
+                self._ensure_schema(conn)
+                loaded = {}
+                for model_id, packed_key, rows, blob in conn.execute("SELECT model, key, rows, log_probs FROM position_evals"):
+                    loaded[(model_id, self._unpack_key(packed_key))] = np.frombuffer(blob, dtype=np.float32).reshape(rows, -1)
+            with self._lock:
+                self._entries.update(loaded)
+            logging.info(f"Eval cache: loaded {len(loaded)} entries from {self.filename}.")
+        except (sqlite3.Error, struct.error, ValueError) as e:
+            logging.error(f"Eval cache: could not load {self.filename}: {e}. Starting with an empty cache.")
+
+    def flush(self):
+        with self._lock:
+            pending = [(model_id, key, self._entries[(model_id, key)]) for model_id, key in self._dirty_keys]
+            self._dirty_keys.clear()
+        if not pending: return
+        try:
+            with contextlib.closing(sqlite3.connect(self.filename)) as conn, conn:
+                self._ensure_schema(conn)
+                conn.executemany("INSERT OR REPLACE INTO position_evals VALUES (?, ?, ?, ?)",
+                                 [(model_id, self._pack_key(key), arr.shape[0], arr.tobytes()) for model_id, key, arr in pending])
+            logging.info(f"Eval cache: wrote {len(pending)} new entries to {self.filename}.")
+        except sqlite3.Error as e:
+            logging.error(f"Eval cache: could not write {self.filename}: {e}")
+
+    def get_or_compute(self, model_id: str, boards, compute_fn):
+        """
+        Returns analysis outputs aligned with `boards`, calling compute_fn(missing_boards)
+        once for positions not yet cached. Duplicate positions in `boards` are computed only once.
+        """
+        keys = [self.make_key(b) for b in boards]
+        with self._lock:
+            cached = [self._entries.get((model_id, k)) for k in keys]
+        missing = {} # key -> board, first occurrence only
+        for board, key, log_probs in zip(boards, keys, cached):
+            if log_probs is None and key not in missing: missing[key] = board
+
+        if missing:
+            computed = compute_fn(list(missing.values()))
+            with self._lock:
+                for key, output in zip(missing.keys(), computed):
+                    if output is None: continue # Positions without legal moves are not worth storing
+                    self._entries[(model_id, key)] = np.asarray(output['log_probs'], dtype=np.float32)
+                    self._dirty_keys.add((model_id, key))
+                cached = [self._entries.get((model_id, k)) for k in keys]
+            logging.debug(f"Eval cache [{model_id}]: {len(boards) - len(missing)} hits, {len(missing)} computed.")
+
+        return [{'log_probs': log_probs, 'fen': board.fen()} if log_probs is not None else None
+                for board, log_probs in zip(boards, cached)]
+# ===== END OF FILE eval_cache.py =====
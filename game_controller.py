@@ -1,6 +1,7 @@
 # ===== START OF FILE game_controller.py =====
 import chess
 import logging
+import concurrent.futures
 from game_manager import GameManager
 from engines import SearchlessEngineManager 
 
@@ -26,6 +27,9 @@ class GameController:
         self.current_interaction_mode = "IDLE"
         self.show_hints_active = False 
         self.display_scores_as_cp = True 
+        # Engine moves are searched on this thread so the Tk mainloop keeps running during the forward pass
+        self._engine_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="engine_move")
+        self._pending_engine_move = None # Future of the move being searched; replaced or cleared to drop its result
 
         self.board_widget.on_move_attempted_callback = self._handle_user_move_attempt
         logging.info("GameController initialized.")
@@ -43,8 +47,42 @@ class GameController:
         if self.gui_update_buttons_callback and old_mode != new_mode:
             self.gui_update_buttons_callback()
         
+    def is_engine_thinking(self) -> bool:
+        return self._pending_engine_move is not None
+
+    def _request_engine_move(self, on_move):
+        """
+        Searches the engine move for the current position on the engine thread, then calls on_move(uci or None)
+        on the Tk thread. The search runs on a board copy; a result arriving after the game moved on is dropped.
+        """
+        if self.root is None: # No mainloop to hand the result back to
+            on_move(self.game_manager.get_engine_move_uci(self.engine_manager)); return
+        board, rep_counts = self.game_manager.get_search_snapshot() # Taken together, so the counts match the copy
+        future = self._engine_executor.submit(self.game_manager.get_engine_move_uci, self.engine_manager,
+                                              board=board, rep_counts=rep_counts)
+        self._pending_engine_move = future
+        future.add_done_callback(lambda f: self.root.after(0, self._finish_engine_move, f, on_move))
+
+    def _finish_engine_move(self, future, on_move):
+        if future is not self._pending_engine_move: return # Superseded by a new game, take-back or side swap
+        self._pending_engine_move = None
+        try:
+            engine_move_uci = future.result()
+        except Exception as e:
+            logging.error(f"GC: Engine move search failed: {e}", exc_info=True)
+            engine_move_uci = None
+        on_move(engine_move_uci)
+
+    def _drop_pending_engine_move(self):
+        self._pending_engine_move = None
+
+    def shutdown(self):
+        self._drop_pending_engine_move()
+        self._engine_executor.shutdown(wait=False, cancel_futures=True)
+
     def action_start_new_game(self, player_color: chess.Color = chess.WHITE):
         logging.info(f"GC: Action Start New Game received. Player as {chess.COLOR_NAMES[player_color]}.")
+        self._drop_pending_engine_move()
         self.game_manager.start_new_game(player_color=player_color, engine_instance=self.engine_manager.engine_9M)
         
         current_board_obj = self.game_manager.get_board_object()
@@ -107,15 +145,13 @@ class GameController:
     def _trigger_engine_move(self, for_specific_color: chess.Color | None = None):
         is_opponent_move = for_specific_color is None 
         if is_opponent_move and self.current_interaction_mode != "ENGINE_TURN": return
-        if not self.game_manager.is_active(): return
+        if not self.game_manager.is_active() or self.is_engine_thinking(): return
 
-        current_board_obj_for_engine = self.game_manager.get_board_object()
-        current_turn_color_on_board = current_board_obj_for_engine.turn
+        current_turn_color_on_board = self.game_manager.get_board_object().turn
         logging.info(f"GC: Triggering engine move for {chess.COLOR_NAMES[current_turn_color_on_board]}...")
-        if self.root: self.root.update_idletasks()
-
-        engine_move_uci = self.game_manager.get_engine_move_uci(self.engine_manager) # GameManager uses its own board
+        self._request_engine_move(lambda uci: self._apply_engine_move(uci, is_opponent_move, current_turn_color_on_board))
 
+    def _apply_engine_move(self, engine_move_uci: str | None, is_opponent_move: bool, current_turn_color_on_board: chess.Color):
         if engine_move_uci:
             self.game_manager.make_move_on_board(engine_move_uci) 
             self.board_widget.set_board(self.game_manager.get_board_object()) # Update widget with new board state
@@ -138,6 +174,7 @@ class GameController:
             self._redraw_all_visual_cues_for_current_state()
 
     def action_flip_board_view(self):
+        self._drop_pending_engine_move() # The side the engine was searching for may now be the player's
         if not self.game_manager.is_active() and self.current_interaction_mode == "IDLE":
             self.board_widget.flip_board_orientation(redraw_now=True)
             self._update_feedback_for_game_state() 
@@ -160,9 +197,12 @@ class GameController:
 
     def action_make_engine_move_for_player(self):
         if not self.game_manager.is_active() or self.current_interaction_mode != "PLAYER_TURN": return
-        if self.root: self.root.update_idletasks()
-        
-        engine_move_uci = self.game_manager.get_engine_move_uci(self.engine_manager)
+        # Engine turn while searching: the board is locked and the move buttons disabled until the move lands
+        self._transition_to_mode("ENGINE_TURN")
+        self._update_feedback_for_game_state()
+        self._request_engine_move(self._apply_engine_move_for_player)
+
+    def _apply_engine_move_for_player(self, engine_move_uci: str | None):
         if engine_move_uci:
             self.game_manager.make_move_on_board(engine_move_uci) 
             self.board_widget.set_board(self.game_manager.get_board_object())
@@ -174,6 +214,7 @@ class GameController:
                 else: self._trigger_engine_move()
             self._redraw_all_visual_cues_for_current_state()
         else:
+            self._transition_to_mode("PLAYER_TURN")
             self.feedback_panel.update_feedback("Engine couldn't find a move for you.") 
             self._redraw_all_visual_cues_for_current_state() 
 
@@ -181,6 +222,7 @@ class GameController:
         if not self.game_manager.has_moves_to_take_back():
             self.feedback_panel.update_feedback("No moves to take back.")
             return
+        self._drop_pending_engine_move()
         self.game_manager.take_back_move()
         self.board_widget.set_board(self.game_manager.get_board_object())
         
@@ -226,7 +268,7 @@ class GameController:
     def _display_current_hints(self):
         logging.debug("GC: _display_current_hints executing.")
         
-        board_for_hints = self.game_manager.get_board_object().copy() # Use a copy for engine analysis
+        board_for_hints = self.game_manager.get_board_object() # get_top_engine_moves_list analyses a private copy
         top_moves = self.engine_manager.get_top_engine_moves_list(
             self.engine_manager.engine_9M, board_for_hints, num_moves=3
         )
@@ -1,18 +1,36 @@
 # ===== START OF FILE game_manager.py =====
+import re
+from collections import Counter
 import chess
 # import logging # Ensure this is removed if present
 from engines import SearchlessEngineManager 
 from utils import setup_asymmetric_chess960
 
+# Cheap shape check so malformed GUI input is rejected without raising inside parse_uci
+_UCI_RE = re.compile(r'^[a-h][1-8][a-h][1-8][qrbn]?$')
+
+def _position_counts(board: chess.Board) -> Counter:
+    """Occurrences of each position in `board`'s history, replayed from its root."""
+    replay = board.root()
+    counts = Counter({replay._transposition_key(): 1})
+    for move in board.move_stack:
+        replay.push(move)
+        counts[replay._transposition_key()] += 1
+    return counts
+
 class GameManager:
+    __slots__ = ('board', 'player_color', 'current_engine_instance', '_is_game_active', '_rep_counts')
+
     def __init__(self):
         self.board: chess.Board = chess.Board(chess960=True) 
         self.player_color = chess.WHITE 
         self.current_engine_instance = None
         self._is_game_active = False
+        self._rep_counts: Counter = Counter({self.board._transposition_key(): 1}) # Occurrences of each position in this game
 
     def start_new_game(self, player_color: chess.Color = chess.WHITE, engine_instance = None):
         self.board = setup_asymmetric_chess960() 
+        self._rep_counts = Counter({self.board._transposition_key(): 1})
         self.player_color = player_color
         self.current_engine_instance = engine_instance
         self._is_game_active = True
@@ -20,6 +38,10 @@ class GameManager:
     def get_board_object(self) -> chess.Board:
         return self.board
 
+    def get_search_snapshot(self) -> tuple[chess.Board, Counter]:
+        """Board copy plus the matching repetition counts, for get_engine_move_uci off the GUI thread."""
+        return self.board.copy(), self._rep_counts.copy()
+
     def get_board_fen(self) -> str: 
         return self.board.fen()
 
@@ -37,6 +59,8 @@ class GameManager:
     def make_player_move(self, uci_move: str) -> bool:
         if not self.is_player_turn():
             return False
+        if not _UCI_RE.match(uci_move):
+            return False
         
         try:
             move = self.board.parse_uci(uci_move)
@@ -46,16 +70,24 @@ class GameManager:
         is_in_legal_moves = move in self.board.legal_moves
 
         if is_in_legal_moves: 
-            self.board.push(move)
+            self._push(move)
             return True
         else:
             return False
 
-    def get_engine_move_uci(self, engine_manager: SearchlessEngineManager, for_color: chess.Color | None = None) -> str | None:
+    def get_engine_move_uci(self, engine_manager: SearchlessEngineManager, for_color: chess.Color | None = None,
+                            board: chess.Board | None = None, rep_counts: Counter | None = None) -> str | None:
+        """
+        Engine move for the live board, or for `board` (a copy, when searching off the GUI thread) together with
+        `rep_counts`, the repetition counts taken with it (see get_search_snapshot).
+        """
         if not self._is_game_active or not self.current_engine_instance:
             return None
 
-        board_copy_for_analysis = self.board.copy()
+        # The engine manager copies before analysing, so the live board can be passed as-is.
+        # Repetition probes below push/pop on it and always restore the move stack.
+        if board is None: board, rep_counts = self.board, self._rep_counts
+        elif rep_counts is None: rep_counts = _position_counts(board)
         
         num_moves_to_consider_for_anti_draw = 5 
         ANTI_DRAW_P_WIN_THRESHOLD = 0.6 
@@ -63,7 +95,7 @@ class GameManager:
         is_model_engine_needing_anti_draw = self.current_engine_instance == engine_manager.engine_9M # Assuming engine_9M is the model
         
         top_moves_data = engine_manager.get_top_engine_moves_list(
-            self.current_engine_instance, board_copy_for_analysis, 
+            self.current_engine_instance, board, 
             num_moves=num_moves_to_consider_for_anti_draw if is_model_engine_needing_anti_draw else 1
         )
 
@@ -72,24 +104,17 @@ class GameManager:
 
         if is_model_engine_needing_anti_draw and len(top_moves_data) > 0: # Check len > 0 for safety
             original_top_move_info = top_moves_data[0]
-            original_top_move_obj = board_copy_for_analysis.parse_uci(original_top_move_info['uci'])
-            
-            board_if_top_move = board_copy_for_analysis.copy()
-            board_if_top_move.push(original_top_move_obj)
+            original_top_move_obj = board.parse_uci(original_top_move_info['uci'])
             
-            is_repetition_with_top_move = board_if_top_move.is_repetition(3)
+            is_repetition_with_top_move = self._repeats_after(original_top_move_obj, board, rep_counts)
 
             if is_repetition_with_top_move:
-                # Search for an alternative non-repeating move that meets the P(Win) threshold
-                for alternative_move_info in top_moves_data[1:]: # Skip the original top move
-                    alt_move_p_win = alternative_move_info.get('p_win', 0.0)
-                    if alt_move_p_win >= ANTI_DRAW_P_WIN_THRESHOLD:
-                        alt_move_obj = board_copy_for_analysis.parse_uci(alternative_move_info['uci'])
-                        board_if_alt_move = board_copy_for_analysis.copy()
-                        board_if_alt_move.push(alt_move_obj)
-                        if not board_if_alt_move.is_repetition(3):
-                            # Found a suitable non-repeating alternative
-                            return alternative_move_info['uci']
+                # top_moves_data is best first, so walk it once: stop below the threshold, return the first non-repeating move
+                for alt_move_info in top_moves_data[1:]:
+                    if alt_move_info.get('p_win', 0.0) < ANTI_DRAW_P_WIN_THRESHOLD: break
+                    if not self._repeats_after(board.parse_uci(alt_move_info['uci']), board, rep_counts):
+                        # Found a suitable non-repeating alternative
+                        return alt_move_info['uci']
                 # If no suitable non-repeating alternative found, fall back to the original top move
                 return original_top_move_info['uci']
             else:
@@ -101,13 +126,34 @@ class GameManager:
             return None
 
 
+    @staticmethod
+    def _repeats_after(move: chess.Move, board: chess.Board, rep_counts: Counter) -> bool:
+        # rep_counts counts the positions in `board`'s history; the probed position is one more occurrence
+        board.push(move)
+        try:
+            return rep_counts[board._transposition_key()] + 1 >= 3
+        finally:
+            board.pop()
+
+    def _push(self, move: chess.Move):
+        self.board.push(move)
+        self._rep_counts[self.board._transposition_key()] += 1
+
+    def _pop(self) -> chess.Move:
+        key = self.board._transposition_key()
+        self._rep_counts[key] -= 1
+        if not self._rep_counts[key]: del self._rep_counts[key]
+        return self.board.pop()
+
     def make_move_on_board(self, uci_move: str) -> bool: 
         if not self._is_game_active:
             return False
+        if not _UCI_RE.match(uci_move):
+            return False
         try:
             move = self.board.parse_uci(uci_move)
             if move in self.board.legal_moves: 
-                self.board.push(move)
+                self._push(move)
                 return True
             else: 
                 return False
@@ -139,16 +185,16 @@ class GameManager:
         return self._is_game_active
 
     def has_moves_to_take_back(self) -> bool:
-        return self._is_game_active and len(self.board.move_stack) > 0
+        return self._is_game_active and bool(self.board.move_stack)
 
     def take_back_move(self) -> bool:
         if not self.has_moves_to_take_back():
             return False
 
-        self.board.pop()
+        self._pop()
 
         if self.has_moves_to_take_back() and not self.is_player_turn():
-            self.board.pop()
+            self._pop()
         
         return True
 
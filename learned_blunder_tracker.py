@@ -1,13 +1,28 @@
 # ===== START OF FILE learned_blunder_tracker.py =====
+import atexit
+import copy
 import json
 import os
 import logging
+import threading
 import time
+import weakref
 from constants_blunder_trainer import JSON_ATTEMPT_KEY, JSON_SOLVED_9M_KEY, JSON_ATTEMPT_UCI_KEY, JSON_ATTEMPT_PWIN_AFTER_9M_KEY
 
 LEARNED_BLUNDERS_FILENAME = "learned_blunders_progress.json" # Ensure this is in constants_blunder_trainer or defined here
 
+_live_trackers = weakref.WeakSet() # Trackers whose pending debounced save is flushed at exit
+
+@atexit.register
+def _flush_all_pending_saves():
+    for tracker in list(_live_trackers): tracker.flush_pending_save()
+
 class LearnedBlunderTracker:
+    __slots__ = ('filename', 'learned_data', 'has_unsaved_changes', '_save_lock', '_write_lock', '_save_timer', '__weakref__')
+
+    # Parsed progress files keyed by (filepath, mtime, size); lets repeated trackers skip json.load.
+    _parse_cache: dict[tuple[str, float, int], dict] = {}
+
     def __init__(self, filename=LEARNED_BLUNDERS_FILENAME):
         self.filename = filename
         # Key: FEN_before_blunder (str)
@@ -19,8 +34,14 @@ class LearnedBlunderTracker:
         #    "original_p_win_drop_9M": float   # Store for reference
         # }
         self.learned_data = {}
-        self.has_unsaved_changes = False
+        self.has_unsaved_changes = False # Dirty bit: set by mutators, cleared by a completed save; never computed
+        # Saves are debounced onto a timer thread. _save_lock guards learned_data and the timer (held only
+        # for in-memory work, never for disk I/O); _write_lock keeps file writes in snapshot order.
+        self._save_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._save_timer: threading.Timer | None = None
         self._load_progress()
+        _live_trackers.add(self)
 
     def _get_filepath(self):
         if not os.path.isabs(self.filename):
@@ -36,9 +57,17 @@ class LearnedBlunderTracker:
         filepath = self._get_filepath()
         if os.path.exists(filepath):
             try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    self.learned_data = json.load(f)
-                logging.info(f"LearnedBlunderTracker: Loaded progress from {filepath} for {len(self.learned_data)} FENs.")
+                st = os.stat(filepath)
+                cache_key = (filepath, st.st_mtime, st.st_size)
+                cached = LearnedBlunderTracker._parse_cache.get(cache_key)
+                if cached is not None:
+                    self.learned_data = copy.deepcopy(cached)
+                    logging.info(f"LearnedBlunderTracker: Reused parsed progress for {filepath} ({len(self.learned_data)} FENs, file unchanged).")
+                else:
+                    with open(filepath, 'r', encoding='utf-8') as f:
+                        self.learned_data = json.load(f)
+                    LearnedBlunderTracker._parse_cache = {cache_key: copy.deepcopy(self.learned_data)}
+                    logging.info(f"LearnedBlunderTracker: Loaded progress from {filepath} for {len(self.learned_data)} FENs.")
             except json.JSONDecodeError:
                 logging.error(f"LearnedBlunderTracker: Error decoding JSON from {filepath}. Starting fresh.")
                 self.learned_data = {}
@@ -55,33 +84,34 @@ class LearnedBlunderTracker:
                        original_blunder_move_uci: str, original_p_win_drop_9M: float,
                        attempted_uci: str, pwin_after_attempt: float, is_solved_this_attempt: bool):
         """Records an attempt for a given blunder FEN."""
-        if fen_before_blunder not in self.learned_data:
-            self.learned_data[fen_before_blunder] = {
-                "attempts": [],
-                "is_marked_overall_solved": False,
-                "last_attempt_timestamp": None,
-                "original_blunder_move_uci": original_blunder_move_uci,
-                "original_p_win_drop_9M": original_p_win_drop_9M
-            }
+        with self._save_lock:
+            if fen_before_blunder not in self.learned_data:
+                self.learned_data[fen_before_blunder] = {
+                    "attempts": [],
+                    "is_marked_overall_solved": False,
+                    "last_attempt_timestamp": None,
+                    "original_blunder_move_uci": original_blunder_move_uci,
+                    "original_p_win_drop_9M": original_p_win_drop_9M
+                }
         
-        entry = self.learned_data[fen_before_blunder]
+            entry = self.learned_data[fen_before_blunder]
         
-        attempt_record = {
-            "uci": attempted_uci,
-            "pwin_after_9M": pwin_after_attempt,
-            "solved_criteria_met": is_solved_this_attempt,
-            "timestamp": time.time()
-        }
-        entry["attempts"].append(attempt_record)
-        entry["last_attempt_timestamp"] = time.time()
-
-        # Update overall solved status if this attempt solved it and it wasn't already solved
-        if is_solved_this_attempt and not entry["is_marked_overall_solved"]:
-            entry["is_marked_overall_solved"] = True
-            logging.info(f"LearnedBlunderTracker: FEN {fen_before_blunder[:20]}... marked as SOLVED.")
+            attempt_record = {
+                "uci": attempted_uci,
+                "pwin_after_9M": pwin_after_attempt,
+                "solved_criteria_met": is_solved_this_attempt,
+                "timestamp": time.time()
+            }
+            entry["attempts"].append(attempt_record)
+            entry["last_attempt_timestamp"] = time.time()
+
+            # Update overall solved status if this attempt solved it and it wasn't already solved
+            if is_solved_this_attempt and not entry["is_marked_overall_solved"]:
+                entry["is_marked_overall_solved"] = True
+                logging.info("LearnedBlunderTracker: FEN %.20s... marked as SOLVED.", fen_before_blunder)
             
-        self.has_unsaved_changes = True
-        logging.info(f"LearnedBlunderTracker: Recorded attempt for FEN {fen_before_blunder[:20]}...: {attempted_uci}, Solved this time: {is_solved_this_attempt}")
+            self.has_unsaved_changes = True
+            logging.info("LearnedBlunderTracker: Recorded attempt for FEN %.20s...: %s, Solved this time: %s", fen_before_blunder, attempted_uci, is_solved_this_attempt)
 
     def get_blunder_status(self, fen_before_blunder: str) -> dict | None:
         """Returns the learning status for a given FEN, or None."""
@@ -91,37 +121,79 @@ class LearnedBlunderTracker:
         status = self.get_blunder_status(fen_before_blunder)
         return status.get("is_marked_overall_solved", False) if status else False
 
-    def save_progress(self) -> bool:
+    def save_progress(self, debounce: float = 2.0) -> bool:
+        """Schedules a save after `debounce` seconds, coalescing bursts of calls into one write.
+
+        Pass debounce=0 to write synchronously (e.g. on application close).
+        """
         if not self.has_unsaved_changes:
             logging.info("LearnedBlunderTracker: No unsaved changes to save.")
             return True
-            
-        filepath = self._get_filepath()
-        try:
-            # Create directory if it doesn't exist
-            dir_name = os.path.dirname(filepath)
-            if dir_name and not os.path.exists(dir_name):
-                os.makedirs(dir_name)
-                logging.info(f"LearnedBlunderTracker: Created directory {dir_name}")
-
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(self.learned_data, f, indent=2)
-            logging.info(f"LearnedBlunderTracker: Saved progress to {filepath}.")
-            self.has_unsaved_changes = False
-            return True
-        except Exception as e:
-            logging.error(f"LearnedBlunderTracker: Error saving progress to {filepath}: {e}")
+        if debounce <= 0:
+            self._cancel_pending_save()
+            return self._save_now()
+
+        with self._save_lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+            self._save_timer = threading.Timer(debounce, self._save_now)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+        return True
+
+    def _cancel_pending_save(self) -> bool:
+        with self._save_lock:
+            timer, self._save_timer = self._save_timer, None
+        if timer is None:
             return False
+        timer.cancel()
+        return True
+
+    def discard_pending_save(self):
+        """Cancels a debounced save without writing (e.g. the user declined to save on close)."""
+        if self._cancel_pending_save():
+            logging.info("LearnedBlunderTracker: Discarded pending save.")
+
+    def flush_pending_save(self):
+        """Writes immediately if a debounced save is still pending. Called for every live tracker at exit."""
+        if self._cancel_pending_save():
+            self._save_now()
+
+    def _save_now(self) -> bool:
+        filepath = self._get_filepath()
+        with self._write_lock:
+            with self._save_lock:
+                self._save_timer = None
+                if not self.has_unsaved_changes:
+                    return True
+                snapshot = json.dumps(self.learned_data, indent=2) # Taken under the lock; written to disk outside it
+                self.has_unsaved_changes = False # Mutations from here on set it again
+            try:
+                # Create directory if it doesn't exist
+                dir_name = os.path.dirname(filepath)
+                if dir_name and not os.path.exists(dir_name):
+                    os.makedirs(dir_name)
+                    logging.info(f"LearnedBlunderTracker: Created directory {dir_name}")
+
+                with open(filepath, 'w', encoding='utf-8') as f:
+                    f.write(snapshot)
+                logging.info(f"LearnedBlunderTracker: Saved progress to {filepath}.")
+                return True
+            except Exception as e:
+                logging.error(f"LearnedBlunderTracker: Error saving progress to {filepath}: {e}")
+                with self._save_lock: self.has_unsaved_changes = True
+                return False
 
     def reset_blunder_solved_status(self, fen_before_blunder: str):
         """Allows un-solving a blunder for review."""
-        if fen_before_blunder in self.learned_data:
-            if self.learned_data[fen_before_blunder]["is_marked_overall_solved"]:
-                self.learned_data[fen_before_blunder]["is_marked_overall_solved"] = False
-                self.has_unsaved_changes = True
-                logging.info(f"LearnedBlunderTracker: Reset solved status for FEN {fen_before_blunder[:20]}...")
-        else:
-            logging.warning(f"LearnedBlunderTracker: Attempted to reset status for unknown FEN {fen_before_blunder[:20]}...")
+        with self._save_lock:
+            if fen_before_blunder in self.learned_data:
+                if self.learned_data[fen_before_blunder]["is_marked_overall_solved"]:
+                    self.learned_data[fen_before_blunder]["is_marked_overall_solved"] = False
+                    self.has_unsaved_changes = True
+                    logging.info(f"LearnedBlunderTracker: Reset solved status for FEN {fen_before_blunder[:20]}...")
+            else:
+                logging.warning(f"LearnedBlunderTracker: Attempted to reset status for unknown FEN {fen_before_blunder[:20]}...")
 
 
 # ===== END OF FILE learned_blunder_tracker.py =====
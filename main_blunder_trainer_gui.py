@@ -3,17 +3,52 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import os
 import sys
+import atexit
 import logging
+import logging.handlers
+import queue
+import threading
 
-from engines import SearchlessEngineManager, SEARCHLESS_ENGINES_AVAILABLE
+# engines (searchless_chess / JAX) and blunder_data_manager are imported lazily so the window paints first
 from constants import IMAGE_PATH, MIN_BOARD_SIZE_PX, DEFAULT_BOARD_SIZE_PX, LOG_FILENAME, LOG_FORMAT
 
 from chess_board_widget import ChessBoardWidget
-from blunder_data_manager import BlunderDataManager # Already imports LearnedBlunderTracker implicitly
+import chess_draw_utils as cdu
 from blunder_feedback_panel import BlunderFeedbackPanel
 from blunder_trainer_controller import BlunderTrainerController
+from widget_states import WidgetStates
+
+# Controller interaction mode -> (is_playing_mode, is_player_turn_in_play, is_showing_feedback_training,
+#                                 is_user_input_training, is_waiting_for_blunder)
+_MODE_FLAGS = {
+    "waiting_for_blunder":              (False, False, False, False, True),
+    "user_input":                       (False, False, False, True,  False),
+    "showing_feedback":                 (False, False, True,  False, False),
+    "playing_from_blunder_player_turn": (True,  True,  False, False, False),
+    "playing_from_blunder_engine_turn": (True,  False, False, False, False),
+    "playing_from_blunder_game_over":   (True,  False, False, False, False),
+}
+_NO_MODE_FLAGS = (False,) * 5
 
 class MainBlunderTrainerGUI:
+    # (frame title, stretch buttons, [(attribute, text, command method, checkbox variable attribute or None), ...])
+    _BUTTON_SPEC = (
+        ("Training Controls", True, (
+            ("next_blunder_btn", "Next", "_gui_action_next_blunder", None),
+            ("prev_blunder_btn", "Prev", "_gui_action_prev_blunder", None),
+            ("retry_attempt_btn", "Retry", "_gui_action_retry_current", None),
+        )),
+        ("Play Controls", True, (
+            ("play_from_blunder_btn", "Play vs Engine", "_gui_action_play_from_blunder", None),
+            ("return_to_training_btn", "Stop Play", "_gui_action_return_to_training", None),
+        )),
+        ("Options", False, (
+            ("flip_board_btn", "Flip Board", "_gui_action_flip_board", None),
+            ("show_hints_checkbox", "Show Hints", "_gui_action_toggle_hints", "show_hints_var_tk"),
+            ("filter_solved_checkbox", "Only Unsolved", "_gui_action_toggle_solved_filter", "show_only_unsolved_var_tk"),
+        )),
+    )
+
     def __init__(self, root_tk_window):
         self.root = root_tk_window
         self.root.title("Chess Blunder Trainer - Advanced") # Updated title
@@ -21,12 +56,16 @@ class MainBlunderTrainerGUI:
         self.root.grid_rowconfigure(0, weight=1)
         self.root.grid_columnconfigure(0, weight=1)
 
-        self.engine_manager = SearchlessEngineManager()
+        self.engine_manager = None # Created by the engine-load worker once the ML stack is imported
         # DataManager now instantiates LearnedBlunderTracker
+        from blunder_data_manager import BlunderDataManager # Already imports LearnedBlunderTracker implicitly
         self.data_manager = BlunderDataManager()
         self.controller = None
         self.show_hints_var_tk = tk.BooleanVar(value=False)
         self.show_only_unsolved_var_tk = tk.BooleanVar(value=True) # For new filter option
+        self._button_states = WidgetStates() # Last state pushed to each button
+        self._last_state_key = None # (mode, has_blunders, blunder_loaded) of the last button update
+        self._resize_after_id = None # Pending debounced resize relay, see handle_board_widget_resize_from_gui
 
         self._create_main_widgets_layout()
         self._initialize_application_logic()
@@ -40,52 +79,24 @@ class MainBlunderTrainerGUI:
         self.left_pane_frame = ttk.Frame(main_paned_window, padding=5)
         main_paned_window.add(self.left_pane_frame, weight=1)
 
-        # --- Top Controls (Nav, Retry, Play) ---
-        top_controls_frame = ttk.LabelFrame(self.left_pane_frame, text="Training Controls", padding=10)
-        top_controls_frame.pack(fill=tk.X, pady=(0,5), side=tk.TOP, anchor=tk.N)
-
-        self.next_blunder_btn = ttk.Button(top_controls_frame, text="Next",
-                                          command=self._gui_action_next_blunder)
-        self.next_blunder_btn.pack(side=tk.LEFT, padx=2, pady=2, fill=tk.X, expand=True)
-
-        self.prev_blunder_btn = ttk.Button(top_controls_frame, text="Prev",
-                                          command=self._gui_action_prev_blunder)
-        self.prev_blunder_btn.pack(side=tk.LEFT, padx=2, pady=2, fill=tk.X, expand=True)
-
-        self.retry_attempt_btn = ttk.Button(top_controls_frame, text="Retry",
-                                           command=self._gui_action_retry_current)
-        self.retry_attempt_btn.pack(side=tk.LEFT, padx=2, pady=2, fill=tk.X, expand=True)
-
-        # --- Play Controls ---
-        play_controls_frame = ttk.LabelFrame(self.left_pane_frame, text="Play Controls", padding=10)
-        play_controls_frame.pack(fill=tk.X, pady=(0,5), side=tk.TOP, anchor=tk.N)
-
-        self.play_from_blunder_btn = ttk.Button(play_controls_frame, text="Play vs Engine",
-                                           command=self._gui_action_play_from_blunder)
-        self.play_from_blunder_btn.pack(side=tk.LEFT, padx=2, pady=2, fill=tk.X, expand=True)
-
-        self.return_to_training_btn = ttk.Button(play_controls_frame, text="Stop Play",
-                                           command=self._gui_action_return_to_training)
-        self.return_to_training_btn.pack(side=tk.LEFT, padx=2, pady=2, fill=tk.X, expand=True)
-
-        # --- General Options (Flip, Hints, Filter) ---
-        options_frame = ttk.LabelFrame(self.left_pane_frame, text="Options", padding=10)
-        options_frame.pack(fill=tk.X, pady=(0,5), side=tk.TOP, anchor=tk.N)
-
-        self.flip_board_btn = ttk.Button(options_frame, text="Flip Board",
-                                          command=self._gui_action_flip_board)
-        self.flip_board_btn.pack(side=tk.LEFT, padx=2, pady=2)
-
-        self.show_hints_checkbox = ttk.Checkbutton(options_frame, text="Show Hints",
-                                                   variable=self.show_hints_var_tk,
-                                                   command=self._gui_action_toggle_hints)
-        self.show_hints_checkbox.pack(side=tk.LEFT, padx=5, pady=2)
-
-        self.filter_solved_checkbox = ttk.Checkbutton(options_frame, text="Only Unsolved",
-                                                      variable=self.show_only_unsolved_var_tk,
-                                                      command=self._gui_action_toggle_solved_filter)
-        self.filter_solved_checkbox.pack(side=tk.LEFT, padx=5, pady=2)
-
+        # Control frames are built from _BUTTON_SPEC; propagation is held off so pack resolves sizes once.
+        self.left_pane_frame.pack_propagate(False)
+        for frame_text, stretch_buttons, widget_specs in self._BUTTON_SPEC:
+            controls_frame = ttk.LabelFrame(self.left_pane_frame, text=frame_text, padding=10)
+            controls_frame.pack(fill=tk.X, pady=(0,5), side=tk.TOP, anchor=tk.N)
+            for attr_name, text, command_name, variable_attr in widget_specs:
+                if variable_attr is None:
+                    widget = ttk.Button(controls_frame, text=text, command=getattr(self, command_name))
+                    if stretch_buttons:
+                        widget.pack(side=tk.LEFT, padx=2, pady=2, fill=tk.X, expand=True)
+                    else:
+                        widget.pack(side=tk.LEFT, padx=2, pady=2)
+                else:
+                    widget = ttk.Checkbutton(controls_frame, text=text,
+                                             variable=getattr(self, variable_attr),
+                                             command=getattr(self, command_name))
+                    widget.pack(side=tk.LEFT, padx=5, pady=2)
+                setattr(self, attr_name, widget)
 
         self.feedback_panel_component = BlunderFeedbackPanel(self.left_pane_frame)
         # BlunderFeedbackPanel packs itself and should take remaining space in left_pane_frame
@@ -97,6 +108,8 @@ class MainBlunderTrainerGUI:
                                      relief=tk.SUNKEN, anchor=tk.W)
         status_bar_label.pack(fill=tk.X, side=tk.BOTTOM, pady=(5,0), ipady=2)
 
+        self.left_pane_frame.pack_propagate(True)
+
         # ... (Right pane setup remains the same) ...
         self.right_pane_frame = ttk.Frame(main_paned_window, padding=5)
         main_paned_window.add(self.right_pane_frame, weight=3)
@@ -112,57 +125,110 @@ class MainBlunderTrainerGUI:
         self.board_widget_component.frame.grid(row=0, column=0, sticky="nsew", padx=5, pady=5)
 
     def _initialize_application_logic(self):
-        # ... (Engine loading)
+        # Startup runs as a chain of after_idle stages; each sets the status bar and yields to Tk.
         self.status_bar_variable.set("Loading 9M Chess Engine...")
-        self.root.update_idletasks()
+        self.root.after_idle(lambda: self._init_step("load_engine"))
+
+    def _init_step(self, stage: str):
+        if stage == "load_engine":
+            self._kickoff_engine_load() # Continues in _on_engine_loaded once the worker finishes
+
+        elif stage == "load_blunders":
+            if not self.data_manager.load_blunders(): # This now loads and filters
+                # Scheduled, not inline, so init carries on while the warning waits for the user
+                self.root.after(0, lambda: messagebox.showwarning("Data Load Warning", "Could not load blunder data."))
+                self.status_bar_variable.set("Error: Blunder data not found.")
+                logging.warning("Blunder data not loaded or invalid.")
+            else:
+                logging.info(f"Blunder data loaded: {self.data_manager.get_blunder_count()} blunders for training session.")
+            self.root.after_idle(lambda: self._init_step("build_controller"))
+
+        elif stage == "build_controller":
+            self.controller = BlunderTrainerController(
+                board_widget=self.board_widget_component,
+                feedback_panel=self.feedback_panel_component,
+                data_manager=self.data_manager,
+                engine_manager=self.engine_manager,
+                gui_update_buttons_callback=self._update_gui_button_states
+            )
+            self.controller.set_show_hints_in_play_mode_var(self.show_hints_var_tk)
+            logging.info("BlunderTrainerController initialized.")
+
+            if self.data_manager.has_blunders():
+                self.data_manager.current_index = -1 # Start before the first
+                self.controller.action_select_next_blunder() # Load the first available blunder
+                self._prefetch_neighbor_evals()
+            else:
+                self.status_bar_variable.set("No blunders available for training with current filter.")
+                logging.info("No blunders available for training after initialization and filtering.")
+                self.controller.load_and_display_current_blunder() # Will show "No blunders" message
+
+            self._update_gui_button_states()
+
+    def _kickoff_engine_load(self):
+        # Model init is the dominant startup cost; run it off the Tk thread and poll for completion.
+        self._init_queue = queue.Queue()
+        self.engine_load_progressbar = ttk.Progressbar(self.left_pane_frame, mode="indeterminate")
+        self.engine_load_progressbar.pack(fill=tk.X, side=tk.BOTTOM, pady=(5,0))
+        self.engine_load_progressbar.start(10)
+        self._update_gui_button_states()
 
-        if not SEARCHLESS_ENGINES_AVAILABLE:
-             messagebox.showerror("Engine Error", "Searchless_chess library not found.")
-             logging.critical("Searchless_chess library not available during init.")
-             self.root.destroy()
-             return
+        threading.Thread(target=self._bg_load_engines, daemon=True).start()
+        self.root.after(30, self._drain_init_queue)
+
+    def _bg_load_engines(self):
+        # Worker thread: never touch Tk widgets here, only post to the queue.
+        try:
+            import engines as _eng # Deferred: pulls in searchless_chess and JAX
+            if not getattr(_eng, "SEARCHLESS_ENGINES_AVAILABLE", False):
+                self._init_queue.put(("unavailable", None))
+                return
+            engine_manager = _eng.SearchlessEngineManager()
+            engine_manager.load_engines(load_136m_flag=False)
+            self.engine_manager = engine_manager
+            self._init_queue.put(("ok", engine_manager.engine_9M))
+        except Exception as e:
+            self._init_queue.put(("err", e))
+
+    def _drain_init_queue(self):
+        try:
+            status, payload = self._init_queue.get_nowait()
+        except queue.Empty:
+            self.root.after(50, self._drain_init_queue)
+            return
 
-        self.engine_manager.load_engines(load_136m_flag=False)
+        self.engine_load_progressbar.stop()
+        self.engine_load_progressbar.destroy()
 
-        if not self.engine_manager.engine_9M:
-            messagebox.showerror("Engine Load Failed", "Could not load 9M chess engine.")
+        if status == "unavailable":
+            logging.critical("searchless_chess package not found or import failed. This is critical for engine functionality.")
+            self._show_fatal_error_and_close("Dependency Error",
+                                             "The 'searchless_chess' library components (engines) were not found or failed to import. "
+                                             "AI functionality will be unavailable. Please check your Python environment and the library installation.")
+            return
+        if status != "ok" or payload is None:
+            if status == "err":
+                logging.error(f"Engine load thread raised: {payload}", exc_info=payload)
             logging.critical("Failed to load 9M engine during init.")
-            self.root.destroy()
+            self._show_fatal_error_and_close("Engine Load Failed", "Could not load 9M chess engine.")
             return
+        self._on_engine_loaded(payload)
+
+    def _show_fatal_error_and_close(self, title: str, message: str):
+        # One scheduled callback: destroy only after the modal dialog returns, not from inside its event loop.
+        def _show_then_destroy():
+            messagebox.showerror(title, message)
+            self.root.destroy()
+        self.root.after(0, _show_then_destroy)
+
+    def _on_engine_loaded(self, engine):
         logging.info("9M Engine loaded for Blunder Trainer's live evaluations.")
         
         # Apply initial filter state to DataManager BEFORE loading blunders
         self.data_manager.set_show_only_unsolved(self.show_only_unsolved_var_tk.get())
 
         self.status_bar_variable.set("Loading blunder data...")
-        self.root.update_idletasks()
-
-        if not self.data_manager.load_blunders(): # This now loads and filters
-            messagebox.showwarning("Data Load Warning", "Could not load blunder data.")
-            self.status_bar_variable.set("Error: Blunder data not found.")
-            logging.warning("Blunder data not loaded or invalid.")
-        else:
-            logging.info(f"Blunder data loaded: {self.data_manager.get_blunder_count()} blunders for training session.")
-
-        self.controller = BlunderTrainerController(
-            board_widget=self.board_widget_component,
-            feedback_panel=self.feedback_panel_component,
-            data_manager=self.data_manager,
-            engine_manager=self.engine_manager,
-            gui_update_buttons_callback=self._update_gui_button_states
-        )
-        self.controller.set_show_hints_in_play_mode_var(self.show_hints_var_tk)
-        logging.info("BlunderTrainerController initialized.")
-
-        if self.data_manager.has_blunders():
-            self.data_manager.current_index = -1 # Start before the first
-            self.controller.action_select_next_blunder() # Load the first available blunder
-        else:
-            self.status_bar_variable.set("No blunders available for training with current filter.")
-            logging.info("No blunders available for training after initialization and filtering.")
-            self.controller.load_and_display_current_blunder() # Will show "No blunders" message
-
-        self._update_gui_button_states()
+        self.root.after_idle(lambda: self._init_step("load_blunders"))
 
     def _gui_action_toggle_solved_filter(self):
         if self.controller and self.data_manager:
@@ -187,9 +253,14 @@ class MainBlunderTrainerGUI:
 
     def _on_application_window_close(self):
         logging.info("Blunder Trainer GUI: Closing application.")
-        if self.data_manager and self.data_manager.learned_tracker.has_unsaved_changes:
+        if self.data_manager and self.data_manager.has_unsaved_learning_progress():
             if messagebox.askyesno("Unsaved Progress", "You have unsaved learning progress. Save now?"):
-                self.data_manager.save_learning_progress()
+                self.data_manager.save_learning_progress(debounce=0)
+            else:
+                self.data_manager.discard_pending_learning_save() # Otherwise the debounced save would still write at exit
+        if self.controller:
+            self.controller.shutdown()
+        cdu.clear_piece_image_cache() # Drop cached PhotoImages before their Tk root goes away
         self.root.destroy()
 
     # ... (other GUI actions and _update_gui_button_states need no major changes for this step,
@@ -223,11 +294,20 @@ class MainBlunderTrainerGUI:
     def _gui_action_next_blunder(self):
         if self.controller:
              self.controller.action_select_next_blunder()
+             self._prefetch_neighbor_evals()
         # Status message and button states are updated by controller and its callbacks
     
     def _gui_action_prev_blunder(self):
         if self.controller:
             self.controller.action_select_prev_blunder()
+            self._prefetch_neighbor_evals()
+
+    def _prefetch_neighbor_evals(self):
+        # The user mostly advances linearly: warm the shown blunder and its neighbours off-thread.
+        current = self.data_manager.get_current_blunder()
+        fens = [current['fen_before_blunder']] if current else []
+        fens += self.data_manager.get_neighbor_blunder_fens(offsets=(1, 2, -1))
+        self.controller.prefetch_evals(fens)
 
     def _gui_action_flip_board(self):
         if self.controller:
@@ -254,61 +334,70 @@ class MainBlunderTrainerGUI:
         # Button states updated by controller callback
 
     def handle_board_widget_resize_from_gui(self):
+        # Coalesce <Configure> storms from pane drags: only the last event in a 40 ms window redraws cues.
+        if self._resize_after_id is not None:
+            self.root.after_cancel(self._resize_after_id)
+        self._resize_after_id = self.root.after(40, self._flush_resize)
+
+    def _flush_resize(self):
+        self._resize_after_id = None
         if self.controller:
             self.controller.handle_board_resize()
-            logging.info("MainGUI: Relayed resize event to controller.")
+            logging.debug("MainGUI: Relayed resize event to controller.")
         else:
-            logging.warning("MainGUI: Resize event received, but controller not yet initialized.")
+            logging.debug("MainGUI: Resize event received, but controller not yet initialized.")
 
     def _update_gui_button_states(self):
-        if not hasattr(self, 'controller') or not self.controller:
-            if hasattr(self, 'next_blunder_btn'): self.next_blunder_btn.config(state=tk.DISABLED)
+        if not hasattr(self, 'controller') or not self.controller or self.engine_manager is None or self.engine_manager.engine_9M is None:
+            if hasattr(self, 'next_blunder_btn'): self._button_states.apply(self.next_blunder_btn, 'next', tk.DISABLED)
             # ... disable all other buttons ...
-            if hasattr(self, 'play_from_blunder_btn'): self.play_from_blunder_btn.config(state=tk.DISABLED)
-            if hasattr(self, 'return_to_training_btn'): self.return_to_training_btn.config(state=tk.DISABLED)
-            if hasattr(self, 'show_hints_checkbox'): self.show_hints_checkbox.config(state=tk.DISABLED)
-            if hasattr(self, 'filter_solved_checkbox'): self.filter_solved_checkbox.config(state=tk.DISABLED)
+            if hasattr(self, 'play_from_blunder_btn'): self._button_states.apply(self.play_from_blunder_btn, 'play', tk.DISABLED)
+            if hasattr(self, 'return_to_training_btn'): self._button_states.apply(self.return_to_training_btn, 'stop_play', tk.DISABLED)
+            if hasattr(self, 'show_hints_checkbox'): self._button_states.apply(self.show_hints_checkbox, 'hints', tk.DISABLED)
+            if hasattr(self, 'filter_solved_checkbox'): self._button_states.apply(self.filter_solved_checkbox, 'filter_solved', tk.DISABLED)
+            self._last_state_key = None
             return
 
         mode = self.controller.current_interaction_mode
         has_blunders_for_session = self.data_manager.has_blunders() # Based on current filter
         blunder_loaded_for_display = self.controller.current_blunder_data_active is not None
 
-        is_playing_mode = mode.startswith("playing_from_blunder")
-        is_player_turn_in_play = mode == "playing_from_blunder_player_turn"
-        is_showing_feedback_training = mode == "showing_feedback"
-        is_user_input_training = mode == "user_input"
-        is_waiting_for_blunder = mode == "waiting_for_blunder"
+        # Button states depend only on this triple; skip redundant callbacks from the controller
+        state_key = (mode, has_blunders_for_session, blunder_loaded_for_display)
+        if state_key == self._last_state_key:
+            return
+        self._last_state_key = state_key
+
+        (is_playing_mode, is_player_turn_in_play, is_showing_feedback_training,
+         is_user_input_training, is_waiting_for_blunder) = _MODE_FLAGS.get(mode, _NO_MODE_FLAGS)
         
         # Training navigation: Next/Prev enabled if not playing, and not in user_input mode (i.e., feedback shown or engine thinking for user)
         # And there must be blunders loaded in the current session list.
         can_navigate_training = has_blunders_for_session and not is_playing_mode and not is_user_input_training and not is_waiting_for_blunder
-        self.next_blunder_btn.config(state=tk.NORMAL if can_navigate_training else tk.DISABLED)
-        self.prev_blunder_btn.config(state=tk.NORMAL if can_navigate_training else tk.DISABLED)
+        self._button_states.apply(self.next_blunder_btn, 'next', tk.NORMAL if can_navigate_training else tk.DISABLED)
+        self._button_states.apply(self.prev_blunder_btn, 'prev', tk.NORMAL if can_navigate_training else tk.DISABLED)
         
         # Retry: if blunder is loaded for display and we are in feedback mode for training
-        self.retry_attempt_btn.config(state=tk.NORMAL if blunder_loaded_for_display and is_showing_feedback_training else tk.DISABLED)
+        self._button_states.apply(self.retry_attempt_btn, 'retry', tk.NORMAL if blunder_loaded_for_display and is_showing_feedback_training else tk.DISABLED)
 
         # Play vs Engine: if blunder is loaded for display and we are in feedback mode for training
-        self.play_from_blunder_btn.config(state=tk.NORMAL if blunder_loaded_for_display and is_showing_feedback_training else tk.DISABLED)
+        self._button_states.apply(self.play_from_blunder_btn, 'play', tk.NORMAL if blunder_loaded_for_display and is_showing_feedback_training else tk.DISABLED)
 
         # Stop Play: if currently in any play mode
-        self.return_to_training_btn.config(state=tk.NORMAL if is_playing_mode else tk.DISABLED)
+        self._button_states.apply(self.return_to_training_btn, 'stop_play', tk.NORMAL if is_playing_mode else tk.DISABLED)
 
         # Flip board: always enabled if a blunder is loaded for display OR if playing
-        self.flip_board_btn.config(state=tk.NORMAL if blunder_loaded_for_display or is_playing_mode else tk.DISABLED)
+        self._button_states.apply(self.flip_board_btn, 'flip', tk.NORMAL if blunder_loaded_for_display or is_playing_mode else tk.DISABLED)
 
         # Show Hints Checkbox: Enabled during player's turn in play mode, or when showing feedback in training.
-        self.show_hints_checkbox.config(state=tk.NORMAL if is_player_turn_in_play or is_showing_feedback_training else tk.DISABLED)
+        self._button_states.apply(self.show_hints_checkbox, 'hints', tk.NORMAL if is_player_turn_in_play or is_showing_feedback_training else tk.DISABLED)
         
         # Filter Solved Checkbox: Always enabled, unless actively playing.
-        self.filter_solved_checkbox.config(state=tk.NORMAL if not is_playing_mode else tk.DISABLED)
+        self._button_states.apply(self.filter_solved_checkbox, 'filter_solved', tk.NORMAL if not is_playing_mode else tk.DISABLED)
 
-        logging.debug(f"MainGUI: Buttons updated. Mode: {mode}, "
-                      f"Next: {self.next_blunder_btn.cget('state')}, Prev: {self.prev_blunder_btn.cget('state')}, "
-                      f"Retry: {self.retry_attempt_btn.cget('state')}, Flip: {self.flip_board_btn.cget('state')}, "
-                      f"Play: {self.play_from_blunder_btn.cget('state')}, StopPlay: {self.return_to_training_btn.cget('state')}, "
-                      f"HintsChk: {self.show_hints_checkbox.cget('state')}, FilterSolvedChk: {self.filter_solved_checkbox.cget('state')}")
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            # Read back from the state cache rather than cget() so logging costs no Tcl round-trips
+            logging.debug(f"MainGUI: Buttons updated. Mode: {mode}, States: {self._button_states.states}")
 
 
 # ... (setup_logging and __main__ block remain the same) ...
@@ -328,16 +417,25 @@ def setup_logging():
             print(f"Error creating log directory {log_dir}: {e}")
             log_file_path = os.path.basename(LOG_FILENAME) if os.path.basename(LOG_FILENAME) else "blunder_trainer_refactored.log"
 
-    logging.basicConfig(filename=log_file_path, filemode='w',
-                        level=logging.DEBUG,
-                        format=LOG_FORMAT)
-    logging.info("Blunder Trainer (Refactored) application starting...")
+    # GUI threads only enqueue records; a QueueListener thread owns the file and console handlers.
+    file_handler = logging.FileHandler(log_file_path, mode='w')
+    file_handler.setLevel(logging.DEBUG)
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
 
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(logging.INFO)
     formatter = logging.Formatter('%(levelname)s: (%(module)s.%(funcName)s) %(message)s')
     console_handler.setFormatter(formatter)
-    logging.getLogger().addHandler(console_handler)
+
+    log_queue = queue.Queue(-1)
+    log_listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    log_listener.start()
+    atexit.register(log_listener.stop)
+
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.DEBUG)
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logging.info("Blunder Trainer (Refactored) application starting...")
 
 if __name__ == '__main__':
     setup_logging()
@@ -351,12 +449,7 @@ if __name__ == '__main__':
                              parent=_startup_tk_for_error_msg)
         logging.error(f"Image directory '{IMAGE_PATH}' not found.")
 
-    if not SEARCHLESS_ENGINES_AVAILABLE:
-        messagebox.showerror("Dependency Error",
-                               "The 'searchless_chess' library components (engines) were not found or failed to import. "
-                               "AI functionality will be unavailable. Please check your Python environment and the library installation.",
-                               parent=_startup_tk_for_error_msg)
-        logging.critical("searchless_chess package not found or import failed. This is critical for engine functionality.")
+    # The searchless_chess dependency check runs after the main window exists, see _drain_init_queue
 
     _startup_tk_for_error_msg.destroy()
 
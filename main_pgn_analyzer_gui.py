@@ -5,14 +5,23 @@ import os
 import sys
 import logging
 import threading
+import tempfile
 
-from engines import SearchlessEngineManager, SEARCHLESS_ENGINES_AVAILABLE
-from constants import IMAGE_PATH, DEFAULT_BOARD_SIZE_PX, LOG_FILENAME, LOG_FORMAT, DEFAULT_PLAYER_NAME_TO_TRACK
+from engines import SearchlessEngineManager, SEARCHLESS_ENGINES_AVAILABLE, ENGINE_PRECISION_INT8
+from constants import IMAGE_PATH, DEFAULT_BOARD_SIZE_PX, LOG_FILENAME, LOG_FORMAT, DEFAULT_PLAYER_NAME_TO_TRACK, EVAL_CACHE_FILENAME, RECHECK_BLUNDERS_AT_FULL_PRECISION
 from chess_board_widget import ChessBoardWidget
 from blunder_feedback_panel import BlunderFeedbackPanel
 from pgn_analyzer_controller import PgnAnalyzerController
+from eval_cache import EvalCache
+from virtual_move_list import VirtualMoveList
+from widget_states import WidgetStates
 import chess_draw_utils as cdu
 
+PGN_SPOOL_CHUNK_CHARS = 64 * 1024 # Text widget is copied out in chunks of this size
+PGN_SPOOL_MAX_MEMORY = 1024 * 1024 # Larger pastes spill to a temp file on disk
+PENDING_UI_DRAIN_MS = 30 # Status/progress/selection updates are coalesced into one Tk callback per window
+RESIZE_DEBOUNCE_MS = 50 # Board hints are redrawn once the window has stopped resizing for this long
+
 class MainPgnAnalyzerGUI:
     def __init__(self, root_tk_window):
         self.root = root_tk_window
@@ -21,13 +30,27 @@ class MainPgnAnalyzerGUI:
         self.root.grid_rowconfigure(0, weight=1)
         self.root.grid_columnconfigure(0, weight=1)
 
-        self.engine_manager = SearchlessEngineManager()
+        self.engine_manager = SearchlessEngineManager(precision=ENGINE_PRECISION_INT8) # Close blunder calls are re-checked at full precision, see RECHECK_BLUNDERS_AT_FULL_PRECISION
         self.controller = None
 
+        # Engines load while the window comes up and the user pastes a PGN; Analyze waits on the event
+        self._engines_ready = threading.Event()
+        self._engine_load_error = None # (title, message) if loading failed, set before _engines_ready
+        threading.Thread(target=self._bg_load_engines, daemon=True).start()
+
+        # Latest-wins UI updates posted from the analysis thread, drained by a single after() tick
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._pending_drain_armed = False
+
+        self._button_states = WidgetStates() # Last state pushed to each button
+        self._analysis_running = False
+        self._resize_after_id = None
+
         self._create_main_widgets_layout()
         self._initialize_application_logic()
 
-        self.root.protocol("WM_DELETE_WINDOW", self.root.destroy)
+        self.root.protocol("WM_DELETE_WINDOW", self._on_closing)
 
     def _create_main_widgets_layout(self):
         main_paned_window = ttk.PanedWindow(self.root, orient=tk.HORIZONTAL)
@@ -81,13 +104,9 @@ class MainPgnAnalyzerGUI:
         move_list_frame.grid_rowconfigure(0, weight=1)
         move_list_frame.grid_columnconfigure(0, weight=1)
 
-        self.move_listbox = tk.Listbox(move_list_frame, font=("Courier New", 11))
-        self.move_listbox.grid(row=0, column=0, sticky="nsew")
-        self.move_listbox.bind("<<ListboxSelect>>", self._gui_action_on_move_select)
-        
-        scrollbar = ttk.Scrollbar(move_list_frame, orient=tk.VERTICAL, command=self.move_listbox.yview)
-        scrollbar.grid(row=0, column=1, sticky="ns")
-        self.move_listbox.config(yscrollcommand=scrollbar.set)
+        # Only the rows in view exist as widget items; long games stay cheap to show and scroll
+        self.move_list = VirtualMoveList(move_list_frame, on_row_selected=self._gui_action_on_move_select, font=("Courier New", 11))
+        self.move_list.grid(row=0, column=0, sticky="nsew")
         
         center_pane = ttk.Frame(main_paned_window, padding=5)
         main_paned_window.add(center_pane, weight=3)
@@ -109,14 +128,34 @@ class MainPgnAnalyzerGUI:
         status_label.pack(side=tk.LEFT, padx=5, pady=2, fill=tk.X, expand=True)
         self.progress_bar = ttk.Progressbar(status_frame, orient='horizontal', mode='determinate')
 
+    def _bg_load_engines(self):
+        try:
+            if not SEARCHLESS_ENGINES_AVAILABLE:
+                self._engine_load_error = ("Engine Error", "Searchless_chess library not found."); return
+            if not self.engine_manager.load_engines(load_136m_flag=True, load_reference_136m=RECHECK_BLUNDERS_AT_FULL_PRECISION) or not self.engine_manager.engine_9M or not self.engine_manager.engine_136M:
+                self._engine_load_error = ("Engine Error", "Could not load required engines."); return
+            self.engine_manager.warm_up_engines() # Before _engines_ready, so the first Analyze finds the engines compiled
+            eval_cache = EvalCache(EVAL_CACHE_FILENAME)
+            eval_cache.load()
+            self.engine_manager.eval_cache = eval_cache
+        except Exception as e:
+            logging.error(f"Engine loading failed: {e}", exc_info=True)
+            self._engine_load_error = ("Engine Error", f"Could not load required engines: {e}")
+        finally:
+            self._engines_ready.set()
+
+    def _poll_engine_load(self):
+        if not self._engines_ready.is_set():
+            self.root.after(100, self._poll_engine_load); return
+        if self._engine_load_error:
+            messagebox.showerror(*self._engine_load_error); self.root.destroy(); return
+        self.update_status("Ready. Paste a PGN and click Analyze.")
+        self._update_button_states()
+
     def _initialize_application_logic(self):
-        self.status_var.set("Loading engines...")
-        self.root.update_idletasks()
+        self.status_var.set("Loading engines... (you can paste a PGN meanwhile)")
 
-        if not SEARCHLESS_ENGINES_AVAILABLE:
-            messagebox.showerror("Engine Error", "Searchless_chess library not found."); self.root.destroy(); return
-        if not self.engine_manager.load_engines(load_136m_flag=True) or not self.engine_manager.engine_9M or not self.engine_manager.engine_136M:
-            messagebox.showerror("Engine Error", "Could not load required engines."); self.root.destroy(); return
+        self.board_widget.set_piece_image_pyramid(cdu.preload_piece_images(IMAGE_PATH))
         
         gui_callbacks = {
             'update_status': self.update_status,
@@ -134,46 +173,73 @@ class MainPgnAnalyzerGUI:
             engine_manager=self.engine_manager,
             gui_callback_manager=gui_callbacks
         )
-        self.update_status("Ready. Paste a PGN and click Analyze.")
         self._update_button_states()
+        self._poll_engine_load()
+
+    def _on_closing(self):
+        if self.engine_manager.eval_cache is not None: self.engine_manager.eval_cache.flush()
+        self.root.destroy()
 
     def _update_button_states(self):
-        analysis_done = bool(self.controller and self.controller.analysis_results)
+        analysis_done = bool(self.controller and len(self.controller.analysis))
         in_play_mode = self.controller and self.controller.interaction_mode == 'play'
 
-        nav_state = tk.NORMAL if analysis_done and not in_play_mode else tk.DISABLED
-        self.nav_start_btn.config(state=nav_state)
-        self.nav_prev_btn.config(state=tk.NORMAL if analysis_done and self.controller.current_move_index > 0 and not in_play_mode else tk.DISABLED)
-        self.nav_next_btn.config(state=tk.NORMAL if analysis_done and self.controller.current_move_index < len(self.controller.analysis_results) - 1 and not in_play_mode else tk.DISABLED)
-        self.nav_end_btn.config(state=nav_state)
-        self.analyze_btn.config(state=tk.NORMAL if not in_play_mode else tk.DISABLED)
-        self.move_listbox.config(state=tk.NORMAL if not in_play_mode else tk.DISABLED)
+        can_navigate = analysis_done and not in_play_mode
+        current_index = self.controller.current_move_index if can_navigate else -1
+
+        nav_state = tk.NORMAL if can_navigate else tk.DISABLED
+        self._button_states.apply(self.nav_start_btn, 'nav_start', nav_state)
+        self._button_states.apply(self.nav_prev_btn, 'nav_prev', tk.NORMAL if can_navigate and current_index > 0 else tk.DISABLED)
+        self._button_states.apply(self.nav_next_btn, 'nav_next', tk.NORMAL if can_navigate and current_index < len(self.controller.analysis) - 1 else tk.DISABLED)
+        self._button_states.apply(self.nav_end_btn, 'nav_end', nav_state)
+        engines_ready = self._engines_ready.is_set() and not self._engine_load_error
+        self._button_states.apply(self.analyze_btn, 'analyze', tk.NORMAL if engines_ready and not in_play_mode and not self._analysis_running else tk.DISABLED)
+        self.move_list.set_enabled(not in_play_mode)
         
-        self.play_from_here_btn.config(state=tk.NORMAL if analysis_done and not in_play_mode else tk.DISABLED)
-        self.return_to_analysis_btn.config(state=tk.NORMAL if in_play_mode else tk.DISABLED)
+        self._button_states.apply(self.play_from_here_btn, 'play_from_here', tk.NORMAL if analysis_done and not in_play_mode else tk.DISABLED)
+        self._button_states.apply(self.return_to_analysis_btn, 'return_to_analysis', tk.NORMAL if in_play_mode else tk.DISABLED)
 
     def _gui_action_analyze_game(self):
-        pgn_text = self.pgn_input_text.get("1.0", tk.END)
+        if not self._engines_ready.is_set() or self._engine_load_error: return
         player_name = self.player_name_var.get()
-        if not pgn_text.strip() or not player_name.strip():
+        pgn_file, has_content = self._spool_pgn_input()
+        if not has_content or not player_name.strip():
+            pgn_file.close()
             messagebox.showwarning("Input Required", "Please paste a PGN and enter a player name."); return
 
-        self.analyze_btn.config(state=tk.DISABLED)
+        self._analysis_running = True
         self._update_button_states()
-        self.move_listbox.delete(0, tk.END)
+        self.move_list.clear()
 
-        analysis_thread = threading.Thread(target=self.run_analysis_thread, args=(pgn_text, player_name), daemon=True)
+        analysis_thread = threading.Thread(target=self.run_analysis_thread, args=(pgn_file, player_name), daemon=True)
         analysis_thread.start()
-        
-    def run_analysis_thread(self, pgn_text, player_name):
-        self.controller.load_and_analyze_pgn(pgn_text, player_name)
-        self.root.after(10, self._update_button_states)
-        self.root.after(10, lambda: self.progress_bar.pack_forget())
 
-    def _gui_action_on_move_select(self, event):
-        w = event.widget
-        if not w.curselection(): return
-        if self.controller: self.controller.navigate_to_move(int(w.curselection()[0]))
+    def _spool_pgn_input(self):
+        """Copies the PGN text widget into a spooled temp file chunk by chunk, avoiding one giant string."""
+        pgn_file = tempfile.SpooledTemporaryFile(max_size=PGN_SPOOL_MAX_MEMORY, mode='w+', encoding='utf-8')
+        has_content = False
+        start = 0
+        while True:
+            chunk = self.pgn_input_text.get(f"1.0 + {start} chars", f"1.0 + {start + PGN_SPOOL_CHUNK_CHARS} chars")
+            if not chunk: break
+            has_content = has_content or bool(chunk.strip())
+            pgn_file.write(chunk)
+            start += len(chunk)
+        pgn_file.seek(0)
+        return pgn_file, has_content
+        
+    def run_analysis_thread(self, pgn_file, player_name):
+        try:
+            self.controller.load_and_analyze_pgn_stream(pgn_file, player_name)
+        finally:
+            pgn_file.close()
+            self._analysis_running = False
+            self.root.after(0, self._update_button_states) # Also after a failed analysis, so Analyze is re-enabled
+            self._post_pending('progress', None) # Hide the bar; goes through the queue so a stale update cannot re-show it
+
+    def _gui_action_on_move_select(self, row):
+        # Row 0 is ply 1; the controller's analysis has the starting position at index 0
+        if self.controller: self.controller.navigate_to_move(row + 1)
 
     def _gui_action_nav_start(self):
         if self.controller: self.controller.navigate_to_move(0)
@@ -182,7 +248,7 @@ class MainPgnAnalyzerGUI:
     def _gui_action_nav_next(self):
         if self.controller: self.controller.navigate_to_move(self.controller.current_move_index + 1)
     def _gui_action_nav_end(self):
-        if self.controller and self.controller.analysis_results: self.controller.navigate_to_move(len(self.controller.analysis_results) - 1)
+        if self.controller and len(self.controller.analysis): self.controller.navigate_to_move(len(self.controller.analysis) - 1)
     
     def _gui_action_play_from_here(self):
         if self.controller: self.controller.action_play_from_here()
@@ -190,47 +256,67 @@ class MainPgnAnalyzerGUI:
         if self.controller: self.controller.action_return_to_analysis()
 
     def _gui_action_handle_resize(self):
+        # <Configure> fires for every pixel of a drag; only the last one in a burst redraws
+        if self._resize_after_id is not None: self.root.after_cancel(self._resize_after_id)
+        self._resize_after_id = self.root.after(RESIZE_DEBOUNCE_MS, self._handle_resize_settled)
+
+    def _handle_resize_settled(self):
+        self._resize_after_id = None
         if self.controller: self.controller.handle_board_resize()
     
-    def update_status(self, text):
-        self.root.after(0, lambda: self.status_var.set(text))
-
-    def update_progress(self, current_val, max_val):
-        def task():
+    def _post_pending(self, key, value):
+        with self._pending_lock:
+            self._pending[key] = value
+            if self._pending_drain_armed: return
+            self._pending_drain_armed = True
+        self.root.after(PENDING_UI_DRAIN_MS, self._drain_pending)
+
+    def _drain_pending(self):
+        with self._pending_lock:
+            pending = self._pending
+            self._pending = {}
+            self._pending_drain_armed = False # Next post re-arms the tick; nothing runs while idle
+
+        if 'status' in pending: self.status_var.set(pending['status'])
+        if 'progress' in pending and pending['progress'] is None:
+            self.progress_bar.pack_forget()
+        elif 'progress' in pending:
+            current_val, max_val = pending['progress']
             if not self.progress_bar.winfo_ismapped(): self.progress_bar.pack(side=tk.RIGHT, padx=5, pady=2, fill=tk.X, expand=True)
             self.progress_bar['maximum'] = max_val
             self.progress_bar['value'] = current_val
-        self.root.after(0, task)
-
-    def populate_move_list(self, analysis_results):
-        def task():
-            # Skip the initial dummy entry at index 0
-            self.move_listbox.delete(0, tk.END)
-            for i, result in enumerate(analysis_results[1:]):
-                move_num_str = f"{(result['ply'] + 1) // 2}.{'..' if result['ply'] % 2 == 0 else ''}"
-                display_text = f"{move_num_str:<5} {result['move_san']:<8} {result.get('quality_symbol', '')}"
-                self.move_listbox.insert(tk.END, display_text)
-                if not result['is_tracked_player_move']: self.move_listbox.itemconfig(i, {'fg': 'grey'})
-        self.root.after(0, task)
+        if pending.get('refresh') and self.controller:
+            self.controller._redraw_visuals_for_current_move()
+            pending['selection'] = self.controller.current_move_index
+        if 'selection' in pending: self._apply_move_list_selection(pending['selection'])
+
+    def update_status(self, text):
+        self._post_pending('status', text)
+
+    def update_progress(self, current_val, max_val):
+        self._post_pending('progress', (current_val, max_val))
+
+    def populate_move_list(self, plies, sans, symbols, tracked_mask):
+        # Format on the calling (analysis) thread; the Tk callback only hands the rows to the list.
+        move_num_strs = [f"{(ply + 1) // 2}.{'..' if ply % 2 == 0 else ''}" for ply in plies]
+        fmt = "{:<5} {:<8} {}".format
+        display_lines = list(map(fmt, move_num_strs, sans, symbols))
+        grey_indices = [i for i, is_tracked in enumerate(tracked_mask) if not is_tracked]
+
+        self.root.after(0, lambda: self.move_list.set_rows(display_lines, grey_indices))
     
     def update_move_list_selection(self, index):
-        def task():
-            # Adjust index for listbox since it doesn't have the dummy entry
-            listbox_index = index -1
-            if listbox_index < 0: return
-            self.move_listbox.selection_clear(0, tk.END)
-            self.move_listbox.selection_set(listbox_index)
-            self.move_listbox.activate(listbox_index)
-            self.move_listbox.see(listbox_index)
-            self._update_button_states()
-        self.root.after(0, task)
+        self._post_pending('selection', index)
+
+    def _apply_move_list_selection(self, index):
+        # Adjust index for listbox since it doesn't have the dummy entry
+        listbox_index = index -1
+        if listbox_index < 0: return
+        self.move_list.select_row(listbox_index)
+        self._update_button_states()
 
     def refresh_display(self):
-        def task():
-            if self.controller:
-                self.controller._redraw_visuals_for_current_move()
-                self.update_move_list_selection(self.controller.current_move_index)
-        self.root.after(0, task)
+        self._post_pending('refresh', True)
 
 def setup_logging():
     logging.basicConfig(filename=LOG_FILENAME, filemode='a', level=logging.DEBUG, format=LOG_FORMAT)
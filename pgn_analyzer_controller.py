@@ -1,13 +1,18 @@
 # ===== START OF FILE pgn_analyzer_controller.py =====
 import chess
 import chess.pgn
+import io
 import logging
-from typing import List, Dict, Any
+import functools
 import time
+import queue
+import numpy as np
+import threading
 
 from engines import SearchlessEngineManager
 from pgn_manager import PgnManager
-from utils import pwin_to_cp, format_score_for_display
+from analysis_arrays import AnalysisArrays
+from utils import pwin_to_cp, pwin_to_cp_batch, format_score_for_display
 from constants import (
     HINT_PALETTE_1, HINT_PALETTE_2, HINT_COMBINED_COLOR,
     ARROW_WIDTH_BASE, USER_PGN_MOVE_COLOR, PGN_MAINLINE_MOVE_COLOR,
@@ -28,6 +33,37 @@ INTERESTING_MOVE_MAX_DROP = 0.05
 GOOD_MOVE_MAX_DROP = 0.03
 INTERESTING_MOVE_TOP_N_THRESHOLD = 5
 GOOD_MOVE_TOP_N_THRESHOLD = 3
+# Quality codes produced by classify_move_qualities, indexing QUALITY_SYMBOLS
+QUALITY_CODE_UNKNOWN, QUALITY_CODE_BEST, QUALITY_CODE_GOOD, QUALITY_CODE_INTERESTING, QUALITY_CODE_WEAK, QUALITY_CODE_BLUNDER = range(6)
+QUALITY_SYMBOLS = (MOVE_QUALITY_UNKNOWN, MOVE_QUALITY_BEST, MOVE_QUALITY_GOOD, MOVE_QUALITY_INTERESTING, MOVE_QUALITY_WEAK, MOVE_QUALITY_BLUNDER)
+_QUALITY_SYMBOL_LOOKUP = np.array(QUALITY_SYMBOLS, dtype=object) # Maps a whole quality_code column to symbols at once
+BLUNDER_RECHECK_MARGIN = 0.02 # Drops this close to BLUNDER_THRESHOLD are re-scored by the full-precision 136M
+ANALYSIS_CHUNK_POSITIONS = 64 # Positions per batched forward pass during full-game analysis
+ANALYSIS_QUEUE_MAXSIZE = 4 # Evaluated chunks the producer may run ahead of the consumer
+MAX_HINTS_SHOWN = 4
+HINT_WIDTHS = tuple(max(1, ARROW_WIDTH_BASE - 1 - i) for i in range(MAX_HINTS_SHOWN)) # Arrow width per hint rank
+GUI_UPDATE_MIN_INTERVAL_S = 0.1 # Status/progress callbacks are forwarded at most this often (10 Hz), final ones always
+
+def classify_move_qualities(pwin_drop: np.ndarray, move_rank: np.ndarray, graded_mask: np.ndarray) -> np.ndarray:
+    """
+    Grades every move of a game at once with vectorised comparisons (move_rank is the played move's
+    index in the 136M top moves, -1 if absent). Returns int8 QUALITY_CODE_* values, UNKNOWN outside graded_mask.
+    """
+    # Ungraded plies hold NaN drops, which compare False everywhere; graded_mask discards them
+    codes = np.select(
+        [pwin_drop > BLUNDER_THRESHOLD,
+         pwin_drop > WEAK_MOVE_THRESHOLD,
+         move_rank == 0,
+         (pwin_drop <= GOOD_MOVE_MAX_DROP) & (move_rank > 0) & (move_rank < GOOD_MOVE_TOP_N_THRESHOLD),
+         (pwin_drop <= INTERESTING_MOVE_MAX_DROP) & ((move_rank == -1) | (move_rank >= INTERESTING_MOVE_TOP_N_THRESHOLD))],
+        [QUALITY_CODE_BLUNDER, QUALITY_CODE_WEAK, QUALITY_CODE_BEST, QUALITY_CODE_GOOD, QUALITY_CODE_INTERESTING],
+        default=QUALITY_CODE_GOOD)
+    return np.where(graded_mask, codes, QUALITY_CODE_UNKNOWN).astype(np.int8)
+
+@functools.lru_cache(maxsize=128) # Redraws (navigation, resizes) convert the same few P(win)s over and over
+def _cp_for_mover(pwin_for_mover: float, turn: chess.Color):
+    pwin_for_white = pwin_for_mover if turn == chess.WHITE else (1.0 - pwin_for_mover)
+    return pwin_to_cp(pwin_for_white)
 
 class PgnAnalyzerController:
     def __init__(self, board_widget, feedback_panel, engine_manager, gui_callback_manager=None):
@@ -37,11 +73,12 @@ class PgnAnalyzerController:
         self.gui_callbacks = gui_callback_manager
 
         self.pgn_manager = PgnManager()
-        self.analysis_results: List[Dict[str, Any]] = []
+        self.analysis = AnalysisArrays(0)
         self.current_move_index = -1
         self.tracked_player_name = ""
         self.tracked_player_color = None
         self.total_plies = 0
+        self._last_gui_update_time: dict[str, float] = {} # Callback name -> time.monotonic() of its last forwarded update
 
         self.interaction_mode = 'analysis' # 'analysis' or 'play'
         self.board_for_play_mode: chess.Board | None = None
@@ -51,17 +88,24 @@ class PgnAnalyzerController:
         self.hint_colors_136m = HINT_PALETTE_2
 
     def load_and_analyze_pgn(self, pgn_string: str, tracked_player_name: str):
+        self.load_and_analyze_pgn_stream(io.StringIO(pgn_string), tracked_player_name)
+
+    def load_and_analyze_pgn_stream(self, pgn_file, tracked_player_name: str):
+        """Analyzes the first game in a (seekable) PGN stream that involves the tracked player."""
         print("🔄 Starting PGN analysis...")
         self.tracked_player_name = tracked_player_name.lower()
-        self.analysis_results = []
+        self.analysis = AnalysisArrays(0)
         self.current_move_index = -1
         self.total_plies = 0
 
         if not self.engine_manager.engine_9M or not self.engine_manager.engine_136M:
             if self.gui_callbacks: self.gui_callbacks['show_error']("Engine Error", "Both engines required."); return
 
-        if not self.pgn_manager.load_pgn_from_string(pgn_string):
+        games_scanned, game_loaded = self._load_first_game_for_tracked_player(pgn_file)
+        if games_scanned == 0 or game_loaded is False:
             if self.gui_callbacks: self.gui_callbacks['show_error']("PGN Error", "Could not parse PGN."); return
+        if game_loaded is None:
+            if self.gui_callbacks: self.gui_callbacks['show_error']("Player Not Found", f"Player '{tracked_player_name}' not in PGN."); return
         
         self.total_plies = self.pgn_manager.get_total_plies_mainline()
         self._determine_player_color()
@@ -69,75 +113,185 @@ class PgnAnalyzerController:
             if self.gui_callbacks: self.gui_callbacks['show_error']("Player Not Found", f"Player '{tracked_player_name}' not in PGN."); return
 
         self._perform_full_game_analysis()
-        if self.gui_callbacks: self.gui_callbacks['populate_move_list'](self.analysis_results)
+        if self.gui_callbacks:
+            a = self.analysis
+            self.gui_callbacks['populate_move_list'](a.ply[1:].tolist(), a.move_san[1:].tolist(), _QUALITY_SYMBOL_LOOKUP[a.quality_code[1:]].tolist(), a.is_tracked[1:].tolist())
         
-        if self.analysis_results:
+        if len(self.analysis):
             self.navigate_to_move(0)
         print("✅ PGN analysis complete.")
 
+    def _load_first_game_for_tracked_player(self, pgn_file):
+        """
+        Skims game headers only (no move parsing) until one names the tracked player, then parses that game.
+        Returns (games_scanned, loaded) where loaded is None if no game matched.
+        """
+        games_scanned = 0
+        while True:
+            game_offset = pgn_file.tell()
+            headers = chess.pgn.read_headers(pgn_file)
+            if headers is None: return games_scanned, None
+            games_scanned += 1
+            self._post_gui_update('update_status', f"Scanning PGN: game {games_scanned}...")
+            if self.tracked_player_name in (headers.get("White", "").lower(), headers.get("Black", "").lower()):
+                pgn_file.seek(game_offset)
+                return games_scanned, self.pgn_manager.load_pgn_from_stream(pgn_file)
+
+    def _post_gui_update(self, callback_name: str, *args, final=False):
+        """Forwards a status/progress update unless one went out within GUI_UPDATE_MIN_INTERVAL_S; final updates always go out."""
+        if not self.gui_callbacks: return
+        now = time.monotonic()
+        if not final and now - self._last_gui_update_time.get(callback_name, float('-inf')) < GUI_UPDATE_MIN_INTERVAL_S: return
+        self._last_gui_update_time[callback_name] = now
+        self.gui_callbacks[callback_name](*args)
+
     def _determine_player_color(self):
         headers = self.pgn_manager.get_headers()
         if headers.get("White", "").lower() == self.tracked_player_name: self.tracked_player_color = chess.WHITE
         elif headers.get("Black", "").lower() == self.tracked_player_name: self.tracked_player_color = chess.BLACK
         else: self.tracked_player_color = None
 
-    def _get_pwin_for_mover(self, engine, board_after_move, player_who_moved):
-        if board_after_move.is_game_over(claim_draw=True):
-            result = board_after_move.result(claim_draw=True)
-            if result == "1-0": return 1.0 if player_who_moved == chess.WHITE else 0.0
-            if result == "0-1": return 0.0 if player_who_moved == chess.WHITE else 1.0
-            return 0.5
-        pwin_for_opponent = self.engine_manager.calculate_p_win_for_player(engine, board_after_move, board_after_move.turn)
-        return 1.0 - pwin_for_opponent
+    def _get_mover_pwins(self, engine, positions, outputs, is_forced, top_moves, outcomes):
+        """P(win) for the side to move in each position; forced positions take 1 - P(win) of the position after them."""
+        # A finished final position is scored from its outcome, no network needed
+        direct = [j for j in range(len(positions)) if not (is_forced[j] and j + 1 < len(positions)) or outcomes[j]]
+        pwins = [0.5] * len(positions)
+        # The best move's p_win already is the position's value, so only positions without a top-moves list are scored here
+        unscored = []
+        for j in direct:
+            if outcomes[j]: pwins[j] = 0.5 if outcomes[j].winner is None else float(outcomes[j].winner == positions[j].turn)
+            elif j < len(top_moves) and top_moves[j]: pwins[j] = top_moves[j][0]['p_win']
+            else: unscored.append(j)
+        for j, pwin in zip(unscored, self.engine_manager.batch_pwin(engine, [positions[j] for j in unscored], [outputs[j] for j in unscored])):
+            pwins[j] = pwin
+        direct = set(direct)
+        for j in range(len(positions) - 2, -1, -1): # Backwards, so chains of forced moves resolve
+            if j not in direct: pwins[j] = 1.0 - pwins[j + 1]
+        return pwins
+
+    def _iter_engine_output_chunks(self, boards):
+        """Yields (start, (outputs_9m, outputs_136m)) per chunk of `boards`, evaluated ahead on a producer thread."""
+        chunk_queue = queue.Queue(maxsize=ANALYSIS_QUEUE_MAXSIZE)
+        engines = (self.engine_manager.engine_9M, self.engine_manager.engine_136M)
+
+        def produce():
+            try:
+                for start in range(0, len(boards), ANALYSIS_CHUNK_POSITIONS):
+                    chunk_queue.put((start, self.engine_manager.evaluate_batch_for_engines(engines, boards[start:start + ANALYSIS_CHUNK_POSITIONS])))
+                chunk_queue.put(None)
+            except Exception as e:
+                chunk_queue.put(e) # Re-raised on the consuming thread
+
+        threading.Thread(target=produce, daemon=True, name="analysis_producer").start()
+        while True:
+            item = chunk_queue.get()
+            if item is None: return
+            if isinstance(item, Exception): raise item
+            yield item
+
+    def _recheck_with_reference_engine(self, board_before_move: chess.Board, board_after_move: chess.Board):
+        """(top moves, P(win) after the played move) for the mover from the full-precision 136M, or None if unavailable."""
+        reference_engine = self.engine_manager.get_reference_engine_136m()
+        if reference_engine is None: return None
+        top_moves = self.engine_manager.get_top_engine_moves_list(reference_engine, board_before_move, num_moves=5)
+        if not top_moves: return None
+        pwin_after = 1.0 - self.engine_manager.calculate_p_win_for_player(reference_engine, board_after_move, board_after_move.turn)
+        return top_moves, pwin_after
 
     def _get_cp_for_mover(self, pwin_for_mover: float, board_before_move: chess.Board):
-        pwin_for_white = pwin_for_mover if board_before_move.turn == chess.WHITE else (1.0 - pwin_for_mover)
-        return pwin_to_cp(pwin_for_white)
+        return _cp_for_mover(pwin_for_mover, board_before_move.turn)
 
     def _perform_full_game_analysis(self):
-        if self.gui_callbacks: self.gui_callbacks['update_status']("Analyzing game...")
-        node = self.pgn_manager.game
+        self._post_gui_update('update_status', "Analyzing game...", final=True)
+        game = self.pgn_manager.game
+        board = game.board()
         
-        # Add initial state as index -1 for viewing before first move
-        self.analysis_results.append({ "ply": 0, "fen_before_move": node.board().fen() })
+        # Walk the mainline once on a single board instead of rebuilding each prefix with node.board().
+        # Positions inside the mainline cannot be finished games (a move follows them, so unclaimed draws
+        # are not over), so only the final position's outcome is looked up, off the walking board that
+        # still has the move stack for repetition claims. The per-position snapshots skip copying the stack.
+        # positions[i] is the board before ply i+1, which is also the board after ply i.
+        positions = [board.copy(stack=False)]; mainline_moves = []; mainline_sans = []
+        # The nodes come from the list PgnManager indexed off game.mainline() at load; their SANs are handed
+        # back so move-list navigation never regenerates them.
+        for node in self.pgn_manager.get_mainline_nodes()[1:]:
+            san = board.san_and_push(node.move); mainline_sans.append(san); mainline_moves.append(node.move)
+            self.pgn_manager.remember_san(node, san)
+            positions.append(board.copy(stack=False))
+        outcomes = [None] * len(positions); outcomes[-1] = board.outcome(claim_draw=True)
 
-        while node.variations:
-            node = node.variations[0]; move = node.move; board_before_move = node.parent.board()
-            move_num_str = f"{(node.ply() + 1) // 2}.{'..' if node.ply() % 2 == 0 else ''}"
-            print(f"🔄 Analyzing move {node.ply()}/{self.total_plies} ({move_num_str} {board_before_move.san(move)})")
-            
-            analysis_entry = { "ply": node.ply(), "move_san": board_before_move.san(move), "move_uci": move.uci(), "fen_before_move": board_before_move.fen(), "is_tracked_player_move": board_before_move.turn == self.tracked_player_color, "quality_symbol": MOVE_QUALITY_UNKNOWN, }
-            analysis_entry["top_moves_9m"] = self.engine_manager.get_top_engine_moves_list(self.engine_manager.engine_9M, board_before_move, num_moves=5)
-            analysis_entry["top_moves_136m"] = self.engine_manager.get_top_engine_moves_list(self.engine_manager.engine_136M, board_before_move, num_moves=5)
-            
-            board_after_actual_move = board_before_move.copy(); board_after_actual_move.push(move)
-            analysis_entry["pwin_after_move_136m"] = self._get_pwin_for_mover(self.engine_manager.engine_136M, board_after_actual_move, board_before_move.turn)
-            analysis_entry["pwin_after_move_9m"] = self._get_pwin_for_mover(self.engine_manager.engine_9M, board_after_actual_move, board_before_move.turn)
-
-            if analysis_entry["is_tracked_player_move"] and analysis_entry["top_moves_136m"]:
-                pwin_optimal_136m = analysis_entry["top_moves_136m"][0]['p_win']
-                pwin_drop = pwin_optimal_136m - analysis_entry["pwin_after_move_136m"]
-                analysis_entry["pwin_drop_136m"] = pwin_drop
-                cp_optimal = self._get_cp_for_mover(pwin_optimal_136m, board_before_move)
-                cp_after_actual = self._get_cp_for_mover(analysis_entry["pwin_after_move_136m"], board_before_move)
-                analysis_entry["cp_loss"] = cp_optimal - cp_after_actual
-                move_rank = next((i for i, m in enumerate(analysis_entry["top_moves_136m"]) if m['uci'] == move.uci()), -1)
-                if pwin_drop > BLUNDER_THRESHOLD: analysis_entry["quality_symbol"] = MOVE_QUALITY_BLUNDER
-                elif pwin_drop > WEAK_MOVE_THRESHOLD: analysis_entry["quality_symbol"] = MOVE_QUALITY_WEAK
-                elif move_rank == 0: analysis_entry["quality_symbol"] = MOVE_QUALITY_BEST
-                elif pwin_drop <= GOOD_MOVE_MAX_DROP and 0 < move_rank < GOOD_MOVE_TOP_N_THRESHOLD: analysis_entry["quality_symbol"] = MOVE_QUALITY_GOOD
-                elif pwin_drop <= INTERESTING_MOVE_MAX_DROP and (move_rank == -1 or move_rank >= INTERESTING_MOVE_TOP_N_THRESHOLD): analysis_entry["quality_symbol"] = MOVE_QUALITY_INTERESTING
-                else: analysis_entry["quality_symbol"] = MOVE_QUALITY_GOOD
-            
-            # The ply number matches the index in the listbox, but our results list has an extra item at the start
-            self.analysis_results.append(analysis_entry)
-            self.current_move_index = node.ply()
+        # A position with a single legal move offers no choice, so the network is not run on it:
+        # its value is inferred from the position after the forced move (see _get_mover_pwins).
+        # The final position is always evaluated since nothing follows it; finished positions never are.
+        is_forced = [pos.legal_moves.count() == 1 for pos in positions]
+        eval_indices = [j for j in range(len(positions)) if not (is_forced[j] and j + 1 < len(positions)) and not outcomes[j]]
 
-            if self.gui_callbacks: 
-                self.gui_callbacks['update_progress'](node.ply(), self.total_plies)
-                self.gui_callbacks['refresh_display']() # Trigger a redraw
-            
-        if self.gui_callbacks: self.gui_callbacks['update_status']("Analysis complete.")
+        # The network runs chunk by chunk on a producer thread while this thread builds top-move lists
+        # (SAN for every legal move) for the chunks already evaluated.
+        num_moves = len(mainline_moves)
+        eval_boards = [positions[j] for j in eval_indices]
+        outputs_9m, outputs_136m = [[None] * len(positions) for _ in range(2)]
+        top_moves_9m, top_moves_136m = [[None] * num_moves for _ in range(2)]
+        top_index_9m, top_index_136m = [[None] * num_moves for _ in range(2)] # uci -> (rank, entry) per ply
+        self._post_gui_update('update_progress', 0, len(eval_boards), final=True)
+        for start, chunk_outputs in self._iter_engine_output_chunks(eval_boards):
+            chunk_indices = eval_indices[start:start + len(chunk_outputs[0])]
+            choice_plies = [j for j in chunk_indices if j < num_moves] # Everything evaluated except the final position
+            for outputs, tops, indices, engine, engine_chunk in ((outputs_9m, top_moves_9m, top_index_9m, self.engine_manager.engine_9M, chunk_outputs[0]),
+                                                                 (outputs_136m, top_moves_136m, top_index_136m, self.engine_manager.engine_136M, chunk_outputs[1])):
+                for j, output in zip(chunk_indices, engine_chunk): outputs[j] = output
+                batch_tops = self.engine_manager.batch_top_moves(engine, [positions[j] for j in choice_plies], num_moves=5, analysis_outputs=[outputs[j] for j in choice_plies], with_index=True)
+                for j, (top, index) in zip(choice_plies, batch_tops): tops[j] = top; indices[j] = index
+            num_done = start + len(chunk_indices)
+            self._post_gui_update('update_progress', num_done, len(eval_boards), final=num_done == len(eval_boards))
+        mover_pwins_136m = self._get_mover_pwins(self.engine_manager.engine_136M, positions, outputs_136m, is_forced, top_moves_136m, outcomes)
+
+        # Index 0 is the starting position, index k is ply k; filled locally and published once complete
+        a = AnalysisArrays(num_moves + 1)
+        a.board_before[0] = positions[0]
+        pwin_optimal_136m_by_ply = np.full(num_moves + 1, np.nan) # CP losses are converted in one batch after the loop
+        for i, move in enumerate(mainline_moves):
+            k = i + 1; move_san = mainline_sans[i]; move_uci = move.uci()
+            board_before_move = positions[i]
+
+            a.move_san[k] = move_san; a.move_uci[k] = move_uci; a.board_before[k] = board_before_move
+            a.is_tracked[k] = board_before_move.turn == self.tracked_player_color
+            a.pwin_after_136m[k] = 1.0 - mover_pwins_136m[k]
+            if k == num_moves and outcomes[-1]: a.pwin_after_9m[k] = a.pwin_after_136m[k] # Decided by the outcome; the rest of the 9M column fills in on display
+
+            if is_forced[i]:
+                a.is_forced[k] = True
+                a.top_moves_136m[k] = [{'san': move_san, 'uci': move_uci, 'p_win': float(a.pwin_after_136m[k])}]
+                continue # Nothing to grade on a forced move
+
+            a.top_moves_9m[k] = top_moves_9m[i]; a.top_moves_136m[k] = top_moves_136m[i]
+            if not a.is_tracked[k] or not top_moves_136m[i]: continue
+
+            pwin_optimal_136m = top_moves_136m[i][0]['p_win']; pwin_after_136m = float(a.pwin_after_136m[k])
+            move_rank = top_index_136m[i].get(move_uci, (-1, None))[0]
+            if self.engine_manager.is_reduced_precision and abs(pwin_optimal_136m - pwin_after_136m - BLUNDER_THRESHOLD) < BLUNDER_RECHECK_MARGIN and not outcomes[i + 1]:
+                rechecked = self._recheck_with_reference_engine(board_before_move, positions[i + 1])
+                if rechecked: # The whole ply is then graded by the reference engine: drop, rank and top moves
+                    reference_top_moves, pwin_after_136m = rechecked
+                    pwin_optimal_136m = reference_top_moves[0]['p_win']
+                    move_rank = next((rank for rank, move in enumerate(reference_top_moves) if move['uci'] == move_uci), -1)
+                    a.pwin_after_136m[k] = pwin_after_136m; a.top_moves_136m[k] = reference_top_moves
+            a.pwin_drop_136m[k] = pwin_optimal_136m - pwin_after_136m
+            pwin_optimal_136m_by_ply[k] = pwin_optimal_136m
+            a.move_rank[k] = move_rank
+
+        graded = ~np.isnan(pwin_optimal_136m_by_ply)
+        white_to_move = np.array([board.turn == chess.WHITE for board in a.board_before[graded]], dtype=np.bool_)
+        pwin_optimal_white = np.where(white_to_move, pwin_optimal_136m_by_ply[graded], 1.0 - pwin_optimal_136m_by_ply[graded])
+        pwin_after_white = np.where(white_to_move, a.pwin_after_136m[graded], 1.0 - a.pwin_after_136m[graded])
+        a.cp_loss[graded] = pwin_to_cp_batch(pwin_optimal_white) - pwin_to_cp_batch(pwin_after_white)
+        a.quality_code = classify_move_qualities(a.pwin_drop_136m, a.move_rank, a.graded_mask())
+        self.analysis = a
+        self.current_move_index = num_moves
+
+        if self.gui_callbacks:
+            self.gui_callbacks['refresh_display']() # Trigger a redraw
+            self.gui_callbacks['update_status']("Analysis complete.")
         # Don't automatically select a move, let the user do it. The last analyzed state will be shown.
 
     def _handle_user_move_attempt(self, uci: str):
@@ -172,8 +326,7 @@ class PgnAnalyzerController:
     def action_play_from_here(self):
         if self.interaction_mode != 'analysis' or self.current_move_index < 0: return
         self.interaction_mode = 'play'
-        fen = self.analysis_results[self.current_move_index]['fen_before_move']
-        self.board_for_play_mode = chess.Board(fen)
+        self.board_for_play_mode = self.analysis.board_before[self.current_move_index].copy() # Play mode pushes moves onto its board
         self.board_widget.set_interaction_enabled(True)
         self._redraw_visuals_for_current_move()
         if self.gui_callbacks: self.gui_callbacks['update_button_states']()
@@ -187,7 +340,7 @@ class PgnAnalyzerController:
         if self.gui_callbacks: self.gui_callbacks['update_button_states']()
 
     def navigate_to_move(self, index: int):
-        if self.interaction_mode != 'analysis' or not (0 <= index < len(self.analysis_results)): return
+        if self.interaction_mode != 'analysis' or not (0 <= index < len(self.analysis)): return
         self.current_move_index = index
         self._redraw_visuals_for_current_move()
         if self.gui_callbacks: self.gui_callbacks['update_move_selection'](index)
@@ -205,61 +358,62 @@ class PgnAnalyzerController:
             self._redraw_for_play_mode()
 
     def _redraw_for_analysis_mode(self):
-        if not (0 <= self.current_move_index < len(self.analysis_results)): return
-        move_data = self.analysis_results[self.current_move_index]
-        board_before_move = chess.Board(move_data["fen_before_move"])
-        self.board_widget.set_position(move_data["fen_before_move"])
+        if not (0 <= self.current_move_index < len(self.analysis)): return
+        a = self.analysis; k = self.current_move_index
+        board_before_move = a.board_before[k]
+        self.board_widget.set_position(board_before_move) # Same parsed board for the widget and the hints, no FEN round trip
         if self.board_widget.white_at_bottom != (self.tracked_player_color == chess.WHITE): self.board_widget.flip_board_orientation()
         else: self.board_widget.clear_visual_cues(); self.board_widget.redraw_pieces_only()
         
         # Ply 0 is just the starting position, no move was made
-        if move_data.get('ply', 0) == 0:
+        if k == 0:
             self.feedback_panel.update_feedback("Start of game.")
             self.feedback_panel.clear_hints()
             return
             
-        top_moves_9m = {m['uci']: m for m in move_data.get("top_moves_9m", [])[:3]}
-        top_moves_136m = {m['uci']: m for m in move_data.get("top_moves_136m", [])[:3]}
+        move_san = a.move_san[k]; move_uci = a.move_uci[k]; quality_symbol = QUALITY_SYMBOLS[a.quality_code[k]]
         hints_panel_text = ""
         
-        pwin_9m_after = move_data.get("pwin_after_move_9m", 0.5); pwin_136m_after = move_data.get("pwin_after_move_136m", 0.5)
+        pwin_9m_after = self._get_pwin_after_9m(k); pwin_136m_after = float(a.pwin_after_136m[k])
         cp_9m_after = self._get_cp_for_mover(pwin_9m_after, board_before_move); cp_136m_after = self._get_cp_for_mover(pwin_136m_after, board_before_move)
         
-        if move_data["is_tracked_player_move"]:
-            cp_loss_str = format_score_for_display(move_data.get("cp_loss", 0), True)
-            feedback_str = f"Your move: {move_data['move_san']} ({move_data['quality_symbol']})\nCP Loss (vs 136M best): {cp_loss_str}"
-            label_text = f"{move_data['quality_symbol']} ({format_score_for_display(cp_136m_after, True)})"
-            hints_panel_text = f"Your Move: {move_data['move_san']}\n  - 9M: {format_score_for_display(cp_9m_after, True)}  |  136M: {format_score_for_display(cp_136m_after, True)}\n"
+        if a.is_tracked[k]:
+            cp_loss_str = format_score_for_display(0 if np.isnan(a.cp_loss[k]) else float(a.cp_loss[k]), True)
+            feedback_str = f"Your move: {move_san} ({quality_symbol})\nCP Loss (vs 136M best): {cp_loss_str}"
+            label_text = f"{quality_symbol} ({format_score_for_display(cp_136m_after, True)})"
+            hints_panel_text = f"Your Move: {move_san}\n  - 9M: {format_score_for_display(cp_9m_after, True)}  |  136M: {format_score_for_display(cp_136m_after, True)}\n"
         else:
-            feedback_str = f"Opponent's move: {move_data['move_san']}"
+            feedback_str = f"Opponent's move: {move_san}"
             label_text = format_score_for_display(cp_136m_after, True)
-            hints_panel_text = f"Opponent's Move: {move_data['move_san']}\n  - 9M: {format_score_for_display(cp_9m_after, True)}  |  136M: {format_score_for_display(cp_136m_after, True)}\n"
+            hints_panel_text = f"Opponent's Move: {move_san}\n  - 9M: {format_score_for_display(cp_9m_after, True)}  |  136M: {format_score_for_display(cp_136m_after, True)}\n"
 
-        self.board_widget.draw_arrow(move_data["move_uci"], USER_PGN_MOVE_COLOR, ARROW_WIDTH_BASE + 1)
-        self.board_widget.draw_text_on_square(chess.Move.from_uci(move_data["move_uci"]).to_square, label_text, USER_PGN_MOVE_COLOR)
+        self.board_widget.draw_arrow(move_uci, USER_PGN_MOVE_COLOR, ARROW_WIDTH_BASE + 1)
+        self.board_widget.draw_text_on_square(chess.Move.from_uci(move_uci).to_square, label_text, USER_PGN_MOVE_COLOR)
         self.feedback_panel.update_feedback(feedback_str)
         
-        all_ucis = set(top_moves_9m.keys()) | set(top_moves_136m.keys())
-        if move_data["move_uci"] in all_ucis: all_ucis.remove(move_data["move_uci"])
+        suggestions_text, draw_ops = self._render_hints(board_before_move, a.top_moves_9m[k] or [], a.top_moves_136m[k] or [], exclude_uci=move_uci)
+        for op in draw_ops: self._draw_hint_on_board(*op)
+        self.feedback_panel.update_hints(hints_panel_text + "\n---Suggestions---\n" + suggestions_text)
 
-        processed_hints = [{'uci': uci, 'san': top_moves_136m.get(uci, {}).get('san') or top_moves_9m.get(uci, {}).get('san', uci), 'p_win_9m': top_moves_9m[uci]['p_win'] if uci in top_moves_9m else None, 'p_win_136m': top_moves_136m[uci]['p_win'] if uci in top_moves_136m else None} for uci in all_ucis]
-        processed_hints.sort(key=lambda x: x['p_win_136m'] if x['p_win_136m'] is not None else x['p_win_9m'], reverse=True)
-        
-        hints_panel_text += "\n---Suggestions---\n"
-        for i, hint in enumerate(processed_hints[:4]):
-            width = max(1, ARROW_WIDTH_BASE - 1 - i)
-            cp_9m = self._get_cp_for_mover(hint['p_win_9m'], board_before_move) if hint['p_win_9m'] is not None else None
-            cp_136m = self._get_cp_for_mover(hint['p_win_136m'], board_before_move) if hint['p_win_136m'] is not None else None
-            if cp_9m is not None and cp_136m is not None:
-                hints_panel_text += f"  - [Both] {hint['san']} (9M: {format_score_for_display(cp_9m, True)}, 136M: {format_score_for_display(cp_136m, True)})\n"
-                self._draw_hint_on_board(hint['uci'], cp_136m, HINT_COMBINED_COLOR, width)
-            elif cp_136m is not None:
-                hints_panel_text += f"  - [136M] {hint['san']} (CP: {format_score_for_display(cp_136m, True)})\n"
-                self._draw_hint_on_board(hint['uci'], cp_136m, self.hint_colors_136m[0], width)
-            elif cp_9m is not None:
-                hints_panel_text += f"  - [9M]   {hint['san']} (CP: {format_score_for_display(cp_9m, True)})\n"
-                self._draw_hint_on_board(hint['uci'], cp_9m, self.hint_colors_9m[0], width)
-        self.feedback_panel.update_hints(hints_panel_text)
+    def _get_pwin_after_9m(self, k: int) -> float:
+        """
+        9M P(win) for the mover after ply k. It is only displayed, never graded, so it is worked out on first
+        display and cached in the analysis: from the next ply's 9M top move, or through a chain of forced replies.
+        """
+        a = self.analysis
+        if np.isnan(a.pwin_after_9m[k]):
+            last = k
+            while last + 1 < len(a) and a.is_forced[last + 1]: last += 1 # The chain's value comes from the position after its last ply
+            if last + 1 < len(a) and a.top_moves_9m[last + 1]:
+                pwin = 1.0 - a.top_moves_9m[last + 1][0]['p_win']
+            else: # Only the final ply has no next top-moves list; its position is in the engine's analysis cache
+                board_after = a.board_before[last].copy(stack=False); board_after.push_uci(a.move_uci[last])
+                pwin = 1.0 - self.engine_manager.calculate_p_win_for_player(self.engine_manager.engine_9M, board_after, board_after.turn)
+            for j in range(last, k - 1, -1):
+                a.pwin_after_9m[j] = pwin
+                if a.is_forced[j]: a.top_moves_9m[j] = [{'san': a.move_san[j], 'uci': a.move_uci[j], 'p_win': pwin}]
+                pwin = 1.0 - pwin
+        return float(a.pwin_after_9m[k])
 
     def _redraw_for_play_mode(self):
         self.board_widget.clear_visual_cues()
@@ -270,29 +424,40 @@ class PgnAnalyzerController:
         
         self.feedback_panel.update_feedback(f"Play Mode: {chess.COLOR_NAMES[self.board_for_play_mode.turn]}'s turn to move.")
 
-        top_moves_9m = {m['uci']: m for m in self.engine_manager.get_top_engine_moves_list(self.engine_manager.engine_9M, self.board_for_play_mode, num_moves=3)}
-        top_moves_136m = {m['uci']: m for m in self.engine_manager.get_top_engine_moves_list(self.engine_manager.engine_136M, self.board_for_play_mode, num_moves=3)}
-        all_ucis = set(top_moves_9m.keys()) | set(top_moves_136m.keys())
+        top_list_9m, top_list_136m = self.engine_manager.top_moves_for_engines((self.engine_manager.engine_9M, self.engine_manager.engine_136M), self.board_for_play_mode, num_moves=3)
+        suggestions_text, draw_ops = self._render_hints(self.board_for_play_mode, top_list_9m, top_list_136m)
+        for op in draw_ops: self._draw_hint_on_board(*op)
+        self.feedback_panel.update_hints("--- Play Mode Hints ---\n" + suggestions_text)
+
+    def _render_hints(self, board: chess.Board, top_moves_9m: list, top_moves_136m: list, exclude_uci: str | None = None):
+        """
+        Merges the top-3 suggestions of both engines (minus exclude_uci) into the hints panel text and
+        the arrows to draw. Returns (text, draw_ops) with draw_ops as (uci, cp_for_mover, color, width).
+        """
+        top_9m = {m['uci']: m for m in top_moves_9m[:3]}
+        top_136m = {m['uci']: m for m in top_moves_136m[:3]}
+        all_ucis = top_9m.keys() | top_136m.keys()
+        all_ucis.discard(exclude_uci)
 
-        processed_hints = [{'uci': uci, 'san': top_moves_136m.get(uci, {}).get('san') or top_moves_9m.get(uci, {}).get('san', uci), 'p_win_9m': top_moves_9m[uci]['p_win'] if uci in top_moves_9m else None, 'p_win_136m': top_moves_136m[uci]['p_win'] if uci in top_moves_136m else None} for uci in all_ucis]
+        processed_hints = [{'uci': uci, 'san': top_136m.get(uci, {}).get('san') or top_9m.get(uci, {}).get('san', uci), 'p_win_9m': top_9m[uci]['p_win'] if uci in top_9m else None, 'p_win_136m': top_136m[uci]['p_win'] if uci in top_136m else None} for uci in all_ucis]
         processed_hints.sort(key=lambda x: x['p_win_136m'] if x['p_win_136m'] is not None else x['p_win_9m'], reverse=True)
-        
-        hints_panel_text = "--- Play Mode Hints ---\n"
-        for i, hint in enumerate(processed_hints[:4]):
-            width = max(1, ARROW_WIDTH_BASE - 1 - i)
-            cp_9m = self._get_cp_for_mover(hint['p_win_9m'], self.board_for_play_mode) if hint['p_win_9m'] is not None else None
-            cp_136m = self._get_cp_for_mover(hint['p_win_136m'], self.board_for_play_mode) if hint['p_win_136m'] is not None else None
-            
+
+        turn = board.turn; fmt = format_score_for_display
+        lines = []; draw_ops = []
+        for hint, width in zip(processed_hints, HINT_WIDTHS):
+            p_win_9m = hint['p_win_9m']; p_win_136m = hint['p_win_136m']; uci = hint['uci']; san = hint['san']
+            cp_9m = _cp_for_mover(p_win_9m, turn) if p_win_9m is not None else None
+            cp_136m = _cp_for_mover(p_win_136m, turn) if p_win_136m is not None else None
             if cp_9m is not None and cp_136m is not None:
-                hints_panel_text += f"  - [Both] {hint['san']} (9M: {format_score_for_display(cp_9m, True)}, 136M: {format_score_for_display(cp_136m, True)})\n"
-                self._draw_hint_on_board(hint['uci'], cp_136m, HINT_COMBINED_COLOR, width)
+                lines.append(f"  - [Both] {san} (9M: {fmt(cp_9m, True)}, 136M: {fmt(cp_136m, True)})\n")
+                draw_ops.append((uci, cp_136m, HINT_COMBINED_COLOR, width))
             elif cp_136m is not None:
-                hints_panel_text += f"  - [136M] {hint['san']} (CP: {format_score_for_display(cp_136m, True)})\n"
-                self._draw_hint_on_board(hint['uci'], cp_136m, self.hint_colors_136m[0], width)
+                lines.append(f"  - [136M] {san} (CP: {fmt(cp_136m, True)})\n")
+                draw_ops.append((uci, cp_136m, self.hint_colors_136m[0], width))
             elif cp_9m is not None:
-                hints_panel_text += f"  - [9M]   {hint['san']} (CP: {format_score_for_display(cp_9m, True)})\n"
-                self._draw_hint_on_board(hint['uci'], cp_9m, self.hint_colors_9m[0], width)
-        self.feedback_panel.update_hints(hints_panel_text)
+                lines.append(f"  - [9M]   {san} (CP: {fmt(cp_9m, True)})\n")
+                draw_ops.append((uci, cp_9m, self.hint_colors_9m[0], width))
+        return "".join(lines), draw_ops
 
     def handle_board_resize(self):
         self._redraw_visuals_for_current_move()
@@ -2,35 +2,109 @@
 import chess
 import chess.pgn
 import io
+import re
 import logging
 
+# Fast path for plain mainline PGNs; anything these do not fully account for goes through chess.pgn.read_game.
+_TAG_RE = re.compile(r'^\[([A-Za-z0-9_]+)\s+"((?:[^"\\]|\\.)*)"\]\s*$')
+_COMMENT_RE = re.compile(r'\{[^}]*\}|;[^\n]*')
+_VARIATION_RE = re.compile(r'\([^()]*\)') # Innermost variations; applied until none are left
+_SAN_RE = re.compile(r'([RNBQK]?[a-h]?[1-8]?x?[a-h][1-8](?:=[RNBQ])?|O-O(?:-O)?|0-0(?:-0)?)([+#]?)([!?]{0,2})')
+_MOVETEXT_FILLER_RE = re.compile(r'\d+\.(?:\.\.)?|\$\d+|1-0|0-1|1/2-1/2|\*|\s+')
+
 class PgnManager:
     def __init__(self):
         self.game: chess.pgn.Game | None = None
         self.current_node: chess.pgn.GameNode | None = None # Current node being viewed
         self.board_at_current_node: chess.Board | None = None # Board state for current_node
+        self._mainline_nodes: list[chess.pgn.GameNode] = [] # Index i is the node i plies after the game's start (0 is the game itself)
+        self._mainline_index: dict[chess.pgn.GameNode, int] = {} # Mainline node -> its index in _mainline_nodes (by identity)
+        self._total_plies = 0
+        self._san_by_node: dict[chess.pgn.GameNode, str] = {} # SAN of each node's move, filled as it is first asked for
 
     def load_pgn_from_string(self, pgn_string: str) -> bool:
+        return self.load_pgn_from_stream(io.StringIO(pgn_string))
+
+    def load_pgn_from_stream(self, pgn_file) -> bool:
+        """Loads the next game from a text stream (file, spooled temp file, StringIO)."""
         try:
-            pgn_file = io.StringIO(pgn_string)
-            self.game = chess.pgn.read_game(pgn_file)
+            game_text = self._read_next_game_text(pgn_file)
+            self.game = self._parse_game_fast(game_text) if game_text else None
+            if self.game is None and game_text:
+                self.game = chess.pgn.read_game(io.StringIO(game_text))
+            self._index_mainline()
             if self.game:
                 self.go_to_start()
                 logging.info("PGN game loaded successfully.")
                 return True
             else:
-                logging.error("No game found in PGN string.")
+                logging.error("No game found in PGN stream.")
                 self.game = None; self.current_node = None; self.board_at_current_node = None
                 return False
         except Exception as e:
-            logging.error(f"Error loading PGN from string: {e}")
+            logging.error(f"Error loading PGN from stream: {e}")
             self.game = None; self.current_node = None; self.board_at_current_node = None
+            self._index_mainline()
             return False
 
+    def _index_mainline(self):
+        self._mainline_nodes = [self.game, *self.game.mainline()] if self.game else []
+        self._mainline_index = {node: i for i, node in enumerate(self._mainline_nodes)}
+        self._total_plies = len(self._mainline_nodes) - 1 if self._mainline_nodes else 0 # node.ply() starts above 0 for [FEN] games
+        self._san_by_node = {}
+
+    @staticmethod
+    def _read_next_game_text(pgn_file) -> str:
+        """Reads one game (tag section + movetext), stopping before the next game's tags."""
+        lines = []
+        seen_movetext = False
+        while True:
+            offset = pgn_file.tell()
+            line = pgn_file.readline()
+            if not line: break
+            stripped = line.strip()
+            if stripped.startswith("[") and seen_movetext:
+                pgn_file.seek(offset) # Leave the next game's tags for the next call
+                break
+            if stripped and not stripped.startswith(("[", "%")): seen_movetext = True
+            lines.append(line)
+        return "".join(lines)
+
+    @staticmethod
+    def _parse_game_fast(game_text: str) -> chess.pgn.Game | None:
+        """Regex tokenizer for simple PGNs. Returns None when the text needs the full parser."""
+        game = chess.pgn.Game()
+        movetext_lines = []
+        for line in game_text.splitlines():
+            tag_match = _TAG_RE.match(line.strip())
+            if tag_match: game.headers[tag_match.group(1)] = tag_match.group(2).replace('\\"', '"').replace('\\\\', '\\')
+            elif line.lstrip().startswith(("[", "%")): return None
+            else: movetext_lines.append(line)
+        if "FEN" in game.headers or game.headers.get("Variant", "Standard").lower() not in ("standard", "chess"):
+            return None # Custom start positions and variants are left to chess.pgn
+
+        movetext = _COMMENT_RE.sub(" ", "\n".join(movetext_lines))
+        while True:
+            without_variations = _VARIATION_RE.sub(" ", movetext)
+            if without_variations == movetext: break
+            movetext = without_variations
+        if _MOVETEXT_FILLER_RE.sub("", _SAN_RE.sub("", movetext)): return None # Unrecognized tokens
+
+        board = game.board()
+        node = game
+        try:
+            for san_match in _SAN_RE.finditer(movetext):
+                move = board.push_san(san_match.group(1).replace("0", "O"))
+                node = node.add_variation(move)
+        except ValueError:
+            return None
+        return game
+
     def is_game_loaded(self) -> bool:
         return self.game is not None
 
     def _update_board_for_current_node(self):
+        # Full replay from the root; only called for the root itself. Steps and jumps push/pop the cached board instead.
         if self.current_node:
             self.board_at_current_node = self.current_node.board()
         else:
@@ -44,10 +118,27 @@ class PgnManager:
 
     def go_to_end(self):
         if not self.game: return
-        self.current_node = self.game.end()
-        self._update_board_for_current_node()
+        self.go_to_ply(self._total_plies)
         logging.debug("PGN: Navigated to end.")
 
+    def go_to_ply(self, ply: int) -> bool:
+        """Jumps to the mainline node `ply` plies after the game's start, pushing/popping the cached board by the difference."""
+        if not self.game or not (0 <= ply < len(self._mainline_nodes)): return False
+        if self.current_node is None or self.board_at_current_node is None: self.go_to_start()
+        node = self.current_node
+        while node not in self._mainline_index and node.parent is not None:
+            # Viewing a side variation: pop back to where it leaves the mainline instead of replaying from the root
+            node = node.parent; self.board_at_current_node.pop()
+        current_ply = self._mainline_index.get(node)
+        if current_ply is None: # Not a node of this game; should not happen
+            self.go_to_start(); current_ply = 0
+        while current_ply > ply:
+            self.board_at_current_node.pop(); current_ply -= 1
+        while current_ply < ply:
+            current_ply += 1; self.board_at_current_node.push(self._mainline_nodes[current_ply].move)
+        self.current_node = self._mainline_nodes[ply]
+        return True
+
     def next_move(self) -> bool: # Returns True if successful, False if no next move
         if not self.current_node or self.current_node.is_end():
             logging.debug("PGN: Already at end or no next move.")
@@ -56,7 +147,7 @@ class PgnManager:
         # In PGN, a node can have multiple variations. We'll focus on the main one for now.
         if self.current_node.variations:
             self.current_node = self.current_node.variations[0]
-            self._update_board_for_current_node()
+            self.board_at_current_node.push(self.current_node.move)
             logging.debug(f"PGN: Moved to next: {self.get_current_move_san() if self.current_node.move else 'N/A'}")
             return True
         return False
@@ -66,7 +157,7 @@ class PgnManager:
             logging.debug("PGN: Already at start or no parent.")
             return False
         self.current_node = self.current_node.parent
-        self._update_board_for_current_node()
+        self.board_at_current_node.pop()
         logging.debug(f"PGN: Moved to previous. Current move leading to this board: {self.get_current_move_san() if self.current_node.move else 'Initial'}")
         return True
 
@@ -84,27 +175,39 @@ class PgnManager:
     def get_current_move_san(self) -> str | None:
         """Returns the SAN of the move that LED to the current_node's board state."""
         if self.current_node and self.current_node.move:
-            # The SAN is stored on the node *relative to its parent's board*
-            # We need the parent's board to correctly generate SAN for the current move.
-            parent_board = self.current_node.parent.board() if self.current_node.parent else chess.Board() # Base board if no parent
+            cached_san = self._san_by_node.get(self.current_node)
+            if cached_san is not None: return cached_san
+            # Step the cached board back to the parent position for SAN, then restore it (O(1), no replay)
+            board = self.board_at_current_node
+            move = board.pop()
             try:
-                return parent_board.san(self.current_node.move)
+                san = self._san_by_node[self.current_node] = board.san(move)
+                return san
             except Exception as e:
-                logging.warning(f"PGN: Error generating SAN for move {self.current_node.move.uci()}: {e}")
-                return self.current_node.move.uci() # Fallback to UCI
+                logging.warning(f"PGN: Error generating SAN for move {move.uci()}: {e}")
+                return move.uci() # Fallback to UCI
+            finally:
+                board.push(move)
         return None # If at the start or no move
 
+    def get_mainline_nodes(self) -> list[chess.pgn.GameNode]:
+        """Mainline nodes indexed at load: index i is the node i plies after the game's start (0 is the game itself). Do not modify."""
+        return self._mainline_nodes
+
+    def remember_san(self, node: chess.pgn.GameNode, san: str):
+        """Records a SAN the caller already generated for node.move, so get_current_move_san can skip it."""
+        self._san_by_node[node] = san
+
     def get_headers(self) -> chess.pgn.Headers:
         return self.game.headers if self.game else chess.pgn.Headers()
 
     def get_total_plies_mainline(self) -> int:
         if not self.game: return 0
-        # self.game.ply() returns 0 after loading. We must go to the end.
-        return self.game.end().ply()
+        return self._total_plies # Precomputed from the mainline when the game was loaded
 
     def get_current_ply_number(self) -> int:
-        """Returns the ply number of the board position *after* current_node.move is made."""
+        """Returns the ply number of the board position *after* current_node.move is made, counted from the game's start."""
         if self.current_node:
-            return self.current_node.ply()
+            return self.current_node.ply() - self.game.ply()
         return 0
 # ===== END OF FILE pgn_manager.py =====
\ No newline at end of file
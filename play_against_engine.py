@@ -3,6 +3,8 @@ from tkinter import ttk, messagebox
 import os
 import sys
 import logging
+import threading
+from dataclasses import dataclass
 import chess # For chess.WHITE, chess.BLACK constants
 
 from constants import (
@@ -14,6 +16,15 @@ from engines import SearchlessEngineManager, SEARCHLESS_ENGINES_AVAILABLE
 from chess_board_widget import ChessBoardWidget
 from blunder_feedback_panel import BlunderFeedbackPanel # Renaming this or its usage might be a future step
 from game_controller import GameController 
+from widget_states import WidgetStates
+
+@dataclass(frozen=True)
+class _ButtonState:
+    """Everything the control buttons' enabled states depend on, computed once per update."""
+    game_is_active: bool = False
+    is_player_turn: bool = False
+    can_take_back: bool = False
+
 
 class MainChessVsEngineGUI:
     def __init__(self, root_tk_window):
@@ -26,6 +37,7 @@ class MainChessVsEngineGUI:
         self.engine_manager = SearchlessEngineManager()
         self.controller = None 
         self.show_hints_var_tk = tk.BooleanVar(value=False)
+        self._engine_warm = threading.Event() # Set once warm_up_engines has compiled the 9M's batch shapes
 
         self._create_main_widgets_layout()
         self._initialize_application_logic(self.root) 
@@ -107,6 +119,18 @@ class MainChessVsEngineGUI:
             on_resize_callback=self.handle_board_widget_resize_from_gui
         )
         self.board_widget_component.frame.grid(row=0, column=0, sticky="nsew", padx=5, pady=5)
+
+        # (key, widget, state for a _ButtonState); start / flip stay enabled so a new game can always be set up
+        self._state_widgets = [
+            ('start', self.start_game_btn, lambda s: tk.NORMAL),
+            ('play_as_black', self.play_as_black_btn, lambda s: tk.NORMAL),
+            ('reset', self.reset_game_btn, lambda s: tk.NORMAL if s.game_is_active else tk.DISABLED),
+            ('flip', self.flip_board_btn, lambda s: tk.NORMAL),
+            ('hints', self.show_hints_checkbox, lambda s: tk.NORMAL if s.game_is_active else tk.DISABLED),
+            ('engine_move', self.make_engine_move_btn, lambda s: tk.NORMAL if s.is_player_turn else tk.DISABLED),
+            ('take_back', self.take_back_btn, lambda s: tk.NORMAL if s.can_take_back else tk.DISABLED),
+        ]
+        self._button_states = WidgetStates()
         print("✅ Main widgets layout created.")
 
     def _initialize_application_logic(self, root_tk): 
@@ -129,6 +153,9 @@ class MainChessVsEngineGUI:
             return
         logging.info("9M Engine loaded for play.")
         print("✅ 9M Engine loaded.")
+
+        # XLA compiles each batch shape on first use; do it off the Tk thread so the first engine move does not stall
+        threading.Thread(target=self._bg_warm_up_engine, daemon=True).start()
         
         self.controller = GameController(
             board_widget=self.board_widget_component,
@@ -142,14 +169,28 @@ class MainChessVsEngineGUI:
         print("🔄 GameController setup in GUI...")
 
         self.controller._transition_to_mode("IDLE") 
-        self.status_bar_variable.set("Ready. Choose to play as White or Black.")
+        self.status_bar_variable.set("Warming up engine...")
         print("✅ Game controller linked to GUI. Ready for actions.")
         
         self._update_gui_button_states()
+        self._poll_engine_warm_up()
+
+    def _bg_warm_up_engine(self):
+        try:
+            self.engine_manager.warm_up_engines()
+        finally:
+            self._engine_warm.set()
+
+    def _poll_engine_warm_up(self):
+        if not self._engine_warm.is_set():
+            self.root.after(100, self._poll_engine_warm_up); return
+        if self.status_bar_variable.get() == "Warming up engine...": # Leave alone if a game already changed it
+            self.status_bar_variable.set("Ready. Choose to play as White or Black.")
 
     def _on_application_window_close(self):
         logging.info("Chess vs 9M Engine: Closing application.")
         print("Application closing.")
+        if self.controller: self.controller.shutdown() # Drop any engine search still running
         self.root.destroy()
 
     def _gui_action_toggle_hints(self):
@@ -189,40 +230,23 @@ class MainChessVsEngineGUI:
             logging.warning("MainGUI: Resize event received, but controller not yet initialized.")
 
     def _update_gui_button_states(self):
-        if not self.controller or not hasattr(self.controller, 'game_manager'): 
-            # Initial setup or error state, disable most things
-            if hasattr(self, 'start_game_btn'): self.start_game_btn.config(state=tk.NORMAL)
-            if hasattr(self, 'play_as_black_btn'): self.play_as_black_btn.config(state=tk.NORMAL)
-            if hasattr(self, 'reset_game_btn'): self.reset_game_btn.config(state=tk.DISABLED)
-            if hasattr(self, 'flip_board_btn'): self.flip_board_btn.config(state=tk.NORMAL) # Can flip empty board
-            if hasattr(self, 'show_hints_checkbox'): self.show_hints_checkbox.config(state=tk.DISABLED)
-            if hasattr(self, 'make_engine_move_btn'): self.make_engine_move_btn.config(state=tk.DISABLED)
-            if hasattr(self, 'take_back_btn'): self.take_back_btn.config(state=tk.DISABLED)
-            return
-
-        mode = self.controller.current_interaction_mode
-        game_is_active = self.controller.game_manager.is_active()
-        is_player_turn = game_is_active and mode == "PLAYER_TURN"
-        can_take_back = game_is_active and self.controller.game_manager.has_moves_to_take_back()
-
-        # Start game buttons are always enabled to allow starting a new game
-        self.start_game_btn.config(state=tk.NORMAL)
-        self.play_as_black_btn.config(state=tk.NORMAL)
-        
-        self.reset_game_btn.config(state=tk.NORMAL if game_is_active else tk.DISABLED)
-        
-        # Flip board / Swap Sides: always enabled, behavior changes if game is active
-        self.flip_board_btn.config(state=tk.NORMAL) 
-        
-        self.show_hints_checkbox.config(state=tk.NORMAL if game_is_active else tk.DISABLED)
-        # Removed auto-unchecking logic; hint visibility is now solely controlled by
-        # self.show_hints_var_tk (via user) and GameController.show_hints_active
-
-        self.make_engine_move_btn.config(state=tk.NORMAL if is_player_turn else tk.DISABLED)
-        self.take_back_btn.config(state=tk.NORMAL if can_take_back else tk.DISABLED)
-
-        logging.debug(f"MainGUI: Buttons updated. Mode: {mode}, GameActive: {game_is_active}, PlayerTurn: {is_player_turn}, CanTakeBack: {can_take_back}")
-
+        if not self.controller or not hasattr(self.controller, 'game_manager'):
+            state = _ButtonState() # Initial setup or error state: no game, so only the start / flip controls
+            mode = None
+        else:
+            mode = self.controller.current_interaction_mode
+            game_is_active = self.controller.game_manager.is_active()
+            state = _ButtonState(
+                game_is_active=game_is_active,
+                is_player_turn=game_is_active and mode == "PLAYER_TURN",
+                can_take_back=game_is_active and self.controller.game_manager.has_moves_to_take_back(),
+            )
+        # Hint visibility itself is controlled by self.show_hints_var_tk (via user) and GameController.show_hints_active
+
+        for key, widget, state_for in self._state_widgets:
+            self._button_states.apply(widget, key, state_for(state))
+
+        logging.debug(f"MainGUI: Buttons updated. Mode: {mode}, GameActive: {state.game_is_active}, PlayerTurn: {state.is_player_turn}, CanTakeBack: {state.can_take_back}")
 
 def setup_logging():
     log_file_path = LOG_FILENAME 
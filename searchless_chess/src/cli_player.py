@@ -7,6 +7,7 @@ from absl import flags
 import chess
 
 from searchless_chess.src.engines import constants
+from searchless_chess.src.engines import neural_engines
 
 _AGENT = flags.DEFINE_enum(
     name='agent',
@@ -26,23 +27,65 @@ _AGENT = flags.DEFINE_enum(
     required=True,
 )
 
+class FastBoard(chess.Board):
+    """Board that remembers its fen() until the next push/pop/set_fen/reset/clear.
+
+    The CLI loop, the engine wrapper and the engine itself each ask for the FEN of
+    the same position; only the first call serializes the board. Editing squares
+    directly (set_piece_at etc.) does not invalidate the cached string.
+    """
+    _fen_cache = None  # Class default, so copies and freshly built boards start uncached
+
+    def fen(self, **kwargs) -> str:
+        if kwargs:
+            return super().fen(**kwargs)
+        if self._fen_cache is None:
+            self._fen_cache = super().fen()
+        return self._fen_cache
+
+    def push(self, move: chess.Move) -> None:
+        self._fen_cache = None
+        super().push(move)
+
+    def pop(self) -> chess.Move:
+        self._fen_cache = None
+        return super().pop()
+
+    def set_fen(self, fen: str) -> None:
+        self._fen_cache = None
+        super().set_fen(fen)
+
+    def reset(self) -> None:
+        self._fen_cache = None
+        super().reset()
+
+    def clear(self) -> None:
+        self._fen_cache = None
+        super().clear()
+
 def print_board(board: chess.Board):
     print("\n" + board.unicode())
     print(f"\nFEN: {board.fen()}")
     print(f"Turn: {'White' if board.turn else 'Black'}\n")
 
 def play_game(engine) -> None:
-    board = chess.Board()
+    board = FastBoard()
+    legal_moves = None  # Generated once per position, then reused while the user retries
+    game_over = board.is_game_over()  # Only re-checked after a move is pushed
 
-    while not board.is_game_over():
+    while not game_over:
         print_board(board)
 
         if board.turn:  # Human (White)
+            if legal_moves is None:
+                legal_moves = set(board.legal_moves)
             move_input = input("Your move (UCI, e.g. e2e4): ").strip()
             try:
                 move = chess.Move.from_uci(move_input)
-                if move in board.legal_moves:
+                if move in legal_moves:
                     board.push(move)
+                    legal_moves = None
+                    game_over = board.is_game_over()
                 else:
                     print("Illegal move. Try again.")
             except Exception:
@@ -52,6 +95,7 @@ def play_game(engine) -> None:
             move_uci = engine.play(board=board).uci()
             print(f"Engine plays: {move_uci}")
             board.push(chess.Move.from_uci(move_uci))
+            game_over = board.is_game_over()
 
     print_board(board)
     print("Game over.")
@@ -62,7 +106,13 @@ def main(argv):
         raise app.UsageError("Too many command-line arguments.")
 
     engine = constants.ENGINE_BUILDERS[_AGENT.value]()
-    play_game(engine)
+    if isinstance(engine, neural_engines.NeuralEngine):
+        engine = neural_engines.PonderingEngine(engine)
+    try:
+        play_game(engine)
+    finally:
+        if isinstance(engine, neural_engines.PonderingEngine):
+            engine.close()
 
 if __name__ == "__main__":
     app.run(main)
@@ -18,65 +18,88 @@
 """Constants for the engines."""
 
 import functools
+import importlib
+import json
+import logging
 import os
-import sys # Import sys for the flush
+import shutil
+from typing import TYPE_CHECKING
 
 import chess
 import chess.engine
 import chess.pgn
-from jax import random as jrandom  # <<< ENSURE THIS MODULE-LEVEL IMPORT IS PRESENT
 import numpy as np
 
-# These imports will now resolve relative to web_player_folder/searchless_chess/src/
+# jax, neural_engines, transformer and training_utils (haiku, optax, orbax) are
+# imported when a neural engine is first built, and the Stockfish / Lc0
+# wrappers when those engines are built, so importing this module stays cheap
+# and does not start the JAX backend.
 from searchless_chess.src import tokenizer
-from searchless_chess.src import training_utils
-from searchless_chess.src import transformer
 from searchless_chess.src import utils
-from searchless_chess.src.engines import lc0_engine
-from searchless_chess.src.engines import neural_engines
-from searchless_chess.src.engines import stockfish_engine
 
-# --- START OF IDENTIFICATION AND MODIFICATION ---
-print("="*50, flush=True)
-print(">>> EXECUTING MODIFIED web_player_folder/searchless_chess/src/engines/constants.py (SIMSIM314's VERSION V2 - FULL) <<<", flush=True)
-print(f">>> Current __file__ for this constants.py: {os.path.abspath(__file__)} <<<", flush=True)
-print("="*50, flush=True)
+if TYPE_CHECKING:
+  import jax
+  from searchless_chess.src.engines import neural_engines
 
+# Checkpoints live in searchless_chess/checkpoints/<model_name>/.
 _THIS_FILE_DIR = os.path.dirname(os.path.abspath(__file__))
-print(f">>> DEBUG: _THIS_FILE_DIR = {_THIS_FILE_DIR}", flush=True)
-
 _SEARCHLESS_CHESS_ROOT_DIR = os.path.dirname(os.path.dirname(_THIS_FILE_DIR))
-print(f">>> DEBUG: _SEARCHLESS_CHESS_ROOT_DIR = {_SEARCHLESS_CHESS_ROOT_DIR}", flush=True)
-
 _CHECKPOINTS_BASE_DIR = os.path.join(_SEARCHLESS_CHESS_ROOT_DIR, "checkpoints")
-print(f">>> DEBUG: _CHECKPOINTS_BASE_DIR = {_CHECKPOINTS_BASE_DIR}", flush=True)
-# --- END OF IDENTIFICATION AND MODIFICATION ---
 
+# Set to '0' to neither read nor write the .npy parameter copies kept next to
+# the checkpoints (see _load_predictor_and_params).
+_PARAMS_CACHE_ENV_VAR = 'SEARCHLESS_CHESS_PARAMS_CACHE'
+# Lists the (module, name) of each params_step<N>/<i>.npy; written last, so a
+# directory without it is incomplete and ignored.
+_PARAMS_MANIFEST = 'manifest.json'
 
-def _build_neural_engine(
-    model_name: str,
-    checkpoint_step: int = -1,
-) -> neural_engines.NeuralEngine:
-  """Returns a neural engine."""
-  print(f">>> INSIDE _build_neural_engine (from web_player_folder version) for model: {model_name} <<<", flush=True)
+# Compiled predict_fn executables are kept here across processes. Set to '0'
+# to compile from scratch on every launch.
+_XLA_CACHE_DIR = os.path.join(_CHECKPOINTS_BASE_DIR, 'xla_cache')
+_XLA_CACHE_ENV_VAR = 'SEARCHLESS_CHESS_XLA_CACHE'
 
-  # --- TEMPORARY DEBUG IMPORT ---
-  print(">>> DEBUG: Attempting to import jax.random as jrandom_local INSIDE _build_neural_engine <<<", flush=True)
-  jrandom_local_imported_successfully = False
-  try:
-    from jax import random as jrandom_local # Use a different alias
-    print(">>> DEBUG: Successfully imported jrandom_local INSIDE function <<<", flush=True)
-    jrandom_local_imported_successfully = True
-  except Exception as e:
-    print(f">>> DEBUG: FAILED to import jrandom_local INSIDE function: {e} <<<", flush=True)
-  # --- END TEMPORARY DEBUG IMPORT ---
+# Batch shapes predict_fn pads to: one position's legal moves fit in the
+# smallest, batched game analysis runs in the largest.
+PREDICT_BUCKET_SIZES = (64, 256, 1024)
+
+# Models whose engines run on bfloat16 parameters unless the caller says
+# otherwise. Setting SEARCHLESS_CHESS_DTYPE=float32 keeps every engine in
+# float32, even where bfloat16 was asked for (e.g. CPU-only machines).
+_BF16_DEFAULT_MODELS = frozenset({'9M'})
+_DTYPE_ENV_VAR = 'SEARCHLESS_CHESS_DTYPE'
+
+# Set to '1' to keep the output projection of every neural engine in int8
+# (see neural_engines.wrap_predict_fn's int8_head).
+_QUANTIZE_HEAD_ENV_VAR = 'QUANTIZE_HEAD'
+
+# Dummy inputs for predictor.initial_params, shared by every checkpoint load.
+# The PRNG key is made on first use (see _init_rng), not at import.
+_INIT_TARGETS = np.ones((1, 1), dtype=np.uint32)
+
+
+@functools.lru_cache(maxsize=None)
+def _init_rng() -> 'jax.Array':
+  """Returns the shared PRNG key; creating it initializes the JAX backend."""
+  import jax  # pylint: disable=g-import-not-at-top
+
+  return jax.random.PRNGKey(1)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_predictor_and_params(model_name: str, checkpoint_step: int):
+  """Builds the predictor and loads its parameters, once per checkpoint.
 
-  # Check if the module-level jrandom is defined
-  if 'jrandom' in globals() or 'jrandom' in locals():
-      print(">>> DEBUG: Module-level 'jrandom' IS defined before use. <<<", flush=True)
-  else:
-      print(">>> DEBUG: Module-level 'jrandom' IS NOT defined before use. THIS IS THE PROBLEM. <<<", flush=True)
+  The int8/bf16 variants of a model and the full-precision reference engine all
+  share the result. Loaded parameters are also saved as .npy arrays next to the
+  checkpoint, which later processes memory-map instead of parsing the
+  checkpoint again.
 
+  Returns:
+    (predictor, params, policy, num_return_buckets).
+  """
+  logging.debug(f'Loading predictor and parameters for {model_name} (step {checkpoint_step}).')
+  from searchless_chess.src import training_utils  # pylint: disable=g-import-not-at-top
+  from searchless_chess.src import transformer  # pylint: disable=g-import-not-at-top
 
   match model_name:
     case '9M':
@@ -127,72 +150,157 @@ def _build_neural_engine(
 
   predictor = transformer.build_transformer_predictor(config=predictor_config)
 
-  print(f">>> DEBUG _build_neural_engine: _CHECKPOINTS_BASE_DIR = {_CHECKPOINTS_BASE_DIR}", flush=True)
-  print(f">>> DEBUG _build_neural_engine: model_name = {model_name}", flush=True)
+  checkpoint_dir = os.path.join(_CHECKPOINTS_BASE_DIR, model_name)
+  if not os.path.exists(checkpoint_dir):
+    raise FileNotFoundError(f'Checkpoint directory not found: {checkpoint_dir}')
 
-  checkpoint_dir = os.path.join(
-      _CHECKPOINTS_BASE_DIR,
-      model_name,
+  arrays_path = (
+      os.path.join(checkpoint_dir, f'params_step{checkpoint_step}')
+      if checkpoint_step >= 0 and os.environ.get(_PARAMS_CACHE_ENV_VAR, '1') != '0'
+      else None  # The latest step is only resolved inside load_parameters.
   )
-  print(f">>> DEBUG _build_neural_engine: Attempting checkpoint_dir = {checkpoint_dir}", flush=True)
-
-
-  if not os.path.exists(checkpoint_dir):
-      print(f"!!! ERROR (web_player_folder version): Checkpoint directory NOT FOUND: {checkpoint_dir}", flush=True)
-      raise FileNotFoundError(
-          f"CRITICAL ERROR IN MODIFIED 'web_player_folder/searchless_chess/src/engines/constants.py': "
-          f"Constructed checkpoint_dir does not exist: {checkpoint_dir}. "
-          f"_SEARCHLESS_CHESS_ROOT_DIR was: {_SEARCHLESS_CHESS_ROOT_DIR}"
-      )
-  else:
-      print(f"--- SUCCESS (web_player_folder version): Checkpoint directory FOUND: {checkpoint_dir}", flush=True)
-
-  print(">>> DEBUG: About to call training_utils.load_parameters <<<", flush=True)
-  
-  # Determine which jrandom to use for the call
-  # Prioritize the module-level one if it's somehow defined, otherwise try the local one
-  # This is purely for debugging this strange NameError
-  rng_key_source = None
-  if 'jrandom' in globals() or 'jrandom' in locals():
-      rng_key_source = jrandom.PRNGKey(1)
-      print(">>> DEBUG: Using module-level jrandom for PRNGKey <<<", flush=True)
-  elif jrandom_local_imported_successfully:
-      rng_key_source = jrandom_local.PRNGKey(1)
-      print(">>> DEBUG: Using function-local jrandom_local for PRNGKey <<<", flush=True)
-  else:
-      print(">>> DEBUG: NEITHER jrandom NOR jrandom_local is available for PRNGKey. Expecting NameError. <<<", flush=True)
-      # Let the NameError happen naturally if neither is defined.
-      # If we force jrandom here and it's not defined, it will raise the NameError we're trying to debug.
-
-  # If rng_key_source is still None, the original NameError for 'jrandom' will occur here if it was truly undefined
-  # Or, if we used jrandom_local, and that was also undefined (e.g. import failed), an error would occur.
-  try:
+  params = _read_params_arrays(arrays_path) if arrays_path else None
+  if params is None:
     params = training_utils.load_parameters(
         checkpoint_dir=checkpoint_dir,
         params=predictor.initial_params(
-            rng=jrandom.PRNGKey(1), # Explicitly use the module-level jrandom to test its definition
-            targets=np.ones((1, 1), dtype=np.uint32),
+            rng=_init_rng(), targets=_INIT_TARGETS
         ),
         step=checkpoint_step,
     )
-  except NameError as ne:
-    print(f">>> DEBUG: CAUGHT NameError during predictor.initial_params or load_parameters: {ne} <<<", flush=True)
-    if 'jrandom' in str(ne):
-        print(">>> DEBUG: The NameError is for 'jrandom'. This confirms the module-level import is not working/visible here.", flush=True)
-    if jrandom_local_imported_successfully:
-        print(">>> DEBUG: Trying again with jrandom_local... <<<", flush=True)
-        params = training_utils.load_parameters(
-            checkpoint_dir=checkpoint_dir,
-            params=predictor.initial_params(
-                rng=jrandom_local.PRNGKey(1), 
-                targets=np.ones((1, 1), dtype=np.uint32),
-            ),
-            step=checkpoint_step,
+    if arrays_path:
+      _write_params_arrays(arrays_path, params)
+
+  return predictor, params, policy, num_return_buckets
+
+
+def _read_params_arrays(path: str):
+  """Returns the parameters saved at `path`, or None if there are none.
+
+  Each array is memory-mapped from its .npy file (never unpickled), so the
+  device_put onto the device is the only copy made.
+  """
+  import jax  # pylint: disable=g-import-not-at-top
+
+  manifest_path = os.path.join(path, _PARAMS_MANIFEST)
+  if not os.path.exists(manifest_path):
+    return None
+  try:
+    with open(manifest_path) as f:
+      manifest = json.load(f)
+    params = {}
+    for index, (module_name, param_name) in enumerate(manifest):
+      params.setdefault(module_name, {})[param_name] = np.load(
+          os.path.join(path, f'{index}.npy'), mmap_mode='r', allow_pickle=False
+      )
+    # Onto the device, so predict_fn does not re-upload them on every call.
+    return jax.device_put(params)
+  except (OSError, ValueError, TypeError) as e:
+    logging.warning(f'Ignoring unreadable parameter arrays {path}: {e}')
+    return None
+
+
+def _write_params_arrays(path: str, params) -> None:
+  """Saves `params` as one .npy per array; failures only cost the speedup."""
+  tmp_path = f'{path}.tmp'
+  try:
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    manifest = []
+    for module_name, module_params in params.items():
+      for param_name, value in module_params.items():
+        np.save(
+            os.path.join(tmp_path, f'{len(manifest)}.npy'),
+            np.asarray(value),
+            allow_pickle=False,
         )
-        print(">>> DEBUG: Successfully used jrandom_local. <<<", flush=True)
-    else:
-        raise ne # Re-raise the original error if local import also failed
+        manifest.append([module_name, param_name])
+    with open(os.path.join(tmp_path, _PARAMS_MANIFEST), 'w') as f:
+      json.dump(manifest, f)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)  # Readers never see a half-written directory.
+  except (OSError, ValueError) as e:
+    logging.warning(f'Could not write parameter arrays {path}: {e}')
+
+
+def resolve_precision(
+    model_name: str,
+    bf16_weights: bool | None = None,
+    int8_head: bool | None = None,
+) -> tuple[bool, bool]:
+  """Returns the (bf16_weights, int8_head) an engine is actually built with.
+
+  bf16_weights=None picks the model's default (see _BF16_DEFAULT_MODELS), and
+  SEARCHLESS_CHESS_DTYPE=float32 turns it off regardless. int8_head=None
+  follows QUANTIZE_HEAD.
+  """
+  if bf16_weights is None:
+    bf16_weights = model_name in _BF16_DEFAULT_MODELS
+  if os.environ.get(_DTYPE_ENV_VAR, '').lower() == 'float32':
+    bf16_weights = False
+  if int8_head is None:
+    int8_head = os.environ.get(_QUANTIZE_HEAD_ENV_VAR, '0') == '1'
+  return bf16_weights, int8_head
 
+
+def _build_neural_engine(
+    model_name: str,
+    checkpoint_step: int = -1,
+    int8_weights: bool = False,
+    bf16_weights: bool | None = None,
+    int8_head: bool | None = None,
+) -> 'neural_engines.NeuralEngine':
+  """Returns a neural engine, optionally with int8 or bfloat16 weights.
+
+  bf16_weights and int8_head are resolved by resolve_precision, so by default
+  they follow the model and the environment; pass False for both to get a
+  full-precision engine (e.g. a reference). Engines are memoized per (model,
+  step, int8, bf16, int8 head), so building the same engine again (a GUI
+  reopening, a second manager) reuses it, jit cache and all.
+  """
+  bf16_weights, int8_head = resolve_precision(
+      model_name, bf16_weights, int8_head
+  )
+  _enable_compilation_cache()
+  return _build_cached_neural_engine(
+      model_name, checkpoint_step, int8_weights, bf16_weights, int8_head
+  )
+
+
+@functools.lru_cache(maxsize=None)
+def _enable_compilation_cache() -> None:
+  """Points JAX's persistent compilation cache at _XLA_CACHE_DIR, once.
+
+  Each bucket shape of predict_fn is then compiled by the first process only;
+  later launches load the executables. Entries are keyed on the program, JAX
+  version and device, so a stale entry is never loaded, just recompiled.
+  """
+  if os.environ.get(_XLA_CACHE_ENV_VAR, '1') == '0':
+    return
+  import jax  # pylint: disable=g-import-not-at-top
+
+  try:
+    os.makedirs(_XLA_CACHE_DIR, exist_ok=True)
+    jax.config.update('jax_compilation_cache_dir', _XLA_CACHE_DIR)
+    jax.config.update('jax_persistent_cache_min_compile_time_secs', 0.5)
+  except (OSError, AttributeError) as e:
+    logging.warning(f'Persistent compilation cache disabled: {e}')
+
+
+@functools.lru_cache(maxsize=None)
+def _build_cached_neural_engine(
+    model_name: str,
+    checkpoint_step: int,
+    int8_weights: bool,
+    bf16_weights: bool,
+    int8_head: bool = False,
+) -> 'neural_engines.NeuralEngine':
+  """Wraps the (shared) loaded parameters in a new engine."""
+  from searchless_chess.src.engines import neural_engines  # pylint: disable=g-import-not-at-top
+
+  predictor, params, policy, num_return_buckets = _load_predictor_and_params(
+      model_name, checkpoint_step
+  )
   _, return_buckets_values = utils.get_uniform_buckets_edges_values(
       num_return_buckets
   )
@@ -201,11 +309,20 @@ def _build_neural_engine(
       predict_fn=neural_engines.wrap_predict_fn(
           predictor=predictor,
           params=params,
-          batch_size=1,
+          bucket_sizes=PREDICT_BUCKET_SIZES,
+          int8_weights=int8_weights,
+          bf16_weights=bf16_weights,
+          int8_head=int8_head,
+          coalesce_calls=True,
       ),
   )
 
 
+def _engine_module(name: str):
+  """Imports an external-engine wrapper from this package on first use."""
+  return importlib.import_module(f'searchless_chess.src.engines.{name}')
+
+
 ENGINE_BUILDERS = {
     'local': functools.partial(_build_neural_engine, model_name='local'),
     '9M': functools.partial(
@@ -217,22 +334,19 @@ ENGINE_BUILDERS = {
     '270M': functools.partial(
         _build_neural_engine, model_name='270M', checkpoint_step=6_400_000
     ),
-    'stockfish': lambda: stockfish_engine.StockfishEngine(
+    'stockfish': lambda: _engine_module('stockfish_engine').StockfishEngine(
         limit=chess.engine.Limit(time=0.05)
     ),
-    'stockfish_all_moves': lambda: stockfish_engine.AllMovesStockfishEngine(
+    'stockfish_all_moves': lambda: _engine_module('stockfish_engine').AllMovesStockfishEngine(
         limit=chess.engine.Limit(time=0.05)
     ),
-    'leela_chess_zero_depth_1': lambda: lc0_engine.AllMovesLc0Engine(
+    'leela_chess_zero_depth_1': lambda: _engine_module('lc0_engine').AllMovesLc0Engine(
         limit=chess.engine.Limit(nodes=1),
     ),
-    'leela_chess_zero_policy_net': lambda: lc0_engine.Lc0Engine(
+    'leela_chess_zero_policy_net': lambda: _engine_module('lc0_engine').Lc0Engine(
         limit=chess.engine.Limit(nodes=1),
     ),
-    'leela_chess_zero_400_sims': lambda: lc0_engine.Lc0Engine(
+    'leela_chess_zero_400_sims': lambda: _engine_module('lc0_engine').Lc0Engine(
         limit=chess.engine.Limit(nodes=400),
     ),
 }
-
-print(">>> FINISHED LOADING MODIFIED web_player_folder/searchless_chess/src/engines/constants.py (SIMSIM314's VERSION V2 - FULL) <<<", flush=True)
-print("="*50, flush=True)
@@ -27,7 +27,7 @@ AnalysisResult = Mapping[str, Any]
 
 def get_ordered_legal_moves(board: chess.Board) -> Sequence[chess.Move]:
   """Returns legal moves ordered by action value."""
-  return sorted(board.legal_moves, key=lambda x: utils.MOVE_TO_ACTION[x.uci()])
+  return sorted(board.legal_moves, key=utils.move_to_action)
 
 
 class Engine(Protocol):
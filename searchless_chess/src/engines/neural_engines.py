@@ -15,16 +15,23 @@
 
 """Implements the neural engines, returning analysis metrics for input FENs."""
 
+import collections
 from collections.abc import Callable, Sequence
-from typing import Dict, List, Tuple, Optional, Any
+import concurrent.futures
+import functools
+import queue
+import threading
+from typing import Dict, List, NamedTuple, Tuple, Optional, Any, TYPE_CHECKING
 import chess
-import haiku as hk
-import jax
-import jax.nn as jnn
 import numpy as np
 import scipy.special
 
-from searchless_chess.src import constants
+# jax and haiku are only imported once an engine's parameters are prepared
+# (wrap_predict_fn and the params helpers), so importing this module does not
+# start the JAX backend.
+if TYPE_CHECKING:
+  import haiku as hk
+  from searchless_chess.src import constants
 from searchless_chess.src import tokenizer
 from searchless_chess.src import utils
 from searchless_chess.src.engines import engine
@@ -52,36 +59,169 @@ class NeuralEngine(engine.Engine):
     self.temperature = temperature
     self._rng = np.random.default_rng()
 
+  def _sample_index(self, logits: np.ndarray) -> int:
+    """Samples an index from softmax(logits / temperature).
+
+    Uses the Gumbel-max trick: the argmax of the scaled logits plus Gumbel
+    noise has exactly that distribution, without normalizing probabilities.
+    """
+    noise = self._rng.gumbel(size=len(logits))
+    return int(np.argmax(logits / self.temperature + noise))
+
+
+# Model input sequences are built in int16: every token (FEN characters,
+# actions and return buckets) is below 2**15, and the embedding lookup takes
+# any integer dtype, so this halves the bytes copied to the device per call.
+SEQUENCE_DTYPE = np.int16
+
+
+def batch_tokenize(fens: Sequence[str], num_extra_tokens: int) -> np.ndarray:
+  """Tokenizes `fens` into one preallocated SEQUENCE_DTYPE array.
+
+  Args:
+    fens: The positions to tokenize, one row each.
+    num_extra_tokens: Zeroed columns appended to every row, for the caller to
+      fill with actions and (dummy) return buckets.
+
+  Returns:
+    An array of shape (len(fens), SEQUENCE_LENGTH + num_extra_tokens).
+  """
+  sequences = np.zeros(
+      (len(fens), tokenizer.SEQUENCE_LENGTH + num_extra_tokens),
+      dtype=SEQUENCE_DTYPE,
+  )
+  for row, fen in zip(sequences, fens):
+    tokenizer.tokenize_into(fen, row[: tokenizer.SEQUENCE_LENGTH])
+  return sequences
+
+
+# No chess position has more legal moves than this, so one scratch row per move
+# never needs to grow in practice.
+_MAX_LEGAL_MOVES = 218
+# Bucket probabilities are staged in one reused buffer per thread (analyses
+# also run on pondering and worker threads).
+_win_probs_scratch = threading.local()
+
+
+def _expected_win_probs(
+    log_probs: np.ndarray, return_buckets_values: np.ndarray
+) -> np.ndarray:
+  """Returns the expected win probability of each row of bucket log-probs.
+
+  The exponentials go into a per-thread scratch buffer (never into
+  `log_probs`, which may be a cached analysis) and einsum reduces them against
+  the bucket values without another temporary.
+
+  The greedy (temperature None) branch of `play` needs this too: a move's
+  expected value depends on its whole bucket distribution, so no cheaper
+  statistic ranks the moves the same way, and the repetition adjustments are
+  applied to the expected values before the argmax.
+
+  Args:
+    log_probs: Return-bucket log-probabilities, one row per move.
+    return_buckets_values: The win probability of each return bucket.
+
+  Returns:
+    A fresh array with one expected win probability per row.
+  """
+  scratch = getattr(_win_probs_scratch, 'probs', None)
+  if (
+      scratch is None
+      or scratch.shape[0] < len(log_probs)
+      or scratch.shape[1:] != log_probs.shape[1:]
+      or scratch.dtype != log_probs.dtype
+  ):
+    scratch = _win_probs_scratch.probs = np.empty(
+        (max(len(log_probs), _MAX_LEGAL_MOVES), *log_probs.shape[1:]),
+        dtype=log_probs.dtype,
+    )
+  probs = np.exp(log_probs, out=scratch[: len(log_probs)])
+  return np.einsum('ij,j->i', probs, return_buckets_values)
+
+
+def _reversible_transposition_counts(
+    board: chess.Board,
+) -> collections.Counter[Any]:
+  """Counts the positions since the last irreversible move, current included.
+
+  This is the history `can_claim_threefold_repetition` replays; gathering it
+  once lets every candidate move be checked against it with a lookup.
+  """
+  # pylint: disable=protected-access
+  counts = collections.Counter((board._transposition_key(),))
+  switchyard = []
+  while board.move_stack:
+    move = board.pop()
+    switchyard.append(move)
+    if board.is_irreversible(move):
+      break
+    counts[board._transposition_key()] += 1
+  while switchyard:
+    board.push(switchyard.pop())
+  return counts
+
 
 def _update_scores_with_repetitions(
     board: chess.Board,
     scores: np.ndarray,
+    sorted_legal_moves: Sequence[chess.Move] | None = None,
 ) -> None:
-  """Updates the win-probabilities for a board given possible repetitions."""
-  sorted_legal_moves = engine.get_ordered_legal_moves(board)
+  """Updates the win-probabilities for a board given possible repetitions.
+
+  Pass the ordered legal moves when they are at hand (e.g. from `analyse`) to
+  skip generating them again.
+  """
+  # A claimable threefold after our move needs at least six reversible plies
+  # behind the current position, and the halfmove clock bounds those.
+  if board.halfmove_clock < 6:
+    return
+  if sorted_legal_moves is None:
+    sorted_legal_moves = engine.get_ordered_legal_moves(board)
+  counts = _reversible_transposition_counts(board)
+  # Only a position already seen twice can be completed to a threefold by the
+  # opponent's reply.
+  repeated = {key for key, count in counts.items() if count >= 2}
+  # pylint: disable=protected-access
   for i, move in enumerate(sorted_legal_moves):
+    # An irreversible move starts a fresh history: no repetition is possible.
+    if board.is_irreversible(move):
+      continue
     board.push(move)
-    # If the move results in a draw, associate 50% win prob to it.
-    if board.is_fivefold_repetition() or board.can_claim_threefold_repetition():
+    # If the move results in a draw, associate 50% win prob to it. A fivefold
+    # is also a threefold, so one count covers both.
+    if counts[board._transposition_key()] >= 2 or (
+        repeated
+        and any(_reply_key(board, reply) in repeated
+                for reply in board.generate_legal_moves())
+    ):
       scores[i] = 0.5
     board.pop()
 
+
+def _reply_key(board: chess.Board, reply: chess.Move) -> Any:
+  """The transposition key of `board` after `reply`."""
+  board.push(reply)
+  try:
+    return board._transposition_key()  # pylint: disable=protected-access
+  finally:
+    board.pop()
+
+# Expands FEN digits to that many '1's, so each rank is 8 characters and the
+# piece placement string becomes a fixed 9-characters-per-rank grid.
+_EXPAND_EMPTY_SQUARES = str.maketrans({str(n): '1' * n for n in range(1, 9)})
+# Castling rights as a 4-bit mask (K=1, Q=2, k=4, q=8) -> canonical FEN field.
+_CASTLING_FROM_MASK = tuple(
+    ''.join(c for bit, c in enumerate('KQkq') if mask >> bit & 1) or '-'
+    for mask in range(16)
+)
+_CASTLING_MASK_BITS = {'K': 1, 'Q': 2, 'k': 4, 'q': 8}
+_CANONICAL_CASTLING = frozenset(_CASTLING_FROM_MASK)
+
+
 def _find_king_file_from_fen_placement(piece_placement: str, king_symbol: str) -> Optional[int]:
     """Finds the file index (0-7) of the king from the FEN piece placement part."""
-    current_file = 0
-    current_rank = 7 # FEN starts from rank 8
-    for char in piece_placement:
-        if char == '/':
-            current_rank -= 1
-            current_file = 0
-        elif char.isdigit():
-            current_file += int(char)
-        elif char == king_symbol:
-            return current_file
-        elif char.isalpha():
-            current_file += 1
-        if current_file > 7 : current_file = 0 # Should not happen with valid FEN
-    return None
+    index = piece_placement.translate(_EXPAND_EMPTY_SQUARES).find(king_symbol)
+    return None if index < 0 else index % 9
 
 
 def fix_fen_castling(fen_string: str) -> str:
@@ -97,93 +237,159 @@ def fix_fen_castling(fen_string: str) -> str:
     piece_placement = parts[0]
     original_castling_rights = parts[2]
 
-    if original_castling_rights == '-':
+    # Already plain KQkq in canonical order (or '-'): nothing to convert, and no need to find the kings
+    if original_castling_rights in _CANONICAL_CASTLING:
         return fen_string
 
     king_file_white = _find_king_file_from_fen_placement(piece_placement, 'K')
     king_file_black = _find_king_file_from_fen_placement(piece_placement, 'k')
 
-    new_castling_chars_white = set()
-    new_castling_chars_black = set()
-
-    for char_code in original_castling_rights:
-        char_val = str(char_code) # Ensure it's a string if iterating bytes from somewhere
-
-        if char_val in ['K', 'Q']:
-            new_castling_chars_white.add(char_val)
-        elif char_val in ['k', 'q']:
-            new_castling_chars_black.add(char_val)
-        elif char_val.isupper() and 'A' <= char_val <= 'H': # White's Chess960 rook file
+    castling_mask = 0
+    for char_val in original_castling_rights:
+        if char_val in _CASTLING_MASK_BITS:
+            castling_mask |= _CASTLING_MASK_BITS[char_val]
+        elif 'A' <= char_val <= 'H': # White's Chess960 rook file
             if king_file_white is not None:
-                try:
-                    rook_file_idx = chess.FILE_NAMES.index(char_val.lower())
-                    if king_file_white < rook_file_idx: # King is to the left of this rook
-                        new_castling_chars_white.add('Q')
-                    elif king_file_white > rook_file_idx: # King is to the right of this rook
-                        new_castling_chars_white.add('K')
-                    # If king_file_white == rook_file_idx, this is an invalid 960 setup or error, ignore.
-                except ValueError: # char_val.lower() not in chess.FILE_NAMES (should not happen for A-H)
-                    pass # Ignore malformed char
-        elif char_val.islower() and 'a' <= char_val <= 'h': # Black's Chess960 rook file
+                rook_file_idx = ord(char_val) - 65 # 'A' -> 0; the range check above rules out anything else
+                if king_file_white < rook_file_idx: # King is to the left of this rook
+                    castling_mask |= 2
+                elif king_file_white > rook_file_idx: # King is to the right of this rook
+                    castling_mask |= 1
+                # If king_file_white == rook_file_idx, this is an invalid 960 setup or error, ignore.
+        elif 'a' <= char_val <= 'h': # Black's Chess960 rook file
             if king_file_black is not None:
-                try:
-                    rook_file_idx = chess.FILE_NAMES.index(char_val)
-                    if king_file_black < rook_file_idx: # King is to the left of this rook
-                        new_castling_chars_black.add('q')
-                    elif king_file_black > rook_file_idx: # King is to the right of this rook
-                        new_castling_chars_black.add('k')
-                except ValueError:
-                    pass # Ignore malformed char
-    
-    # Reconstruct castling string, K before Q, k before q for canonical FEN (though order doesn't strictly matter for KQkq)
-    # For a model expecting KQkq, ensuring only those appear is key.
-    final_white_str = ""
-    if 'K' in new_castling_chars_white: final_white_str += 'K'
-    if 'Q' in new_castling_chars_white: final_white_str += 'Q'
-    
-    final_black_str = ""
-    if 'k' in new_castling_chars_black: final_black_str += 'k'
-    if 'q' in new_castling_chars_black: final_black_str += 'q'
-
-    final_castling_str = final_white_str + final_black_str
-    if not final_castling_str:
-        final_castling_str = '-'
-
-    parts[2] = final_castling_str
+                rook_file_idx = ord(char_val) - 97 # 'a' -> 0
+                if king_file_black < rook_file_idx: # King is to the left of this rook
+                    castling_mask |= 8
+                elif king_file_black > rook_file_idx: # King is to the right of this rook
+                    castling_mask |= 4
+
+    # Rebuilt as K, Q, k, q in that order: a model expecting KQkq must only ever see those
+    parts[2] = _CASTLING_FROM_MASK[castling_mask]
     return " ".join(parts)
 
 
+# Runs of empty squares in an expanded placement, longest first, and the FEN
+# digit each run compresses back to.
+_COMPRESS_EMPTY_SQUARES = tuple(('1' * n, str(n)) for n in range(8, 1, -1))
+
+
+def _child_fens(
+    board: chess.Board, fen: str, moves: Sequence[chess.Move]
+) -> list[str]:
+  """Returns the FEN after each of `moves`, as `board.fen()` would give it.
+
+  Most moves (quiet moves, captures, promotions) are applied directly to the
+  parent's expanded piece placement, with the remaining fields derived from
+  the parent's. Moves that can change the castling or en passant field (king
+  moves, rook moves and captures while castling rights remain, double pawn
+  pushes, en passant captures) still go through push/fen/pop.
+
+  Args:
+    board: The parent position.
+    fen: `board.fen()`, already computed by the caller.
+    moves: Legal moves in `board`.
+  """
+  placement, _, castling, _, _, _ = fen.split(' ')
+  grid = list(placement.translate(_EXPAND_EMPTY_SQUARES).replace('/', ''))
+  turn = 'b' if board.turn == chess.WHITE else 'w'
+  halfmove_clock = board.halfmove_clock + 1
+  fullmove_number = board.fullmove_number + (board.turn == chess.BLACK)
+  quiet_fields = f' {turn} {castling} - {halfmove_clock} {fullmove_number}'
+  zeroing_fields = f' {turn} {castling} - 0 {fullmove_number}'
+  # Chess960 castling letters depend on where the other rooks stand, so any
+  # rook move or capture goes the slow way while some castling right is left.
+  slow_squares = (board.kings & board.occupied_co[board.turn]) | (
+      board.castling_rights | board.rooks if board.castling_rights else 0
+  )
+  fens = []
+  for move in moves:
+    from_square, to_square = move.from_square, move.to_square
+    squares = chess.BB_SQUARES[from_square] | chess.BB_SQUARES[to_square]
+    if (
+        squares & slow_squares
+        or board.is_en_passant(move)
+        or (
+            board.pawns & chess.BB_SQUARES[from_square]
+            and abs(to_square - from_square) == 16
+        )
+    ):
+      board.push(move)
+      fens.append(board.fen())
+      board.pop()
+      continue
+    # Grid index of a square: ranks run from 8 down to 1, files a to h.
+    child_grid = grid.copy()
+    piece = child_grid[from_square ^ 56]
+    if move.promotion:
+      piece = chess.piece_symbol(move.promotion)
+      piece = piece.upper() if board.turn == chess.WHITE else piece
+    child_grid[from_square ^ 56] = '1'
+    child_grid[to_square ^ 56] = piece
+    child_placement = '/'.join(
+        ''.join(child_grid[rank : rank + 8]) for rank in range(0, 64, 8)
+    )
+    for run, digit in _COMPRESS_EMPTY_SQUARES:
+      child_placement = child_placement.replace(run, digit)
+    fields = zeroing_fields if board.is_zeroing(move) else quiet_fields
+    fens.append(child_placement + fields)
+  return fens
+
+
+@functools.lru_cache(maxsize=4096)
+def tokenize_fixed_fen(fen: str) -> np.ndarray:
+  """Returns the SEQUENCE_DTYPE tokens of `fen` after `fix_fen_castling`.
+
+  Memoized by the raw FEN, since the same positions are analysed over and over
+  in interactive use. The array is shared between callers, so it is read-only.
+  """
+  tokens = tokenizer.tokenize(fix_fen_castling(fen)).astype(SEQUENCE_DTYPE)
+  tokens.flags.writeable = False
+  return tokens
+
+
+def _analysed_moves(
+    analysis: engine.AnalysisResult, board: chess.Board
+) -> Sequence[chess.Move]:
+  """The ordered legal moves `analyse` returned, or generated if it did not."""
+  moves = analysis.get('moves')
+  return engine.get_ordered_legal_moves(board) if moves is None else moves
+
+
 class ActionValueEngine(NeuralEngine):
   """Neural engine using a function P(r | s, a)."""
 
   def analyse(self, board: chess.Board) -> engine.AnalysisResult:
-    """Returns buckets log-probs for each action, and FEN."""
+    """Returns buckets log-probs for each action, FEN and the ordered moves."""
     # Tokenize the legal actions.
     sorted_legal_moves = engine.get_ordered_legal_moves(board)
-    legal_actions = [utils.MOVE_TO_ACTION[x.uci()] for x in sorted_legal_moves]
-    legal_actions = np.array(legal_actions, dtype=np.int32)
-    legal_actions = np.expand_dims(legal_actions, axis=-1)
-    # Tokenize the return buckets.
-    dummy_return_buckets = np.zeros((len(legal_actions), 1), dtype=np.int32)
-    # Tokenize the board.
-    tokenized_fen = tokenizer.tokenize(fix_fen_castling(board.fen())).astype(np.int32)
-    sequences = np.stack([tokenized_fen] * len(legal_actions))
-    # Create the sequences.
-    sequences = np.concatenate(
-        [sequences, legal_actions, dummy_return_buckets],
-        axis=1,
+    legal_actions = utils.moves_to_actions(sorted_legal_moves)
+    # One row per action: the tokenized board (one broadcast store), the action
+    # and a dummy return bucket, written into a single uninitialized buffer.
+    fen = board.fen()
+    tokenized_fen = tokenize_fixed_fen(fen)
+    sequences = np.empty(
+        (len(legal_actions), tokenizer.SEQUENCE_LENGTH + 2),
+        dtype=SEQUENCE_DTYPE,
     )
-    return {'log_probs': self.predict_fn(sequences)[:, -1], 'fen': board.fen()}
+    sequences[:, : tokenizer.SEQUENCE_LENGTH] = tokenized_fen
+    sequences[:, -2] = legal_actions
+    sequences[:, -1] = 0
+    return {
+        'log_probs': self.predict_fn(sequences)[:, -1],
+        'fen': fen,
+        'moves': sorted_legal_moves,
+    }
 
   def play(self, board: chess.Board) -> chess.Move:
-    return_buckets_log_probs = self.analyse(board)['log_probs']
-    return_buckets_probs = np.exp(return_buckets_log_probs)
-    win_probs = np.inner(return_buckets_probs, self._return_buckets_values)
-    _update_scores_with_repetitions(board, win_probs)
-    sorted_legal_moves = engine.get_ordered_legal_moves(board)
+    analysis = self.analyse(board)
+    sorted_legal_moves = _analysed_moves(analysis, board)
+    win_probs = _expected_win_probs(
+        analysis['log_probs'], self._return_buckets_values
+    )
+    _update_scores_with_repetitions(board, win_probs, sorted_legal_moves)
     if self.temperature is not None:
-      probs = scipy.special.softmax(win_probs / self.temperature, axis=-1)
-      return self._rng.choice(sorted_legal_moves, p=probs)
+      return sorted_legal_moves[self._sample_index(win_probs)]
     else:
       best_index = np.argmax(win_probs)
       return sorted_legal_moves[best_index]
@@ -197,45 +403,37 @@ class StateValueEngine(NeuralEngine):
       predict_fn: PredictFn,
       fens: Sequence[str],
   ) -> np.ndarray:
-    tokenized_fens = list(map(tokenizer.tokenize, fens))
-    tokenized_fens = np.stack(tokenized_fens, axis=0).astype(np.int32)
-    dummy_return_buckets = np.zeros((len(fens), 1), dtype=np.int32)
-    sequences = np.concatenate([tokenized_fens, dummy_return_buckets], axis=1)
-    return predict_fn(sequences)[:, -1]
+    # The last column is the dummy return bucket.
+    return predict_fn(batch_tokenize(fens, num_extra_tokens=1))[:, -1]
 
   def analyse(self, board: chess.Board) -> engine.AnalysisResult:
     """Defines a policy that predicts action and action value."""
-    current_value_log_probs = self._get_value_log_probs(
-        self.predict_fn, [board.fen()]
-    )[0]
-
-    # We perform a search of depth 1 to get the Q-values.
-    next_fens = []
-    for move in engine.get_ordered_legal_moves(board):
-      board.push(move)
-      next_fens.append(board.fen())
-      board.pop()
-    next_values_log_probs = self._get_value_log_probs(
-        self.predict_fn, next_fens
-    )
+    # We perform a search of depth 1 to get the Q-values. The current position
+    # and its children are evaluated in one predict_fn call, current first.
+    fen = board.fen()
+    sorted_legal_moves = engine.get_ordered_legal_moves(board)
+    fens = [fen, *_child_fens(board, fen, sorted_legal_moves)]
+    value_log_probs = self._get_value_log_probs(self.predict_fn, fens)
     # Flip the probabilities of the return buckets as we want to compute -value.
-    next_values_log_probs = np.flip(next_values_log_probs, axis=-1)
+    # np.flip returns a negative-stride view, so this copies nothing.
+    next_values_log_probs = np.flip(value_log_probs[1:], axis=-1)
 
     return {
-        'current_log_probs': current_value_log_probs,
+        'current_log_probs': value_log_probs[0],
         'next_log_probs': next_values_log_probs,
-        'fen': board.fen(),
+        'fen': fen,
+        'moves': sorted_legal_moves,
     }
 
   def play(self, board: chess.Board) -> chess.Move:
-    next_log_probs = self.analyse(board)['next_log_probs']
-    next_probs = np.exp(next_log_probs)
-    win_probs = np.inner(next_probs, self._return_buckets_values)
-    _update_scores_with_repetitions(board, win_probs)
-    sorted_legal_moves = engine.get_ordered_legal_moves(board)
+    analysis = self.analyse(board)
+    sorted_legal_moves = _analysed_moves(analysis, board)
+    win_probs = _expected_win_probs(
+        analysis['next_log_probs'], self._return_buckets_values
+    )
+    _update_scores_with_repetitions(board, win_probs, sorted_legal_moves)
     if self.temperature is not None:
-      probs = scipy.special.softmax(win_probs / self.temperature, axis=-1)
-      return self._rng.choice(sorted_legal_moves, p=probs)
+      return sorted_legal_moves[self._sample_index(win_probs)]
     else:
       best_index = np.argmax(win_probs)
       return sorted_legal_moves[best_index]
@@ -246,39 +444,209 @@ class BCEngine(NeuralEngine):
 
   def analyse(self, board: chess.Board) -> engine.AnalysisResult:
     """Defines a policy that predicts action probs."""
-    tokenized_fen = tokenizer.tokenize(board.fen()).astype(np.int32)
-    tokenized_fen = np.expand_dims(tokenized_fen, axis=0)
-    dummy_actions = np.zeros((1, 1), dtype=np.int32)
-    sequences = np.concatenate([tokenized_fen, dummy_actions], axis=1)
+    # The last column is the dummy action.
+    sequences = batch_tokenize([board.fen()], num_extra_tokens=1)
     total_action_log_probs = self.predict_fn(sequences)[0, -1]
     assert len(total_action_log_probs) == utils.NUM_ACTIONS
 
     # We must renormalize the output distribution to only the legal moves.
     sorted_legal_moves = engine.get_ordered_legal_moves(board)
-    legal_actions = [utils.MOVE_TO_ACTION[x.uci()] for x in sorted_legal_moves]
-    legal_actions = np.array(legal_actions, dtype=np.int32)
+    legal_actions = utils.moves_to_actions(sorted_legal_moves)
     action_log_probs = total_action_log_probs[legal_actions]
-    action_log_probs = jnn.log_softmax(action_log_probs)
+    action_log_probs = scipy.special.log_softmax(action_log_probs)
     assert len(action_log_probs) == len(list(board.legal_moves))
-    return {'log_probs': action_log_probs, 'fen': board.fen()}
+    return {
+        'log_probs': action_log_probs,
+        'fen': board.fen(),
+        'moves': sorted_legal_moves,
+    }
 
   def play(self, board: chess.Board) -> chess.Move:
-    action_log_probs = self.analyse(board)['log_probs']
-    sorted_legal_moves = engine.get_ordered_legal_moves(board)
+    analysis = self.analyse(board)
+    action_log_probs = analysis['log_probs']
+    sorted_legal_moves = _analysed_moves(analysis, board)
     if self.temperature is not None:
-      probs = scipy.special.softmax(
-          action_log_probs / self.temperature, axis=-1
-      )
-      return self._rng.choice(sorted_legal_moves, p=probs)
+      return sorted_legal_moves[self._sample_index(action_log_probs)]
     else:
       best_index = np.argmax(action_log_probs)
       return sorted_legal_moves[best_index]
 
 
+class CachedNeuralEngine(NeuralEngine):
+  """Wraps a neural engine with an LRU transposition table of its analyses.
+
+  Entries are keyed by the full FEN, so positions seen before (take-backs,
+  transpositions, GUI redraws) skip the forward pass. A Zobrist hash would not
+  do: the tokenizer also encodes the halfmove and fullmove counters (and
+  Polyglot ignores Chess960 castling rights), so equal hashes can still need
+  different analyses.
+  Only `analyse` outputs are stored: `play` still runs the wrapped engine's
+  class logic, so the history-dependent repetition scores and temperature
+  sampling are applied afresh on every call. The table may be shared with a
+  background thread (see PonderingEngine).
+  """
+
+  def __init__(self, inner: NeuralEngine, cap: int = 100_000):
+    super().__init__(
+        return_buckets_values=inner._return_buckets_values,  # pylint: disable=protected-access
+        predict_fn=inner.predict_fn,
+        temperature=inner.temperature,
+    )
+    self.inner = inner
+    self._cap = cap
+    self._table: collections.OrderedDict[str, engine.AnalysisResult] = (
+        collections.OrderedDict()
+    )
+    self._table_lock = threading.Lock()  # Held for table updates only
+
+  def analyse(self, board: chess.Board) -> engine.AnalysisResult:
+    key = board.fen()
+    with self._table_lock:
+      result = self._table.get(key)
+      if result is not None:
+        self._table.move_to_end(key)
+        return result
+    result = self.inner.analyse(board)
+    with self._table_lock:
+      self._table[key] = result
+      if len(self._table) > self._cap:
+        self._table.popitem(last=False)
+    return result
+
+  def is_cached(self, board: chess.Board) -> bool:
+    with self._table_lock:
+      return board.fen() in self._table
+
+  def play(self, board: chess.Board) -> chess.Move:
+    # With `self` as the engine, the inner class's play() reads from the table.
+    return type(self.inner).play(self, board)
+
+
+class PonderingEngine(CachedNeuralEngine):
+  """CachedNeuralEngine that thinks on the opponent's time.
+
+  After each `play`, a background thread analyses the position after every
+  legal reply to the chosen move, filling the transposition table; whichever
+  reply the opponent actually makes, the next `play` then finds its position
+  already analysed. Pondering stops as soon as the next `play` starts.
+  """
+
+  def __init__(self, inner: NeuralEngine, cap: int = 100_000):
+    super().__init__(inner, cap=cap)
+    self._executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=1, thread_name_prefix='ponder'
+    )
+    self._stop_pondering = threading.Event()
+
+  def play(self, board: chess.Board) -> chess.Move:
+    self._stop_pondering.set()  # The opponent has replied; stale work is moot.
+    move = super().play(board)
+    ponder_board = board.copy(stack=False)  # Analyses do not depend on history.
+    ponder_board.push(move)
+    self._stop_pondering = stop = threading.Event()
+    self._executor.submit(self._ponder, ponder_board, stop)
+    return move
+
+  def _ponder(self, board: chess.Board, stop: threading.Event) -> None:
+    for reply in board.legal_moves:
+      if stop.is_set():
+        return
+      board.push(reply)
+      try:
+        if not board.is_game_over() and not self.is_cached(board):
+          self.analyse(board)
+      finally:
+        board.pop()
+
+  def close(self) -> None:
+    """Stops pondering and shuts the background thread down."""
+    self._stop_pondering.set()
+    self._executor.shutdown(wait=True)
+
+
+class Int8Weight(NamedTuple):
+  """A weight matrix stored as int8 with one float scale per output channel."""
+
+  values: np.ndarray
+  scale: np.ndarray
+
+
+def quantize_params_int8(
+    params: 'hk.Params',
+    min_size: int = 4096,
+    module_names: Sequence[str] | None = None,
+) -> 'hk.Params':
+  """Returns params with large 2D weights replaced by symmetric int8 weights.
+
+  Biases, layer norms and small matrices are kept in their original dtype.
+
+  Args:
+    params: Neural network parameters.
+    min_size: Matrices with fewer elements than this are not quantized.
+    module_names: If set, only these modules' weights are quantized.
+  """
+  quantized = {}
+  for module_name, module_params in params.items():
+    quantized[module_name] = {}
+    skip_module = module_names is not None and module_name not in module_names
+    for param_name, value in module_params.items():
+      value = np.asarray(value)
+      if skip_module or value.ndim != 2 or value.size < min_size:
+        quantized[module_name][param_name] = value
+        continue
+      scale = np.max(np.abs(value), axis=0, keepdims=True) / 127.0
+      scale = np.where(scale == 0, 1.0, scale).astype(value.dtype)
+      values = np.clip(np.round(value / scale), -127, 127).astype(np.int8)
+      quantized[module_name][param_name] = Int8Weight(values, scale)
+  return quantized
+
+
+def output_head_module_names(params: 'hk.Params') -> list[str]:
+  """Returns the module(s) holding the final projection onto the outputs.
+
+  Every other linear layer of the transformer is created without a bias, so the
+  head is the one linear module with both a 2D `w` and a `b`.
+  """
+  return [
+      module_name
+      for module_name, module_params in params.items()
+      if 'b' in module_params and np.ndim(module_params.get('w')) == 2
+  ]
+
+
+def dequantize_params_int8(params: 'hk.Params') -> 'hk.Params':
+  """Inverse of `quantize_params_int8`, meant to be traced inside `jax.jit`."""
+  import jax  # pylint: disable=g-import-not-at-top
+  return jax.tree_util.tree_map(
+      lambda x: x.values.astype(x.scale.dtype) * x.scale
+      if isinstance(x, Int8Weight)
+      else x,
+      params,
+      is_leaf=lambda x: isinstance(x, Int8Weight),
+  )
+
+
+def cast_params_bf16(params: 'hk.Params') -> 'hk.Params':
+  """Returns params with every floating-point leaf cast to bfloat16."""
+  import jax  # pylint: disable=g-import-not-at-top
+  import jax.numpy as jnp  # pylint: disable=g-import-not-at-top
+  return jax.tree_util.tree_map(
+      lambda x: x.astype(jnp.bfloat16)
+      if jnp.issubdtype(x.dtype, jnp.floating)
+      else x,
+      params,
+  )
+
+
 def wrap_predict_fn(
-    predictor: constants.Predictor,
-    params: hk.Params,
+    predictor: 'constants.Predictor',
+    params: 'hk.Params',
     batch_size: int = 32,
+    int8_weights: bool = False,
+    bf16_weights: bool = False,
+    bucket_sizes: Sequence[int] | None = None,
+    int8_head: bool = False,
+    coalesce_calls: bool = False,
 ) -> PredictFn:
   """Returns a simple prediction function from a predictor and parameters.
 
@@ -286,33 +654,165 @@ def wrap_predict_fn(
     predictor: Used to predict outputs.
     params: Neural network parameters.
     batch_size: How many sequences to pass to the predictor at once.
+    int8_weights: Whether to keep the large weight matrices in int8 and
+      dequantize them inside the jitted function (less memory traffic per call,
+      slightly lower precision).
+    bf16_weights: Whether to run the forward pass with bfloat16 parameters.
+      Outputs are cast back to float32 before they are returned.
+    bucket_sizes: If set, overrides `batch_size`: sequences are split into
+      batches of at most max(bucket_sizes), each padded only up to the smallest
+      bucket that fits it. A whole position's legal moves (or a large batch of
+      positions) then run in one call, while jit compiles one shape per bucket.
+      A bucket of one is always added, so single-sequence calls (BCEngine,
+      positions with one legal move) run unpadded.
+    int8_head: Whether to keep only the output projection (embedding_dim x
+      num_return_buckets, run once per legal move) in int8. Implied by
+      `int8_weights`.
+    coalesce_calls: Whether to serve calls from one worker thread that merges
+      concurrent calls into shared batches (see _CoalescingPredictFn).
   """
-  jitted_predict_fn = jax.jit(predictor.predict)
+  import jax  # pylint: disable=g-import-not-at-top
+  import jax.numpy as jnp  # pylint: disable=g-import-not-at-top
+
+  bucket_sizes = sorted({1, *(bucket_sizes or [batch_size])})
+  max_batch_size = bucket_sizes[-1]
+
+  if bf16_weights:
+    params = cast_params_bf16(params)
+
+  if int8_weights:
+    params = quantize_params_int8(params)
+  elif int8_head:
+    params = quantize_params_int8(
+        params, min_size=0, module_names=output_head_module_names(params)
+    )
+
+  if int8_weights or int8_head:
+
+    def predict_dequantized(params, targets, rng):
+      return predictor.predict(
+          params=dequantize_params_int8(params), targets=targets, rng=rng
+      )
+
+    jitted_predict_fn = jax.jit(predict_dequantized)
+  else:
+    jitted_predict_fn = jax.jit(predictor.predict)
 
   def fixed_predict_fn(sequences: np.ndarray) -> np.ndarray:
     """Wrapper around the predictor `predict` function."""
-    assert sequences.shape[0] == batch_size
-    return jitted_predict_fn(
+    assert sequences.shape[0] in bucket_sizes
+    outputs = jitted_predict_fn(
         params=params,
         targets=sequences,
         rng=None,
     )
+    # Keep host-side bucket math (exp, expectation, argmax) in float32.
+    return outputs.astype(jnp.float32) if bf16_weights else outputs
 
-  def predict_fn(sequences: np.ndarray) -> np.ndarray:
-    """Wrapper to collate batches of sequences of fixed size."""
-    remainder = -len(sequences) % batch_size
-    padded = np.pad(sequences, ((0, remainder), (0, 0)))
-    sequences_split = np.split(padded, len(padded) // batch_size)
-    all_outputs = []
-    for sub_sequences in sequences_split:
-      all_outputs.append(fixed_predict_fn(sub_sequences))
-    outputs = np.concatenate(all_outputs, axis=0)
-    assert len(outputs) == len(padded)
-    return outputs[: len(sequences)]  # Crop the padded sequences.
+  # Padded inputs are staged in one reused buffer per thread (engines are
+  # called from the GUI thread and from worker threads alike).
+  scratch_by_thread = threading.local()
 
+  def predict_fn(sequences: np.ndarray) -> np.ndarray:
+    """Wrapper to collate batches of sequences into the fixed bucket sizes."""
+    num_sequences = len(sequences)
+    if not num_sequences:
+      raise ValueError('predict_fn needs at least one sequence.')
+    scratch = getattr(scratch_by_thread, 'buffer', None)
+    if (
+        scratch is None
+        or scratch.shape[1:] != sequences.shape[1:]
+        or scratch.dtype != sequences.dtype
+    ):
+      scratch = scratch_by_thread.buffer = np.zeros(
+          (max_batch_size, *sequences.shape[1:]), dtype=sequences.dtype
+      )
+    outputs = None
+    for start in range(0, num_sequences, max_batch_size):
+      stop = min(start + max_batch_size, num_sequences)
+      size = next(b for b in bucket_sizes if b >= stop - start)
+      padded = scratch[:size]
+      padded[: stop - start] = sequences[start:stop]
+      padded[stop - start :] = 0
+      batch_outputs = fixed_predict_fn(padded)
+      if outputs is None:
+        outputs = np.empty(
+            (num_sequences, *batch_outputs.shape[1:]), dtype=batch_outputs.dtype
+        )
+      # Crop the padded sequences. Copying out waits for the result, so the
+      # next batch can overwrite the scratch buffer.
+      outputs[start:stop] = batch_outputs[: stop - start]
+    return outputs
+
+  if coalesce_calls:
+    return _CoalescingPredictFn(predict_fn, max_rows=max_batch_size)
   return predict_fn
 
 
+class _CoalescingPredictFn:
+  """Runs predict_fn calls on one worker thread, merging concurrent calls.
+
+  Calls that arrive while a batch is running queue up; the worker then takes as
+  many queued calls as fit in `max_rows` and runs them as one batch. Two threads
+  analysing one position each (hints and pondering, say) thus share one padded
+  bucket instead of padding and dispatching two. Callers block until their own
+  rows are back, so engines see an ordinary predict_fn.
+  """
+
+  def __init__(self, predict_fn: PredictFn, max_rows: int):
+    self._predict_fn = predict_fn
+    self._max_rows = max_rows
+    self._requests = queue.SimpleQueue()
+    threading.Thread(
+        target=self._serve, name='predict_batcher', daemon=True
+    ).start()
+
+  def __call__(self, sequences: np.ndarray) -> np.ndarray:
+    future = concurrent.futures.Future()
+    self._requests.put((sequences, future))
+    return future.result()
+
+  def _serve(self) -> None:
+    pending = None  # A request that did not fit into the previous batch.
+    while True:
+      batch = [pending or self._requests.get()]
+      pending = None
+      num_rows = len(batch[0][0])
+      while num_rows < self._max_rows:
+        try:
+          request = self._requests.get_nowait()
+        except queue.Empty:
+          break
+        sequences = request[0]
+        if (
+            num_rows + len(sequences) > self._max_rows
+            or sequences.shape[1:] != batch[0][0].shape[1:]
+            or sequences.dtype != batch[0][0].dtype
+        ):
+          pending = request
+          break
+        batch.append(request)
+        num_rows += len(sequences)
+      self._run(batch)
+
+  def _run(self, batch) -> None:
+    try:
+      if len(batch) == 1:
+        all_outputs = [self._predict_fn(batch[0][0])]
+      else:
+        outputs = self._predict_fn(
+            np.concatenate([sequences for sequences, _ in batch], axis=0)
+        )
+        row_ends = np.cumsum([len(sequences) for sequences, _ in batch])
+        all_outputs = np.split(outputs, row_ends[:-1])
+    except Exception as e:  # pylint: disable=broad-exception-caught
+      for _, future in batch:
+        future.set_exception(e)
+      return
+    for (_, future), outputs in zip(batch, all_outputs):
+      future.set_result(outputs)
+
+
 ENGINE_FROM_POLICY = {
     'action_value': ActionValueEngine,
     'state_value': StateValueEngine,
@@ -62,6 +62,30 @@ SEQUENCE_LENGTH = 77
 def tokenize(fen: str) -> jtp.Int32[jtp.Array, 'T']:
   """Returns an array of tokens from a fen string.
 
+  See `_token_indices` for the representation.
+
+  Args:
+    fen: The board position in Forsyth-Edwards Notation.
+  """
+  return np.asarray(_token_indices(fen), dtype=np.uint8)
+
+
+def tokenize_into(fen: str, out: np.ndarray) -> None:
+  """Writes the tokens of a fen string into `out`, a length-T integer row.
+
+  Same tokens as `tokenize`, without the intermediate array: callers filling a
+  preallocated batch pass one row of it.
+
+  Args:
+    fen: The board position in Forsyth-Edwards Notation.
+    out: Where to write the SEQUENCE_LENGTH tokens.
+  """
+  out[:] = _token_indices(fen)
+
+
+def _token_indices(fen: str) -> list[int]:
+  """Returns the list of token indices of a fen string.
+
   We compute a tokenized representation of the board, from the FEN string.
   The final array of tokens is a mapping from this string to numbers, which
   are defined in the dictionary `_CHARACTERS_INDEX`.
@@ -113,4 +137,4 @@ def tokenize(fen: str) -> jtp.Int32[jtp.Array, 'T']:
 
   assert len(indices) == SEQUENCE_LENGTH
 
-  return np.asarray(indices, dtype=np.uint8)
+  return indices
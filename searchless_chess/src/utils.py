@@ -15,6 +15,7 @@
 
 """Implements some utility functions."""
 
+from collections.abc import Sequence
 import math
 
 import chess
@@ -91,6 +92,37 @@ MOVE_TO_ACTION, ACTION_TO_MOVE = _compute_all_possible_actions()
 NUM_ACTIONS = len(MOVE_TO_ACTION)
 
 
+def _move_key(move: chess.Move) -> int:
+  """Dense index of (from square, to square, promotion piece type or 0)."""
+  return (move.from_square * 64 + move.to_square) * 7 + (move.promotion or 0)
+
+
+def _compute_move_key_to_action() -> list[int]:
+  """Returns MOVE_TO_ACTION indexed by `_move_key` instead of UCI, -1 if absent."""
+  key_to_action = [-1] * (64 * 64 * 7)
+  for move, action in MOVE_TO_ACTION.items():
+    key_to_action[_move_key(chess.Move.from_uci(move))] = action
+  return key_to_action
+
+
+# Converting moves through their square and piece numbers skips building the
+# UCI string and hashing it for every legal move.
+_MOVE_KEY_TO_ACTION = _compute_move_key_to_action()
+
+
+def move_to_action(move: chess.Move) -> int:
+  """Returns MOVE_TO_ACTION[move.uci()], without building the UCI string."""
+  action = _MOVE_KEY_TO_ACTION[_move_key(move)]
+  if action < 0:
+    raise KeyError(move.uci())
+  return action
+
+
+def moves_to_actions(moves: Sequence[chess.Move]) -> np.ndarray:
+  """Returns the actions of `moves` as an int32 array (see `move_to_action`)."""
+  return np.fromiter(map(move_to_action, moves), dtype=np.int32, count=len(moves))
+
+
 def centipawns_to_win_probability(centipawns: int) -> float:
   """Returns the win probability (in [0, 1]) converted from the centipawn score.
 
@@ -0,0 +1,69 @@
+# ===== START OF FILE test_analysis.py =====
+import unittest
+
+import numpy as np
+
+from analysis_arrays import AnalysisArrays
+from pgn_analyzer_controller import (
+    classify_move_qualities, QUALITY_CODE_UNKNOWN, QUALITY_CODE_BEST, QUALITY_CODE_GOOD,
+    QUALITY_CODE_INTERESTING, QUALITY_CODE_WEAK, QUALITY_CODE_BLUNDER, BLUNDER_THRESHOLD,
+    WEAK_MOVE_THRESHOLD, INTERESTING_MOVE_MAX_DROP, GOOD_MOVE_MAX_DROP,
+    INTERESTING_MOVE_TOP_N_THRESHOLD, GOOD_MOVE_TOP_N_THRESHOLD)
+
+def _classify_one(pwin_drop, move_rank):
+    # The per-move if/elif chain classify_move_qualities replaced
+    if pwin_drop > BLUNDER_THRESHOLD: return QUALITY_CODE_BLUNDER
+    elif pwin_drop > WEAK_MOVE_THRESHOLD: return QUALITY_CODE_WEAK
+    elif move_rank == 0: return QUALITY_CODE_BEST
+    elif pwin_drop <= GOOD_MOVE_MAX_DROP and 0 < move_rank < GOOD_MOVE_TOP_N_THRESHOLD: return QUALITY_CODE_GOOD
+    elif pwin_drop <= INTERESTING_MOVE_MAX_DROP and (move_rank == -1 or move_rank >= INTERESTING_MOVE_TOP_N_THRESHOLD): return QUALITY_CODE_INTERESTING
+    return QUALITY_CODE_GOOD
+
+class AnalysisArraysTest(unittest.TestCase):
+    def test_defaults(self):
+        arrays = AnalysisArrays(4)
+        self.assertEqual(len(arrays), 4)
+        self.assertEqual(arrays.ply.tolist(), [0, 1, 2, 3])
+        self.assertTrue(np.isnan(arrays.pwin_drop_136m).all())
+        self.assertEqual(arrays.move_rank.tolist(), [-1, -1, -1, -1])
+        self.assertEqual(arrays.quality_code.dtype, np.int8)
+        self.assertFalse(arrays.graded_mask().any())
+
+    def test_graded_mask_needs_tracked_move_with_a_drop(self):
+        arrays = AnalysisArrays(4)
+        arrays.is_tracked[[1, 3]] = True
+        arrays.pwin_drop_136m[[1, 2]] = 0.1
+        self.assertEqual(arrays.graded_mask().tolist(), [False, True, False, False])
+
+class ClassifyMoveQualitiesTest(unittest.TestCase):
+    def test_individual_cases(self):
+        cases = [
+            (0.2, 0, QUALITY_CODE_BLUNDER),
+            (0.1, 0, QUALITY_CODE_WEAK),
+            (0.0, 0, QUALITY_CODE_BEST),
+            (0.02, 1, QUALITY_CODE_GOOD),
+            (0.04, -1, QUALITY_CODE_INTERESTING),
+            (0.04, 6, QUALITY_CODE_INTERESTING),
+            (0.04, 1, QUALITY_CODE_GOOD),
+            (0.04, 3, QUALITY_CODE_GOOD),
+        ]
+        drops, ranks, expected = (np.array(column) for column in zip(*cases))
+        codes = classify_move_qualities(drops, ranks, np.ones(len(cases), dtype=np.bool_))
+        self.assertEqual(codes.dtype, np.int8)
+        self.assertEqual(codes.tolist(), expected.tolist())
+
+    def test_ungraded_moves_are_unknown(self):
+        codes = classify_move_qualities(np.array([0.5, np.nan, 0.0]), np.array([0, -1, 0]), np.array([False, False, True]))
+        self.assertEqual(codes.tolist(), [QUALITY_CODE_UNKNOWN, QUALITY_CODE_UNKNOWN, QUALITY_CODE_BEST])
+
+    def test_matches_per_move_classification(self):
+        rng = np.random.default_rng(0)
+        drops = np.concatenate([rng.uniform(-0.05, 0.25, 500),
+                                [BLUNDER_THRESHOLD, WEAK_MOVE_THRESHOLD, GOOD_MOVE_MAX_DROP, INTERESTING_MOVE_MAX_DROP]])
+        ranks = rng.integers(-1, 10, drops.size)
+        codes = classify_move_qualities(drops, ranks, np.ones(drops.size, dtype=np.bool_))
+        self.assertEqual(codes.tolist(), [_classify_one(d, r) for d, r in zip(drops, ranks)])
+
+if __name__ == "__main__":
+    unittest.main()
+# ===== END OF FILE test_analysis.py =====
@@ -0,0 +1,21 @@
+# ===== START OF FILE test_engines.py =====
+import os
+import subprocess
+import sys
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in a fresh interpreter: other tests may already have imported jax into this one
+_IMPORT_CHECK = "import sys, engines; print(engines.SEARCHLESS_ENGINES_AVAILABLE, 'jax' in sys.modules, 'haiku' in sys.modules)"
+
+class EnginesImportTest(unittest.TestCase):
+    def test_importing_engines_does_not_load_jax(self):
+        result = subprocess.run([sys.executable, "-c", _IMPORT_CHECK], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+        available, jax_loaded, haiku_loaded = result.stdout.split()
+        if available != "True": self.skipTest("searchless_chess engine dependencies are not installed")
+        self.assertEqual((jax_loaded, haiku_loaded), ("False", "False"))
+
+if __name__ == "__main__":
+    unittest.main()
+# ===== END OF FILE test_engines.py =====
@@ -0,0 +1,95 @@
+# ===== START OF FILE test_eval_cache.py =====
+import contextlib
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import chess
+import numpy as np
+
+from eval_cache import EvalCache
+
+KEY_FENS = [
+    chess.STARTING_FEN,
+    "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3", # En passant square set
+    "r3k2r/8/8/8/8/8/8/R3K2R b Kq - 5 40", # Partial castling rights, black to move
+    "4k3/8/8/8/8/8/8/4K3 w - - 0 1",
+]
+
+def _fake_output(board: chess.Board):
+    n = board.legal_moves.count()
+    if n == 0: return None
+    return {'log_probs': np.full((n, 3), float(n), dtype=np.float32), 'fen': board.fen()}
+
+class EvalCacheKeyTest(unittest.TestCase):
+    def test_pack_round_trips(self):
+        for fen in KEY_FENS:
+            key = EvalCache.make_key(chess.Board(fen))
+            self.assertEqual(EvalCache._unpack_key(EvalCache._pack_key(key)), key, msg=fen)
+
+    def test_transpositions_share_a_key(self):
+        first, second = chess.Board(), chess.Board()
+        for uci in ("g1f3", "g8f6", "b1c3"): first.push_uci(uci)
+        for uci in ("b1c3", "g8f6", "g1f3"): second.push_uci(uci)
+        self.assertEqual(EvalCache.make_key(first), EvalCache.make_key(second))
+
+    def test_move_clocks_are_part_of_the_key(self):
+        fen = "r3k2r/8/8/8/8/8/8/R3K2R b Kq - 5 40"
+        self.assertNotEqual(EvalCache.make_key(chess.Board(fen)), EvalCache.make_key(chess.Board(fen.replace("5 40", "0 40"))))
+        self.assertNotEqual(EvalCache.make_key(chess.Board(fen)), EvalCache.make_key(chess.Board(fen.replace("5 40", "5 41"))))
+
+class EvalCacheTest(unittest.TestCase):
+    def setUp(self):
+        handle, self.filename = tempfile.mkstemp(suffix=".sqlite")
+        os.close(handle)
+        self.addCleanup(os.remove, self.filename)
+
+    def test_computes_missing_positions_once(self):
+        cache = EvalCache(self.filename)
+        calls = []
+        def compute(boards):
+            calls.append([b.fen() for b in boards])
+            return [_fake_output(b) for b in boards]
+
+        boards = [chess.Board(fen) for fen in KEY_FENS] + [chess.Board()]
+        outputs = cache.get_or_compute("model", boards, compute)
+        self.assertEqual(calls, [KEY_FENS])
+        self.assertEqual([o['fen'] for o in outputs], [b.fen() for b in boards])
+        np.testing.assert_array_equal(outputs[-1]['log_probs'], outputs[0]['log_probs'])
+
+        cache.get_or_compute("model", boards, compute)
+        self.assertEqual(len(calls), 1)
+        cache.get_or_compute("other model", boards[:1], compute)
+        self.assertEqual(calls[-1], [chess.STARTING_FEN])
+
+    def test_positions_without_output_are_not_cached(self):
+        cache = EvalCache(self.filename)
+        mate = chess.Board("rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3")
+        self.assertEqual(cache.get_or_compute("model", [mate], lambda bs: [_fake_output(b) for b in bs]), [None])
+        self.assertEqual(cache._entries, {})
+
+    def test_flush_and_load_round_trip(self):
+        cache = EvalCache(self.filename)
+        boards = [chess.Board(fen) for fen in KEY_FENS]
+        expected = cache.get_or_compute("model", boards, lambda bs: [_fake_output(b) for b in bs])
+        cache.flush()
+
+        reloaded = EvalCache(self.filename)
+        reloaded.load()
+        def fail(boards): raise AssertionError(f"recomputed {len(boards)} boards")
+        outputs = reloaded.get_or_compute("model", boards, fail)
+        for got, want in zip(outputs, expected):
+            np.testing.assert_array_equal(got['log_probs'], want['log_probs'])
+
+    def test_rows_from_an_older_schema_are_dropped(self):
+        with contextlib.closing(sqlite3.connect(self.filename)) as conn, conn:
+            conn.execute("CREATE TABLE position_evals (model TEXT, key BLOB, rows INTEGER, log_probs BLOB, PRIMARY KEY (model, key))")
+            conn.execute("INSERT INTO position_evals VALUES (?, ?, ?, ?)", ("model", b"stale", 1, np.zeros(3, np.float32).tobytes()))
+        cache = EvalCache(self.filename)
+        cache.load()
+        self.assertEqual(cache._entries, {})
+
+if __name__ == "__main__":
+    unittest.main()
+# ===== END OF FILE test_eval_cache.py =====
@@ -0,0 +1,66 @@
+# ===== START OF FILE test_game_manager.py =====
+import unittest
+
+import chess
+
+from game_manager import GameManager, _position_counts
+
+SHUFFLE = ("g1f3", "g8f6", "f3g1", "f6g8", "g1f3", "g8f6", "f3g1") # Black's f6g8 would repeat the start a third time
+
+class _FakeEngineManager:
+    def __init__(self, top_moves):
+        self.engine_9M = object()
+        self.top_moves = top_moves
+
+    def get_top_engine_moves_list(self, engine, board, num_moves=1):
+        return self.top_moves[:num_moves]
+
+def _manager_after(moves):
+    manager = GameManager()
+    manager.start_new_game()
+    manager.board = chess.Board(chess960=True)
+    manager._rep_counts = _position_counts(manager.board)
+    for uci in moves: manager.make_move_on_board(uci)
+    return manager
+
+class RepetitionCountsTest(unittest.TestCase):
+    def test_incremental_counts_match_the_replayed_history(self):
+        manager = _manager_after(SHUFFLE)
+        self.assertEqual(manager._rep_counts, _position_counts(manager.board))
+        manager.take_back_move()
+        self.assertEqual(manager._rep_counts, _position_counts(manager.board))
+
+    def test_snapshot_is_independent_of_the_live_game(self):
+        manager = _manager_after(SHUFFLE)
+        board, rep_counts = manager.get_search_snapshot()
+        manager.start_new_game() # The Tk thread resets the game while the engine thread searches
+        self.assertTrue(GameManager._repeats_after(chess.Move.from_uci("f6g8"), board, rep_counts))
+        self.assertFalse(GameManager._repeats_after(chess.Move.from_uci("e7e5"), board, rep_counts))
+
+class AntiDrawTest(unittest.TestCase):
+    def _engine_move(self, top_moves, with_snapshot):
+        manager = _manager_after(SHUFFLE)
+        engine_manager = _FakeEngineManager(top_moves)
+        manager.current_engine_instance = engine_manager.engine_9M
+        if not with_snapshot: return manager.get_engine_move_uci(engine_manager)
+        board, rep_counts = manager.get_search_snapshot()
+        return manager.get_engine_move_uci(engine_manager, board=board, rep_counts=rep_counts)
+
+    def test_avoids_a_threefold_repetition_when_an_alternative_wins(self):
+        top_moves = [{'uci': 'f6g8', 'p_win': 0.7}, {'uci': 'd7d5', 'p_win': 0.65}, {'uci': 'e7e5', 'p_win': 0.62}]
+        for with_snapshot in (False, True):
+            self.assertEqual(self._engine_move(top_moves, with_snapshot), 'd7d5') # The best alternative, not just any
+
+    def test_keeps_the_repetition_without_a_good_alternative(self):
+        top_moves = [{'uci': 'f6g8', 'p_win': 0.7}, {'uci': 'e7e5', 'p_win': 0.5}]
+        self.assertEqual(self._engine_move(top_moves, with_snapshot=True), 'f6g8')
+
+    def test_board_copy_without_counts_uses_its_history(self):
+        manager = _manager_after(SHUFFLE)
+        engine_manager = _FakeEngineManager([{'uci': 'f6g8', 'p_win': 0.7}, {'uci': 'd7d5', 'p_win': 0.65}])
+        manager.current_engine_instance = engine_manager.engine_9M
+        self.assertEqual(manager.get_engine_move_uci(engine_manager, board=manager.board.copy()), 'd7d5')
+
+if __name__ == "__main__":
+    unittest.main()
+# ===== END OF FILE test_game_manager.py =====
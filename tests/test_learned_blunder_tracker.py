@@ -0,0 +1,50 @@
+# ===== START OF FILE test_learned_blunder_tracker.py =====
+import json
+import os
+import tempfile
+import unittest
+
+from learned_blunder_tracker import LearnedBlunderTracker
+
+FEN = "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3"
+
+class LearnedBlunderTrackerTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.filename = os.path.join(directory.name, "progress.json")
+        self.tracker = LearnedBlunderTracker(self.filename)
+        self.addCleanup(self.tracker.discard_pending_save)
+
+    def _record(self, solved=False):
+        self.tracker.record_attempt(FEN, "e1e2", 0.3, "d2d4", 0.5, solved)
+
+    def test_debounced_saves_coalesce_until_flushed(self):
+        self._record()
+        self.tracker.save_progress(debounce=60)
+        self._record(solved=True)
+        self.tracker.save_progress(debounce=60)
+        self.assertFalse(os.path.exists(self.filename))
+        self.tracker.flush_pending_save()
+        with open(self.filename, encoding="utf-8") as f: saved = json.load(f)
+        self.assertEqual(len(saved[FEN]["attempts"]), 2)
+        self.assertTrue(saved[FEN]["is_marked_overall_solved"])
+        self.assertFalse(self.tracker.has_unsaved_changes)
+
+    def test_discarded_save_is_never_written(self):
+        self._record()
+        self.tracker.save_progress(debounce=60)
+        self.tracker.discard_pending_save()
+        self.tracker.flush_pending_save()
+        self.assertFalse(os.path.exists(self.filename))
+        self.assertTrue(self.tracker.has_unsaved_changes)
+
+    def test_immediate_save_round_trips(self):
+        self._record(solved=True)
+        self.assertTrue(self.tracker.save_progress(debounce=0))
+        reloaded = LearnedBlunderTracker(self.filename)
+        self.assertTrue(reloaded.is_blunder_solved(FEN))
+
+if __name__ == "__main__":
+    unittest.main()
+# ===== END OF FILE test_learned_blunder_tracker.py =====
@@ -0,0 +1,62 @@
+# ===== START OF FILE test_neural_engines.py =====
+import random
+import unittest
+
+import chess
+
+try:
+    from searchless_chess.src.engines import neural_engines
+except ImportError: # jax / haiku / scipy are not installed
+    neural_engines = None
+
+# Rook moves here change the Shredder letters of the remaining castling rights
+CASTLING_EDGE_FENS = ["4k3/8/8/8/8/8/8/4K1RR w G - 0 1", "4k3/8/8/8/8/8/8/R3K1RR w GA - 0 1"]
+
+def _random_positions(chess960: bool, num_games: int = 20, seed: int = 0):
+    rng = random.Random(seed)
+    for _ in range(num_games):
+        board = chess.Board.from_chess960_pos(rng.randrange(960)) if chess960 else chess.Board()
+        while not board.is_game_over() and board.ply() < 120:
+            yield board
+            board.push(rng.choice(list(board.legal_moves)))
+
+@unittest.skipUnless(neural_engines, "searchless_chess engine dependencies are not installed")
+class ChildFensTest(unittest.TestCase):
+    def _check(self, board: chess.Board):
+        moves = list(board.legal_moves)
+        expected = []
+        for move in moves:
+            board.push(move)
+            expected.append(board.fen())
+            board.pop()
+        self.assertEqual(neural_engines._child_fens(board, board.fen(), moves), expected, msg=board.fen())
+
+    def test_matches_push_fen_pop_in_standard_games(self):
+        for board in _random_positions(chess960=False): self._check(board)
+
+    def test_matches_push_fen_pop_in_chess960_games(self):
+        for board in _random_positions(chess960=True): self._check(board)
+
+    def test_rook_moves_next_to_a_castling_rook(self):
+        for fen in CASTLING_EDGE_FENS: self._check(chess.Board(fen, chess960=True))
+
+@unittest.skipUnless(neural_engines, "searchless_chess engine dependencies are not installed")
+class FixFenCastlingTest(unittest.TestCase):
+    def test_canonical_rights_pass_through(self):
+        for fen in (chess.STARTING_FEN, "r3k2r/8/8/8/8/8/8/R3K2R w Kq - 0 1", "4k3/8/8/8/8/8/8/4K3 w - - 0 1"):
+            self.assertEqual(neural_engines.fix_fen_castling(fen), fen)
+
+    def test_shredder_letters_become_kqkq(self):
+        fen = "rk4r1/8/8/8/8/8/8/RK4R1 w GAga - 0 1"
+        self.assertEqual(neural_engines.fix_fen_castling(fen), "rk4r1/8/8/8/8/8/8/RK4R1 w KQkq - 0 1")
+
+    def test_rights_are_reordered(self):
+        self.assertEqual(neural_engines.fix_fen_castling("r3k2r/8/8/8/8/8/8/R3K2R w qkQK - 0 1"),
+                         "r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1")
+
+    def test_malformed_fen_is_returned_unchanged(self):
+        self.assertEqual(neural_engines.fix_fen_castling("8/8/8/8/8/8/8/8 w -"), "8/8/8/8/8/8/8/8 w -")
+
+if __name__ == "__main__":
+    unittest.main()
+# ===== END OF FILE test_neural_engines.py =====
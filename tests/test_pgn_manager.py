@@ -0,0 +1,88 @@
+# ===== START OF FILE test_pgn_manager.py =====
+import unittest
+
+import chess
+
+from pgn_manager import PgnManager
+
+# Starts at move 4 with Black to move, so node.ply() begins at 7 instead of 0
+FEN_START_PGN = """[Event "FEN start"]
+[SetUp "1"]
+[FEN "rnbqkbnr/pp1ppppp/8/2p5/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 4"]
+
+4... Nc6 5. d4 cxd4 6. Nxd4 *
+"""
+
+# A [FEN] game goes through chess.pgn, which keeps the side variation
+FEN_START_WITH_VARIATION_PGN = """[Event "FEN start with a variation"]
+[SetUp "1"]
+[FEN "rnbqkbnr/pp1ppppp/8/2p5/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 4"]
+
+4... Nc6 5. d4 (5. Bb5 g6 6. O-O) 5... cxd4 6. Nxd4 *
+"""
+
+STANDARD_PGN = """[Event "Standard start"]
+
+1. e4 e5 2. Nf3 Nc6 3. Bb5 a6 *
+"""
+
+class PgnNavigationTest(unittest.TestCase):
+    def _load(self, pgn_text):
+        manager = PgnManager()
+        self.assertTrue(manager.load_pgn_from_string(pgn_text))
+        return manager
+
+    def _replayed_fens(self, manager):
+        board = manager.game.board()
+        fens = [board.fen()]
+        for move in manager.game.mainline_moves():
+            board.push(move)
+            fens.append(board.fen())
+        return fens
+
+    def test_total_plies_counts_from_fen_start(self):
+        manager = self._load(FEN_START_PGN)
+        self.assertEqual(manager.get_total_plies_mainline(), 4)
+        self.assertEqual(len(manager.get_mainline_nodes()), 5)
+
+    def test_go_to_end_from_fen_start(self):
+        manager = self._load(FEN_START_PGN)
+        manager.go_to_end()
+        self.assertEqual(manager.get_current_ply_number(), 4)
+        self.assertEqual(manager.get_current_board_fen(), self._replayed_fens(manager)[-1])
+
+    def test_go_to_ply_matches_replay(self):
+        for pgn_text in (STANDARD_PGN, FEN_START_PGN):
+            manager = self._load(pgn_text)
+            fens = self._replayed_fens(manager)
+            for ply in (3, 1, len(fens) - 1, 0, 2):
+                self.assertTrue(manager.go_to_ply(ply))
+                self.assertEqual(manager.get_current_ply_number(), ply)
+                self.assertEqual(manager.get_current_board_fen(), fens[ply])
+            self.assertFalse(manager.go_to_ply(len(fens)))
+
+    def test_step_through_fen_start_game(self):
+        manager = self._load(FEN_START_PGN)
+        fens = self._replayed_fens(manager)
+        for ply in range(1, len(fens)):
+            self.assertTrue(manager.next_move())
+            self.assertEqual(manager.get_current_board_fen(), fens[ply])
+        self.assertFalse(manager.next_move())
+        self.assertEqual(manager.get_current_move_san(), "Nxd4")
+
+    def test_go_to_ply_from_side_variation(self):
+        manager = self._load(FEN_START_WITH_VARIATION_PGN)
+        fens = self._replayed_fens(manager)
+        for target_ply in (2, 0, 4, 1):
+            manager.go_to_ply(1)
+            node = manager.current_node.variations[1] # 5. Bb5
+            manager.current_node = node; manager.board_at_current_node.push(node.move)
+            node = node.variations[0] # 5... g6
+            manager.current_node = node; manager.board_at_current_node.push(node.move)
+            self.assertTrue(manager.go_to_ply(target_ply))
+            self.assertIs(manager.current_node, manager.get_mainline_nodes()[target_ply])
+            self.assertEqual(manager.get_current_board_fen(), fens[target_ply])
+
+if __name__ == "__main__":
+    unittest.main()
+# ===== END OF FILE test_pgn_manager.py =====
@@ -0,0 +1,47 @@
+# ===== START OF FILE test_searchless_utils.py =====
+import random
+import unittest
+
+import chess
+import numpy as np
+
+from searchless_chess.src import utils
+
+def _random_positions(chess960: bool, num_games: int = 20, seed: int = 0):
+    rng = random.Random(seed)
+    for _ in range(num_games):
+        board = chess.Board.from_chess960_pos(rng.randrange(960)) if chess960 else chess.Board()
+        while not board.is_game_over() and board.ply() < 120:
+            yield board
+            board.push(rng.choice(list(board.legal_moves)))
+
+class MoveToActionTest(unittest.TestCase):
+    def _check_positions(self, chess960: bool):
+        for board in _random_positions(chess960):
+            legal_moves = list(board.legal_moves)
+            expected = [utils.MOVE_TO_ACTION[move.uci()] for move in legal_moves]
+            self.assertEqual([utils.move_to_action(move) for move in legal_moves], expected, msg=board.fen())
+            actions = utils.moves_to_actions(legal_moves)
+            self.assertEqual(actions.dtype, np.int32)
+            self.assertEqual(actions.tolist(), expected)
+
+    def test_matches_uci_lookup_in_standard_games(self):
+        self._check_positions(chess960=False)
+
+    def test_matches_uci_lookup_in_chess960_games(self):
+        self._check_positions(chess960=True)
+
+    def test_every_action_round_trips(self):
+        for uci, action in utils.MOVE_TO_ACTION.items():
+            self.assertEqual(utils.move_to_action(chess.Move.from_uci(uci)), action)
+
+    def test_unknown_move_raises_key_error(self):
+        with self.assertRaises(KeyError):
+            utils.move_to_action(chess.Move.from_uci("a1h7"))
+
+    def test_empty_move_list(self):
+        self.assertEqual(utils.moves_to_actions([]).shape, (0,))
+
+if __name__ == "__main__":
+    unittest.main()
+# ===== END OF FILE test_searchless_utils.py =====
@@ -0,0 +1,30 @@
+# ===== START OF FILE test_utils.py =====
+import unittest
+
+import chess
+import numpy as np
+
+import utils
+
+class ScharnaglToRankTest(unittest.TestCase):
+    def test_matches_python_chess_for_every_start_position(self):
+        for n in range(960):
+            expected = chess.Board.from_chess960_pos(n).board_fen().split('/')[-1]
+            self.assertEqual(utils.scharnagl_to_rank(n), expected, msg=f"position {n}")
+
+    def test_position_518_is_the_standard_start(self):
+        self.assertEqual(utils.scharnagl_to_rank(518), "RNBQKBNR")
+
+class BatchConversionTest(unittest.TestCase):
+    def test_cp_to_pwin_batch_matches_scalar(self):
+        cps = [-3000, -1500, -250, -1, 0, 1, 37, 400, 1500, 3000]
+        np.testing.assert_allclose(utils.cp_to_pwin_batch(cps), [utils.cp_to_pwin(cp) for cp in cps])
+
+    def test_pwin_to_cp_batch_matches_scalar(self):
+        probs = [0.0, 1e-12, 0.01, 0.25, 0.5, 0.5001, 0.75, 0.99, 1.0 - 1e-12, 1.0]
+        self.assertEqual(utils.pwin_to_cp_batch(probs).tolist(), [utils.pwin_to_cp(p) for p in probs])
+        self.assertEqual(utils.pwin_to_cp_batch(probs).dtype, np.int32)
+
+if __name__ == "__main__":
+    unittest.main()
+# ===== END OF FILE test_utils.py =====
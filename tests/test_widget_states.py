@@ -0,0 +1,32 @@
+# ===== START OF FILE test_widget_states.py =====
+import unittest
+
+from widget_states import WidgetStates
+
+class _FakeWidget:
+    def __init__(self):
+        self.configure_calls = []
+
+    def configure(self, **options):
+        self.configure_calls.append(options)
+
+class WidgetStatesTest(unittest.TestCase):
+    def test_only_changed_states_reach_the_widget(self):
+        widget = _FakeWidget()
+        states = WidgetStates()
+        for desired in ("normal", "normal", "disabled", "disabled", "normal"):
+            states.apply(widget, "btn", desired)
+        self.assertEqual(widget.configure_calls, [{"state": "normal"}, {"state": "disabled"}, {"state": "normal"}])
+        self.assertEqual(states.states, {"btn": "normal"})
+
+    def test_keys_are_tracked_separately(self):
+        first, second = _FakeWidget(), _FakeWidget()
+        states = WidgetStates()
+        states.apply(first, "first", "disabled")
+        states.apply(second, "second", "disabled")
+        self.assertEqual(len(first.configure_calls), 1)
+        self.assertEqual(len(second.configure_calls), 1)
+
+if __name__ == "__main__":
+    unittest.main()
+# ===== END OF FILE test_widget_states.py =====
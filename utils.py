@@ -5,37 +5,33 @@ from typing import Dict, List, Tuple, Optional, Any, Callable, NamedTuple, Union
 import chess
 import chess.variant
 import random
+import numpy as np
 
-def generate_random_chess960_rank():
-    """Generate a valid Chess960 starting back rank as a string."""
-    positions = [None] * 8
-
-    # Place bishops on opposite color squares
-    light_squares = [i for i in range(0, 8, 2)]
-    dark_squares = [i for i in range(1, 8, 2)]
-    positions[random.choice(light_squares)] = 'B'
-    positions[random.choice(dark_squares)] = 'B'
-
-    # Place queen
-    empty = [i for i, x in enumerate(positions) if x is None]
-    positions[random.choice(empty)] = 'Q'
-
-    # Place knights
-    empty = [i for i, x in enumerate(positions) if x is None]
-    for _ in range(2):
-        idx = random.choice(empty)
-        positions[idx] = 'N'
-        empty.remove(idx)
+# Knight pair placements for Scharnagl index // 96, as slots among the five squares left after bishops and queen
+_SCHARNAGL_KNIGHTS = ((0, 1), (0, 2), (0, 3), (0, 4), (1, 2), (1, 3), (1, 4), (2, 3), (2, 4), (3, 4))
 
-    # Place rooks and king (rook-king-rook order)
+def scharnagl_to_rank(n: int) -> str:
+    """Decodes a Scharnagl number (0-959) into White's Chess960 back rank, e.g. 518 -> 'RNBQKBNR'."""
+    positions = [None] * 8
+    n, light_bishop = divmod(n, 4)
+    positions[2 * light_bishop + 1] = 'B'
+    n, dark_bishop = divmod(n, 4)
+    positions[2 * dark_bishop] = 'B'
+    knights, queen = divmod(n, 6)
     empty = [i for i, x in enumerate(positions) if x is None]
-    empty.sort()
-    positions[empty[0]] = 'R'
-    positions[empty[1]] = 'K'
-    positions[empty[2]] = 'R'
-
+    positions[empty.pop(queen)] = 'Q'
+    for slot in _SCHARNAGL_KNIGHTS[knights]:
+        positions[empty[slot]] = 'N'
+    # Rook-king-rook in the last three empty squares
+    remaining = [i for i, x in enumerate(positions) if x is None]
+    for square, piece in zip(remaining, 'RKR'):
+        positions[square] = piece
     return ''.join(positions)
 
+def generate_random_chess960_rank():
+    """Generate a valid Chess960 starting back rank as a string."""
+    return scharnagl_to_rank(random.randrange(960))
+
 def setup_asymmetric_chess960():
 
     white_rank = generate_random_chess960_rank()
@@ -113,6 +109,20 @@ def pwin_to_cp(prob, a=0.4):
         elif prob < 0.5: return -1500
         return 0 # Default for true errors or prob == 0.5 exactly
 
+def cp_to_pwin_batch(centipawns) -> np.ndarray:
+    """Vectorized cp_to_pwin over an array of centipawn evaluations."""
+    cps = np.asarray(centipawns, dtype=np.float64)
+    return 1.0 / (1.0 + np.exp(-0.004 * cps)) # Same lichess scaling as cp_to_pwin
+
+def pwin_to_cp_batch(probs, a=0.4) -> np.ndarray:
+    """Vectorized pwin_to_cp over an array of P(Win)s; returns int32 centipawns, capped at +-1500 like the scalar version."""
+    p = np.asarray(probs, dtype=np.float64)
+    epsilon = 1e-9
+    clipped = np.clip(p, epsilon, 1.0 - epsilon) # Keeps the log finite; the capped entries are overwritten below
+    centipawns = np.round((100.0 / a) * np.log(clipped / (1.0 - clipped)))
+    centipawns = np.where(p <= epsilon, -1500, np.where(p >= 1.0 - epsilon, 1500, centipawns))
+    return centipawns.astype(np.int32)
+
 def format_score_for_display(score_value, is_cp=False):
     """Formats a score (either P(Win) or CP) for display."""
     if score_value is None:
@@ -0,0 +1,121 @@
+# ===== START OF FILE virtual_move_list.py =====
+import tkinter as tk
+from tkinter import ttk
+import tkinter.font as tkfont
+
+class VirtualMoveList:
+    """
+    Move list that keeps every formatted row in a Python list but only holds Treeview
+    items for the rows currently in view. The scrollbar is driven by row offsets over
+    the full list, so widget memory and redraw cost stay O(visible rows).
+    """
+
+    def __init__(self, parent, on_row_selected=None, font=("Courier New", 11)):
+        self.on_row_selected = on_row_selected # Called with the clicked row index
+        self.lines: list[str] = []
+        self.grey_rows: set[int] = set()
+        self.selected_row: int | None = None
+        self.enabled = True
+
+        self._first_row = 0
+        self._visible_rows = 1
+
+        self.frame = ttk.Frame(parent)
+        self.frame.grid_rowconfigure(0, weight=1)
+        self.frame.grid_columnconfigure(0, weight=1)
+
+        self._row_height = tkfont.Font(font=font).metrics("linespace") + 4
+        style = ttk.Style()
+        style.configure("MoveList.Treeview", font=font, rowheight=self._row_height)
+
+        self.tree = ttk.Treeview(self.frame, show="tree", selectmode="none", style="MoveList.Treeview")
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.tree.tag_configure("grey", foreground="grey")
+        self.tree.tag_configure("selected", background="#4A6984", foreground="white")
+
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+
+        self.tree.bind("<Configure>", self._on_configure)
+        self.tree.bind("<ButtonRelease-1>", self._on_click)
+        self.tree.bind("<MouseWheel>", self._on_mouse_wheel)
+        self.tree.bind("<Button-4>", lambda e: self._scroll_by(-3))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_by(3))
+        self.tree.bind("<Up>", lambda e: self._on_arrow_key(-1))
+        self.tree.bind("<Down>", lambda e: self._on_arrow_key(1))
+
+    def grid(self, **kwargs):
+        self.frame.grid(**kwargs)
+
+    def set_rows(self, lines, grey_rows=()):
+        self.lines = list(lines)
+        self.grey_rows = set(grey_rows)
+        self.selected_row = None
+        self._first_row = 0
+        self._render()
+
+    def clear(self):
+        self.set_rows([])
+
+    def set_enabled(self, enabled: bool):
+        self.enabled = enabled
+
+    def select_row(self, row: int):
+        """Highlights a row and scrolls it into view (like Listbox.selection_set + see)."""
+        if not (0 <= row < len(self.lines)): return
+        self.selected_row = row
+        if row < self._first_row: self._first_row = row
+        elif row >= self._first_row + self._visible_rows: self._first_row = row - self._visible_rows + 1
+        self._render()
+
+    def _max_first_row(self):
+        return max(0, len(self.lines) - self._visible_rows)
+
+    def _render(self):
+        self._first_row = min(max(0, self._first_row), self._max_first_row())
+        last_row = min(len(self.lines), self._first_row + self._visible_rows)
+        children = self.tree.get_children()
+        if children: self.tree.delete(*children)
+        for row in range(self._first_row, last_row):
+            tags = ("selected",) if row == self.selected_row else (("grey",) if row in self.grey_rows else ())
+            self.tree.insert("", tk.END, iid=str(row), text=self.lines[row], tags=tags)
+        if self.lines:
+            self.scrollbar.set(self._first_row / len(self.lines), last_row / len(self.lines))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _scroll_by(self, delta_rows: int):
+        self._first_row += delta_rows
+        self._render()
+        return "break" # The Treeview must not scroll its own (few) items
+
+    def _on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self._first_row = round(float(args[1]) * len(self.lines))
+            self._render()
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            self._scroll_by(amount * self._visible_rows if args[2] == "pages" else amount)
+
+    def _on_mouse_wheel(self, event):
+        return self._scroll_by(-3 if event.delta > 0 else 3)
+
+    def _on_configure(self, event):
+        visible_rows = max(1, event.height // self._row_height)
+        if visible_rows != self._visible_rows:
+            self._visible_rows = visible_rows
+            self._render()
+
+    def _on_click(self, event):
+        if not self.enabled: return
+        self.tree.focus_set() # So the arrow keys step through the moves afterwards
+        iid = self.tree.identify_row(event.y)
+        if iid and self.on_row_selected: self.on_row_selected(int(iid))
+
+    def _on_arrow_key(self, step: int):
+        if not self.enabled or not self.lines: return "break"
+        current = self.selected_row if self.selected_row is not None else -1
+        target = min(max(0, current + step), len(self.lines) - 1)
+        if target != self.selected_row and self.on_row_selected: self.on_row_selected(target)
+        return "break"
+# ===== END OF FILE virtual_move_list.py =====
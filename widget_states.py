@@ -0,0 +1,14 @@
+# ===== START OF FILE widget_states.py =====
+class WidgetStates:
+    """
+    Remembers the state last pushed to each widget (by a caller-chosen key), so a
+    state refresh only issues the Tk configure for widgets whose state changed.
+    """
+    def __init__(self):
+        self.states: dict[str, str] = {} # key -> state last sent to Tk
+
+    def apply(self, widget, key: str, desired: str):
+        if self.states.get(key) != desired: # Skip the Tk round-trip when nothing changed
+            widget.configure(state=desired)
+            self.states[key] = desired
+# ===== END OF FILE widget_states.py =====